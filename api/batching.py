@@ -0,0 +1,120 @@
+"""
+In-process micro-batching of concurrent prediction requests.
+"""
+import asyncio
+import functools
+from typing import Any, Callable, Optional, Sequence, Set
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-record requests into one model call.
+
+    Requests submitted on the event loop are queued until either `max_wait` seconds
+    have passed since the first queued request or `max_batch_size` requests are
+    waiting. The queued records are then scored together by `predict_fn` in a worker
+    thread, so the event loop is never blocked by the model, and each request's future
+    is resolved with its own row of the result. A coroutine `predict_fn` is awaited on
+    the event loop instead, for callers that schedule the work themselves (see
+    api.executor.InferenceExecutor).
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[list], Sequence[Any]],
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+    ):
+        """
+        Args:
+            predict_fn: Scores a list of records and returns one result per record, in order;
+                either a plain function or a coroutine function
+            max_batch_size: Maximum number of records per model call
+            max_wait: Maximum time in seconds a request waits for others to join its batch
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: list = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The event loop only keeps weak references to tasks, so batches being scored are
+        # held here until they finish
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, record: Any) -> Any:
+        """
+        Queue a record for the next batch and wait for its result.
+
+        Args:
+            record: Record to score
+
+        Returns:
+            Any: The result for this record
+
+        Raises:
+            Exception: Whatever predict_fn raised for the batch containing this record
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Hand the queued records to a worker thread as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(functools.partial(self._finished, batch))
+
+    def _finished(self, batch: list, task: asyncio.Task) -> None:
+        """Forget a finished batch, and cancel its requests if it was cancelled, even before it started."""
+        self._tasks.discard(task)
+        if task.cancelled():
+            for _, future in batch:
+                future.cancel()
+
+    async def close(self, cancel: bool = False) -> None:
+        """
+        Flush the queued records and wait for every batch being scored.
+
+        Args:
+            cancel: Cancel the batches instead of waiting for them; their requests get a
+                CancelledError
+        """
+        self._flush()
+        tasks = list(self._tasks)
+        if cancel:
+            for task in tasks:
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, batch: list) -> None:
+        """Score a batch off the event loop and resolve its futures."""
+        records = [record for record, _ in batch]
+        try:
+            if asyncio.iscoroutinefunction(self.predict_fn):
+                results = await self.predict_fn(records)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(None, self.predict_fn, records)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
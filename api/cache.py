@@ -0,0 +1,120 @@
+"""
+Bounded in-memory cache for prediction results.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from pydantic import BaseModel
+
+
+def record_key(record: BaseModel) -> bytes:
+    """
+    Canonical key for a validated record.
+
+    Validation has already coerced every field to its declared type, so serializing the
+    fields in declaration order gives the same bytes for equal records however the
+    request JSON was formatted or ordered.
+
+    Args:
+        record: Validated pydantic model, e.g. CensusData
+
+    Returns:
+        bytes: 16-byte BLAKE2b digest of the serialized fields
+    """
+    return hashlib.blake2b(record.model_dump_json(by_alias=True).encode(), digest_size=16).digest()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live.
+
+    Once `max_size` entries are stored the least recently used one is evicted; with a
+    `ttl`, entries older than `ttl` seconds are treated as misses and dropped. A
+    `max_size` of 0 disables caching. Hit, miss, eviction and expiration counters are
+    kept for the metrics endpoint.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None):
+        """
+        Args:
+            max_size: Maximum number of entries; 0 disables the cache
+            ttl: Maximum age of an entry in seconds, or None for no expiry
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a key, refreshing its recency.
+
+        Args:
+            key: Cache key, e.g. from record_key
+
+        Returns:
+            Any: The cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: Cache key, e.g. from record_key
+            value: Value to store; None is not cacheable
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the cache counters.
+
+        Returns:
+            dict: size, max_size, ttl, hits, misses, evictions and expirations
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
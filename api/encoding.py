@@ -0,0 +1,157 @@
+"""
+Pandas-free feature encoding for the serving layer.
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+
+from api.utils import CensusData
+
+
+class CompiledEncoder:
+    """
+    Encode CensusData records straight into the feature layout built by process_data.
+
+    The fitted encoder categories are turned into per-feature lookup tables once, so
+    encoding a record is a handful of dict lookups and array writes instead of a
+    DataFrame round-trip and sklearn input validation.
+
+    The column layout matches process_data: the continuous features in CensusData field
+    order, followed by the encoded `categorical_features` in encoder order. With a
+    OneHotEncoder each feature is a block of columns and the tables map {value:
+    column_index}; unknown categories leave their block all zeros, like
+    handle_unknown="ignore". With an OrdinalEncoder each feature is one column and the
+    tables map {value: code}; unknown categories get the encoder's unknown_value.
+
+    Rows are always dense, also for encoders fitted with sparse_output=True: the values
+    are the same as in the CSR matrix process_data builds, so models trained on it
+    predict the same, and a request's few rows gain nothing from a sparse layout.
+    """
+
+    def __init__(self, encoder, categorical_features: Sequence[str]):
+        """
+        Build the lookup tables from a fitted encoder.
+
+        Args:
+            encoder: Fitted sklearn OneHotEncoder or OrdinalEncoder used by process_data
+            categorical_features: Names of the categorical columns, in encoder order
+        """
+        # sklearn is already loaded along with any fitted encoder, so this import is free
+        # here and keeps the module importable without it
+        from sklearn.preprocessing import OrdinalEncoder
+
+        ordinal = isinstance(encoder, OrdinalEncoder)
+        self._build(
+            encoder.categories_, categorical_features, ordinal,
+            float(encoder.unknown_value) if ordinal else None
+        )
+
+    @classmethod
+    def from_categories(
+        cls,
+        categories: Sequence[Sequence],
+        categorical_features: Sequence[str],
+        ordinal: bool = False,
+        unknown_value: Optional[float] = None,
+    ) -> "CompiledEncoder":
+        """
+        Build the lookup tables from the fitted categories alone, without sklearn.
+
+        Args:
+            categories: Categories of each categorical feature, like encoder.categories_
+            categorical_features: Names of the categorical columns, in encoder order
+            ordinal: True for ordinal codes, False for one-hot blocks
+            unknown_value: Code of unknown categories in ordinal mode
+
+        Returns:
+            CompiledEncoder: Encoder producing the same layout as the fitted sklearn encoder
+        """
+        compiled = cls.__new__(cls)
+        compiled._build(categories, categorical_features, ordinal, unknown_value)
+        return compiled
+
+    def _build(self, categories, categorical_features, ordinal, unknown_value) -> None:
+        """Fill in the column layout and lookup tables."""
+        # Map the hyphenated column names back to CensusData attribute names
+        field_names = {
+            (info.alias or name): name for name, info in CensusData.model_fields.items()
+        }
+
+        self.continuous_fields = [
+            name for column, name in field_names.items() if column not in categorical_features
+        ]
+
+        self.ordinal = ordinal
+        self.unknown_value = float(unknown_value) if ordinal else None
+
+        # (field name, column for ordinal codes or None for one-hot, lookup table)
+        offset = len(self.continuous_fields)
+        self.categorical_fields = []
+        for column, values in zip(categorical_features, categories):
+            if self.ordinal:
+                table = {value: float(i) for i, value in enumerate(values)}
+                self.categorical_fields.append((field_names[column], offset, table))
+                offset += 1
+            else:
+                table = {value: offset + i for i, value in enumerate(values)}
+                self.categorical_fields.append((field_names[column], None, table))
+                offset += len(values)
+
+        self.n_features = offset
+
+    def transform(self, records: Sequence[CensusData], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encode records into a feature matrix.
+
+        Args:
+            records: Validated census records
+            out: Optional preallocated float64 array of shape (len(records), n_features)
+                to write into; it is zeroed before use
+
+        Returns:
+            np.ndarray: Feature matrix, identical to process_data output
+        """
+        if out is None:
+            out = np.zeros((len(records), self.n_features), dtype=np.float64)
+        else:
+            out.fill(0.0)
+
+        for row, record in zip(out, records):
+            for i, name in enumerate(self.continuous_fields):
+                row[i] = getattr(record, name)
+            for name, column, table in self.categorical_fields:
+                value = table.get(getattr(record, name))
+                if column is not None:
+                    row[column] = self.unknown_value if value is None else value
+                elif value is not None:
+                    row[value] = 1.0
+
+        return out
+
+
+class LabelDecoder:
+    """
+    Map binary model predictions back to label names, like LabelBinarizer.inverse_transform.
+
+    Used when the label classes come from a model bundle instead of a pickled
+    LabelBinarizer, so serving does not need sklearn.
+    """
+
+    def __init__(self, classes: Sequence[str]):
+        """
+        Args:
+            classes: Label names in LabelBinarizer.classes_ order
+        """
+        self.classes_ = np.asarray(classes, dtype=object)
+
+    def inverse_transform(self, y: np.ndarray) -> np.ndarray:
+        """
+        Decode predictions.
+
+        Args:
+            y: Binary predictions (0 or 1)
+
+        Returns:
+            np.ndarray: Label names
+        """
+        return self.classes_.take(np.asarray(y).astype(np.intp))
@@ -0,0 +1,211 @@
+"""
+Configurable execution backend for the CPU-bound inference step.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence
+
+EXECUTOR_KINDS = ("inline", "thread", "process")
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the inference queue already holds max_queue calls."""
+
+
+# Artifacts loaded once by each worker process of a "process" executor, set by _init_worker
+_worker_artifacts = None
+
+
+def _init_worker(loader: Callable[[], Any], version: str) -> None:
+    """
+    Load the model in a worker process and check it is the version the parent serves.
+
+    Args:
+        loader: Picklable callable returning ModelArtifacts
+        version: Version of the artifacts loaded by the parent process
+    """
+    global _worker_artifacts
+    _worker_artifacts = loader()
+    if _worker_artifacts.version != version:
+        raise RuntimeError(
+            f"Worker loaded model version {_worker_artifacts.version}, expected {version}"
+        )
+
+
+def _predict_in_worker(records: list) -> list:
+    """Score records with the artifacts preloaded in this worker process."""
+    return _worker_artifacts.score(records)
+
+
+def _ready() -> int:
+    """No-op task used to start worker processes and wait for their initializer."""
+    return os.getpid()
+
+
+class InferenceExecutor:
+    """
+    Run model calls inline, in a thread pool, or in a pool of processes with the model
+    preloaded, behind a bounded queue.
+
+    "inline" scores on the calling thread (the event loop), which only suits tiny models
+    or debugging. "thread" keeps the event loop free while the model runs; numpy and the
+    forest release the GIL for much of the work, but pure-Python encoding does not.
+    "process" loads the artifacts once in each worker process with `worker_loader`, so
+    inference uses more than one core per API worker; only the validated records and the
+    labels cross the process boundary.
+
+    At most `max_queue` calls may be running or waiting at once; beyond that run() raises
+    QueueFullError right away so the API can shed load with a 503 instead of letting
+    latency grow without bound.
+
+    Requests hold the executor with acquire()/release() for as long as they may call
+    run(), e.g. for the whole of a streaming upload. close() only shuts the pool down
+    once every holder has released it and every call has finished, so a model version
+    replaced by a reload keeps scoring off the event loop for the requests still using it.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[list], Sequence[Any]],
+        kind: str = "thread",
+        workers: Optional[int] = None,
+        max_queue: int = 0,
+        worker_loader: Optional[Callable[[], Any]] = None,
+        version: str = "unversioned",
+    ):
+        """
+        Args:
+            predict_fn: Scores a list of records in this process
+            kind: "inline", "thread" or "process"
+            workers: Number of threads or processes; defaults to the number of cores for
+                processes and to the ThreadPoolExecutor default for threads
+            max_queue: Maximum number of calls running or waiting; 0 means unbounded
+            worker_loader: Picklable callable returning the artifacts in a worker process;
+                required for "process"
+            version: Version of the artifacts behind predict_fn, checked by the workers
+
+        Raises:
+            ValueError: If kind is not a known executor or a process pool has no loader
+        """
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(
+                f"Unknown CENSUS_INFERENCE_EXECUTOR: {kind!r} (expected 'inline', 'thread' or 'process')"
+            )
+        self.kind = kind
+        self.predict_fn = predict_fn
+        self.max_queue = max_queue
+        # Free queue slots; only bound to an event loop once a caller has to wait
+        self._slots = asyncio.Semaphore(max_queue) if max_queue else None
+        self._pending = 0
+        self._holders = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+        self._pool: Optional[Executor] = None
+        self._fn = predict_fn
+        if kind == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        elif kind == "process":
+            if worker_loader is None:
+                raise ValueError("A process executor needs a worker_loader")
+            self.workers = workers or os.cpu_count() or 1
+            # Spawn rather than fork: the API process runs threads (model loading, watcher)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(worker_loader, version),
+            )
+            self._fn = _predict_in_worker
+
+    @property
+    def pending(self) -> int:
+        """Number of calls handed to the threads or processes and not finished yet."""
+        return self._pending
+
+    def start(self) -> None:
+        """
+        Start the worker processes and wait until each has loaded the model, so the first
+        requests do not pay for it. Does nothing for other kinds.
+
+        Raises:
+            BrokenProcessPool: If a worker failed to load the model
+        """
+        if self.kind == "process":
+            futures = [self._pool.submit(_ready) for _ in range(self.workers)]
+            for future in futures:
+                future.result()
+
+    def acquire(self) -> None:
+        """
+        Keep the pool alive until the matching release(), even if the executor is closed.
+
+        Raises:
+            RuntimeError: If the executor is already closed and shut down
+        """
+        with self._lock:
+            if self._closed and self._pool is None and self.kind != "inline":
+                raise RuntimeError("Inference executor is closed")
+            self._holders += 1
+
+    def release(self) -> None:
+        """Drop a hold taken with acquire(), shutting the pool down if it was the last one."""
+        with self._lock:
+            self._holders -= 1
+            self._shutdown_if_unused()
+
+    async def run(self, records: list, wait: bool = False) -> list:
+        """
+        Score records with the configured backend.
+
+        Args:
+            records: Records to score
+            wait: If the queue is full, wait for a free slot instead of raising
+
+        Returns:
+            list: One result per record, in order
+
+        Raises:
+            QueueFullError: If the queue is full and wait is False
+            RuntimeError: If the executor was closed and shut down; hold it with acquire()
+        """
+        if self._slots is not None:
+            if self._slots.locked() and not wait:
+                raise QueueFullError(f"Inference queue is full ({self.max_queue} calls)")
+            await self._slots.acquire()
+
+        try:
+            with self._lock:
+                if self.kind != "inline" and self._pool is None:
+                    raise RuntimeError("Inference executor is closed")
+                pool = self._pool
+                self._pending += 1
+            try:
+                if pool is None:
+                    return list(self.predict_fn(records))
+                return list(await asyncio.get_running_loop().run_in_executor(pool, self._fn, records))
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    self._shutdown_if_unused()
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def close(self) -> None:
+        """
+        Shut the pool down once no request holds the executor and the calls already
+        queued have finished.
+        """
+        with self._lock:
+            self._closed = True
+            self._shutdown_if_unused()
+
+    def _shutdown_if_unused(self) -> None:
+        """Release the threads or processes of a closed, unused executor; call with the lock held."""
+        if self._closed and self._holders == 0 and self._pending == 0 and self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
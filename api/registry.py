@@ -0,0 +1,637 @@
+"""
+Model registry that loads the serving artifacts in the background.
+"""
+import functools
+import hashlib
+import json
+import os
+import pickle
+import threading
+from typing import Any, Callable, Hashable, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from api.batching import MicroBatcher
+from api.cache import PredictionCache
+from api.encoding import CompiledEncoder, LabelDecoder
+from api.executor import InferenceExecutor
+from api.utils import CensusData
+from starter.ml.bundle import bundle_version, load_bundle
+from starter.ml.calibration import calibrate
+from starter.ml.compiled import CompiledForest
+from starter.ml.model import inference_proba
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when the model is requested before it has finished loading."""
+
+
+class ReloadInProgressError(RuntimeError):
+    """Raised by a non-blocking reload while another reload is running."""
+
+
+class ScoredRecord(NamedTuple):
+    """Prediction for one record, with the class probabilities it was derived from."""
+
+    label: str
+    # Probability of each class, in ModelArtifacts.class_labels order
+    probabilities: tuple[float, ...]
+    # Calibrated probability that label is correct
+    confidence: float
+
+
+class ModelArtifacts:
+    """
+    Everything needed to serve one loaded model version: the predictor, the fitted
+    encoder and label binarizer, the compiled single-record encoder, and the
+    micro-batcher and prediction cache in front of them. Artifacts loaded from a model
+    bundle pass an already built CompiledEncoder and a LabelDecoder instead of the
+    sklearn objects.
+
+    Records are scored with one predict_proba pass. For a binary model saved with a
+    Platt calibration, the positive-class probability is calibrated first and the
+    label, the class probabilities and the confidence (the probability of the label)
+    are all derived from the calibrated probability, so a label always comes with a
+    confidence of at least one half; without a calibration they come from the raw
+    probabilities, and the label is the model's prediction. Named decision profiles
+    re-decide the label from those probabilities with their own threshold, derived by
+    training on the same scale, so one model serves every operating point.
+
+    Model calls from the micro-batcher and the batch endpoints go through the version's
+    InferenceExecutor, which runs them inline, in a thread pool or in worker processes
+    behind a bounded queue.
+
+    Each version owns its micro-batcher, so requests that were queued before a reload
+    are scored by the version they started on, and its cache, so swapping in a new
+    version invalidates every cached prediction.
+    """
+
+    def __init__(
+        self,
+        predictor,
+        encoder,
+        lb,
+        categorical_features: Sequence[str],
+        version: str = "unversioned",
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+        cache_size: int = 0,
+        cache_ttl: Optional[float] = None,
+        executor: str = "thread",
+        workers: Optional[int] = None,
+        max_queue: int = 0,
+        worker_loader: Optional[Callable[[], "ModelArtifacts"]] = None,
+        calibration: Optional[dict] = None,
+        decision_profiles: Optional[dict] = None,
+    ):
+        self.version = version
+        self.predictor = predictor
+        self.encoder = encoder
+        self.lb = lb
+        self.calibration = calibration
+        self.decision_profiles = decision_profiles or {}
+        # Label name of each column of predict_proba
+        self.class_labels = [str(label) for label in lb.inverse_transform(np.asarray(predictor.classes_))]
+        self.compiled_encoder = (
+            encoder if isinstance(encoder, CompiledEncoder) else CompiledEncoder(encoder, categorical_features)
+        )
+        self.executor = InferenceExecutor(
+            self.score, kind=executor, workers=workers, max_queue=max_queue,
+            worker_loader=worker_loader, version=version
+        )
+        self.batcher = MicroBatcher(self.executor.run, max_batch_size=max_batch_size, max_wait=max_wait)
+        self.cache = PredictionCache(max_size=cache_size, ttl=cache_ttl)
+
+    def score(self, records: list[CensusData]) -> list[ScoredRecord]:
+        """
+        Score a list of validated census records with a single model call.
+
+        Args:
+            records: Census data inputs conforming to CensusData model
+
+        Returns:
+            list[ScoredRecord]: Label, class probabilities and confidence, in input order
+        """
+        # Encode the records straight into feature rows (same layout as process_data)
+        X = self.compiled_encoder.transform(records)
+
+        # One pass yields both the predictions and their probabilities
+        preds, proba = inference_proba(self.predictor, X)
+        if self.calibration is not None and proba.shape[1] == 2:
+            # Decide on the calibrated probability, so the label and its confidence agree
+            positive = calibrate(self.calibration, proba[:, 1])
+            proba = np.column_stack([1 - positive, positive])
+            preds = np.asarray(self.predictor.classes_).take(np.argmax(proba, axis=1))
+        labels = self.lb.inverse_transform(preds)
+        confidence = proba[np.arange(proba.shape[0]), np.argmax(proba, axis=1)]
+
+        return [
+            ScoredRecord(str(label), tuple(row), float(conf))
+            for label, row, conf in zip(labels, proba.tolist(), confidence.tolist())
+        ]
+
+    def apply_profile(self, scored: ScoredRecord, profile: str) -> ScoredRecord:
+        """
+        Decide the label of a scored record with the threshold of a decision profile.
+
+        Args:
+            scored: Output of score() for the record, e.g. from the prediction cache
+            profile: Name of a decision profile saved by training
+
+        Returns:
+            ScoredRecord: The record with the profile's label and the confidence in it
+
+        Raises:
+            KeyError: If the profile is not one of decision_profiles
+        """
+        threshold = self.decision_profiles[profile]["threshold"]
+        label = self.class_labels[1] if scored.probabilities[1] >= threshold else self.class_labels[0]
+        if label == scored.label:
+            return scored
+        return scored._replace(label=label, confidence=1 - scored.confidence)
+
+    def predict(self, records: list[CensusData]) -> list[str]:
+        """
+        Score a list of validated census records with a single model call.
+
+        Args:
+            records: Census data inputs conforming to CensusData model
+
+        Returns:
+            list[str]: Predicted labels, in input order
+        """
+        return [scored.label for scored in self.score(records)]
+
+    def warm_up(self) -> None:
+        """
+        Score the CensusData schema example once so that first requests do not pay for
+        lazy initialization in numpy/sklearn, and start the executor's worker processes.
+        """
+        example = CensusData.model_config["json_schema_extra"]["example"]
+        self.predict([CensusData(**example)])
+        self.executor.start()
+
+    def release(self) -> None:
+        """
+        Drop the hold taken by ModelRegistry.acquire().
+        """
+        self.executor.release()
+
+    def close(self) -> None:
+        """
+        Release the executor's threads or processes once no request holds this version
+        and its queued calls are done.
+        """
+        self.executor.close()
+
+
+# Pickled model, compiled array directory, bundle directory, probability calibration and
+# decision profiles of each model variant saved by training
+MODEL_VARIANTS = {
+    "full": ("model.pkl", "compiled_model", "bundle", "calibration.json", "decision_profiles.json"),
+    "compressed": ("model_compressed.pkl", "compiled_model_compressed", "bundle_compressed",
+                   "calibration_compressed.json", "decision_profiles_compressed.json"),
+}
+
+
+def _variant_paths(model_path: str, variant: str) -> tuple[str, str, str, str, str]:
+    """
+    Locate the pickled model, compiled arrays, bundle, calibration and decision profiles of
+    a model variant.
+
+    Args:
+        model_path: Directory holding the trained artifacts
+        variant: "full" for the trained forest or "compressed" for its smaller serving
+            variant
+
+    Returns:
+        tuple[str, str, str, str, str]: Paths of the pickled model, of the compiled array
+            directory, of the bundle directory, of the calibration file and of the
+            decision profiles file
+
+    Raises:
+        ValueError: If variant is not a known model variant
+    """
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown CENSUS_MODEL_VARIANT: {variant!r} (expected 'full' or 'compressed')")
+    return tuple(os.path.join(model_path, name) for name in MODEL_VARIANTS[variant])
+
+
+def _artifact_files(model_path: str, predictor_kind: str, variant: str = "full") -> list[str]:
+    """
+    List the files a predictor kind is loaded from.
+
+    Args:
+        model_path: Directory holding the trained artifacts
+        predictor_kind: See load_predictor; bundles are versioned by their manifest instead
+        variant: See load_predictor
+
+    Returns:
+        list[str]: Paths of the artifact files, in a stable order
+    """
+    pickle_path, compiled_path, _, calibration_path, profiles_path = _variant_paths(model_path, variant)
+    if predictor_kind == "mmap":
+        files = [
+            os.path.join(compiled_path, name)
+            for name in sorted(os.listdir(compiled_path)) if not name.endswith(".tmp")
+        ]
+    else:
+        files = [pickle_path]
+    files += [os.path.join(model_path, "encoder.pkl"), os.path.join(model_path, "lb.pkl")]
+    # Optional: artifacts trained before calibration and profiles were saved have none
+    return files + [path for path in (calibration_path, profiles_path) if os.path.exists(path)]
+
+
+def artifact_version(model_path: str, predictor_kind: str, variant: str = "full") -> str:
+    """
+    Identify a set of artifacts by the hash of their contents.
+
+    Args:
+        model_path: Directory holding the trained artifacts
+        predictor_kind: See load_predictor
+        variant: See load_predictor
+
+    Returns:
+        str: The first 12 hex digits of the SHA-256 over the artifact files; for a
+            bundle, its ModelBundle.version (the hash of its manifest)
+    """
+    if predictor_kind == "bundle":
+        # The manifest holds the checksum of every other bundle file
+        return bundle_version(_variant_paths(model_path, variant)[2])
+
+    digest = hashlib.sha256()
+    for path in _artifact_files(model_path, predictor_kind, variant):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def artifact_fingerprint(model_path: str) -> tuple:
+    """
+    Cheap change detector for a model directory, based on file sizes and mtimes.
+
+    Args:
+        model_path: Directory holding the trained artifacts
+
+    Returns:
+        tuple: (relative path, mtime_ns, size) for every file under model_path
+    """
+    entries = []
+    for root, _, files in os.walk(model_path):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Removed between listing and stat, e.g. while training rewrites it
+                continue
+            entries.append((os.path.relpath(path, model_path), stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(entries))
+
+
+def load_predictor(model_path: str, kind: str, variant: str = "full"):
+    """
+    Load the model used for inference.
+
+    Args:
+        model_path: Directory holding the trained artifacts
+        kind: "sklearn" for the pickled RandomForestClassifier, "compiled" for the pickled
+            forest compiled into the flat-array evaluator, or "mmap" for the flat-array
+            evaluator memory-mapped from compiled_model/ without unpickling model.pkl.
+            The "bundle" kind loads the encoder and label binarizer too, so it is
+            handled by load_artifacts instead.
+        variant: "full" for the trained forest, or "compressed" for the smaller serving
+            variant saved next to it (model_compressed.pkl, compiled_model_compressed/)
+
+    Returns:
+        RandomForestClassifier or CompiledForest: Object with a predict method
+
+    Raises:
+        ValueError: If kind or variant is not known
+    """
+    pickle_path, compiled_path = _variant_paths(model_path, variant)[:2]
+    if kind == "mmap":
+        return CompiledForest.load(compiled_path, mmap_mode="r")
+    if kind not in ("sklearn", "compiled"):
+        raise ValueError(
+            f"Unknown CENSUS_PREDICTOR: {kind!r} (expected 'sklearn', 'compiled', 'mmap' or 'bundle')"
+        )
+
+    with open(pickle_path, "rb") as f:
+        model = pickle.load(f)
+    return CompiledForest.from_model(model) if kind == "compiled" else model
+
+
+def load_calibration(model_path: str, variant: str = "full") -> Optional[dict]:
+    """
+    Load the probability calibration saved by training for a model variant.
+
+    Args:
+        model_path: Directory holding the trained artifacts
+        variant: See load_predictor
+
+    Returns:
+        Optional[dict]: Calibration for starter.ml.calibration.calibrate, or None if the
+            artifacts were saved without one
+    """
+    return _load_json(_variant_paths(model_path, variant)[3])
+
+
+def load_decision_profiles(model_path: str, variant: str = "full") -> dict:
+    """
+    Load the decision profiles saved by training for a model variant.
+
+    Args:
+        model_path: Directory holding the trained artifacts
+        variant: See load_predictor
+
+    Returns:
+        dict: Maps profile names to their threshold and test metrics; empty if the
+            artifacts were saved without profiles
+    """
+    return _load_json(_variant_paths(model_path, variant)[4]) or {}
+
+
+def _load_json(path: str) -> Optional[Any]:
+    """Load an optional JSON artifact, or return None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _load_checked_bundle(bundle_path: str, categorical_features: Sequence[str], verify: bool = False):
+    """
+    Load a model bundle and check that it was trained on the CensusData layout.
+
+    Args:
+        bundle_path: Directory written by starter.ml.bundle.save_bundle
+        categorical_features: Names of the categorical columns served by the API
+        verify: Also check the checksum of every bundle file, see starter.ml.bundle.verify_bundle
+
+    Returns:
+        ModelBundle: The loaded bundle
+
+    Raises:
+        BundleError: If the bundle is missing, corrupted or of another format version
+        ValueError: If its feature layout does not match the API
+    """
+    bundle = load_bundle(bundle_path, verify=verify)
+    columns = [info.alias or name for name, info in CensusData.model_fields.items()]
+    expected = [c for c in columns if c not in categorical_features] + list(categorical_features)
+    if bundle.feature_order != expected:
+        raise ValueError(
+            f"Model bundle feature order {bundle.feature_order} does not match the API ({expected})"
+        )
+    return bundle
+
+
+def load_artifacts(
+    model_path: str,
+    predictor_kind: str,
+    categorical_features: Sequence[str],
+    max_batch_size: int = 64,
+    max_wait: float = 0.002,
+    cache_size: int = 0,
+    cache_ttl: Optional[float] = None,
+    variant: str = "full",
+    executor: str = "thread",
+    workers: Optional[int] = None,
+    max_queue: int = 0,
+    verify_bundle: bool = False,
+) -> ModelArtifacts:
+    """
+    Load the model, encoder and label binarizer from a model directory.
+
+    Args:
+        model_path: Directory holding the trained artifacts
+        predictor_kind: See load_predictor
+        categorical_features: Names of the categorical columns, in encoder order
+        max_batch_size: Maximum number of records per micro-batch
+        max_wait: Micro-batching window in seconds
+        cache_size: Maximum number of cached predictions; 0 disables the cache
+        cache_ttl: Maximum age of a cached prediction in seconds, or None for no expiry
+        variant: See load_predictor
+        executor: "inline", "thread" or "process", see api.executor.InferenceExecutor
+        workers: Number of inference threads or processes
+        max_queue: Maximum number of model calls running or waiting; 0 means unbounded
+        verify_bundle: For the "bundle" predictor, check every file against its checksum
+            before loading it
+
+    Returns:
+        ModelArtifacts: The loaded and warmed-up artifacts
+    """
+    if predictor_kind == "bundle":
+        bundle = _load_checked_bundle(_variant_paths(model_path, variant)[2], categorical_features, verify_bundle)
+        # The manifest hash read together with the files, so it always matches them
+        version = bundle.version
+        predictor = bundle.predictor
+        # Built from the manifest alone, so serving a bundle never imports sklearn
+        encoder = CompiledEncoder.from_categories(
+            bundle.encoder_spec["categories"], categorical_features,
+            ordinal=bundle.encoder_spec["type"] == "ordinal", unknown_value=bundle.encoder_spec["unknown_value"]
+        )
+        lb = LabelDecoder(bundle.label_classes)
+        calibration = bundle.calibration
+        decision_profiles = bundle.decision_profiles
+    else:
+        version = artifact_version(model_path, predictor_kind, variant)
+        predictor = load_predictor(model_path, predictor_kind, variant)
+        with open(os.path.join(model_path, "encoder.pkl"), "rb") as f:
+            encoder = pickle.load(f)
+        with open(os.path.join(model_path, "lb.pkl"), "rb") as f:
+            lb = pickle.load(f)
+        calibration = load_calibration(model_path, variant)
+        decision_profiles = load_decision_profiles(model_path, variant)
+
+    # Worker processes load the same artifacts themselves and score inline
+    worker_loader = functools.partial(
+        load_artifacts, model_path, predictor_kind, categorical_features, variant=variant, executor="inline"
+    ) if executor == "process" else None
+
+    artifacts = ModelArtifacts(
+        predictor, encoder, lb, categorical_features,
+        version=version, max_batch_size=max_batch_size, max_wait=max_wait,
+        cache_size=cache_size, cache_ttl=cache_ttl,
+        executor=executor, workers=workers, max_queue=max_queue, worker_loader=worker_loader,
+        calibration=calibration, decision_profiles=decision_profiles
+    )
+    artifacts.warm_up()
+    return artifacts
+
+
+class ModelRegistry:
+    """
+    Holds the active model version and loads new versions in the background.
+
+    The registry moves through the states "not_started" -> "loading" -> "ready" (or
+    "failed"). Until a first version is ready, get() raises ModelNotReadyError so that
+    the API can answer immediately instead of blocking on artifact deserialization.
+
+    Later versions are loaded with reload(), either on demand or by a watcher thread
+    polling the model directory, and swapped in atomically: get() returns either the
+    old or the new artifacts, and callers that already hold the old ones finish on
+    them. A failed reload keeps the active version and records the error.
+    """
+
+    def __init__(self, loader: Callable[[], ModelArtifacts]):
+        """
+        Args:
+            loader: Loads, warms up and returns a new version of the artifacts
+        """
+        self.loader = loader
+        self.state = "not_started"
+        self.error: Optional[str] = None
+        self._active: Optional[ModelArtifacts] = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+
+    @property
+    def version(self) -> Optional[str]:
+        """Version of the active artifacts, or None before the first load."""
+        artifacts = self._active
+        return artifacts.version if artifacts is not None else None
+
+    def start(self) -> None:
+        """Start loading in a background thread; calling it again is a no-op."""
+        with self._lock:
+            if self.state != "not_started":
+                return
+            self.state = "loading"
+        threading.Thread(target=self._load, name="model-loader", daemon=True).start()
+
+    def _load(self) -> None:
+        """Load the first version, recording any error in the registry state."""
+        try:
+            self.reload()
+        except Exception:
+            pass
+        finally:
+            self._ready.set()
+
+    def reload(self, blocking: bool = True) -> ModelArtifacts:
+        """
+        Load a new version in the calling thread and make it the active one.
+
+        Args:
+            blocking: Wait for a reload already running to finish first; if False, fail
+                instead
+
+        Returns:
+            ModelArtifacts: The newly active artifacts
+
+        Raises:
+            ReloadInProgressError: If blocking is False and another reload is running
+            Exception: Whatever the loader raised; the previous version stays active
+        """
+        # Serialize reloads so concurrent triggers cannot activate versions out of order
+        if not self._reload_lock.acquire(blocking=blocking):
+            raise ReloadInProgressError("A model reload is already in progress")
+        try:
+            try:
+                artifacts = self.loader()
+            except Exception as e:
+                with self._lock:
+                    self.error = str(e)
+                    if self._active is None:
+                        self.state = "failed"
+                raise
+
+            with self._lock:
+                previous, self._active = self._active, artifacts
+                self.error = None
+                self.state = "ready"
+            if previous is not None:
+                previous.close()
+            return artifacts
+        finally:
+            self._reload_lock.release()
+
+    def watch(self, fingerprint: Callable[[], Hashable], interval: float) -> None:
+        """
+        Reload whenever fingerprint() changes, polling every `interval` seconds.
+
+        A change is only acted on once the fingerprint has been stable for one more
+        poll, so that artifacts still being written are not picked up half-way.
+
+        Args:
+            fingerprint: Returns a value that changes when the artifacts change
+            interval: Polling period in seconds
+        """
+        threading.Thread(
+            target=self._watch, args=(fingerprint, fingerprint(), interval), name="model-watcher", daemon=True
+        ).start()
+
+    def _watch(self, fingerprint: Callable[[], Hashable], seen: Hashable, interval: float) -> None:
+        """Polling loop run by the watcher thread."""
+        pending = None
+        while not self._stop.wait(interval):
+            current = fingerprint()
+            if current == seen:
+                pending = None
+            elif current != pending:
+                pending = current
+            else:
+                seen, pending = current, None
+                try:
+                    self.reload()
+                except Exception:
+                    # Already recorded in self.error; keep serving the active version
+                    pass
+
+    def stop(self) -> None:
+        """Stop the watcher thread, if any, and release the active version's executor."""
+        self._stop.set()
+        with self._lock:
+            active = self._active
+        if active is not None:
+            active.close()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the first load has finished.
+
+        Args:
+            timeout: Maximum time to wait in seconds, or None to wait forever
+
+        Returns:
+            bool: True if a model is ready
+        """
+        self._ready.wait(timeout)
+        return self.state == "ready"
+
+    def acquire(self) -> ModelArtifacts:
+        """
+        Return the active artifacts, held until their release() so that a reload does
+        not shut their executor down while the caller is still scoring with them.
+
+        Returns:
+            ModelArtifacts: The active version
+
+        Raises:
+            ModelNotReadyError: If no version has been loaded successfully yet
+        """
+        # Taken under the lock that guards the swap, so the artifacts are not closed yet
+        with self._lock:
+            artifacts = self.get()
+            artifacts.executor.acquire()
+        return artifacts
+
+    def get(self) -> ModelArtifacts:
+        """
+        Return the active artifacts.
+
+        Returns:
+            ModelArtifacts: The active version
+
+        Raises:
+            ModelNotReadyError: If no version has been loaded successfully yet
+        """
+        artifacts = self._active
+        if artifacts is None:
+            raise ModelNotReadyError(f"Model is not ready (state: {self.state})")
+        return artifacts
@@ -1,27 +1,30 @@
-from fastapi import APIRouter, status, HTTPException
-from api.utils import CensusData, PredictionResponse
-import pickle
-import pandas as pd
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, Header, Query, Request, status, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from typing import Any, Optional
+from api.utils import (
+    CensusData, ClassProbability, PredictionResponse, BatchPredictionResponse, BatchItemError, ReloadResponse
+)
+import json
 import os
+import secrets
 import sys
 
 # Add the parent directory to the path to import from starter module
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from starter.ml.data import process_data
-from starter.ml.model import inference
+from api.cache import record_key
+from api.streaming import DuplexStreamingResponse, LineTooLongError, iter_lines
+from api.executor import QueueFullError
+from api.registry import (
+    ModelArtifacts, ModelNotReadyError, ModelRegistry, ReloadInProgressError, ScoredRecord, artifact_fingerprint,
+    load_artifacts
+)
 
-router = APIRouter()
-
-# Load the model and artifacts at startup
+# Directory holding the trained model artifacts
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "model")
 
-with open(os.path.join(MODEL_PATH, "model.pkl"), "rb") as f:
-    model = pickle.load(f)
-with open(os.path.join(MODEL_PATH, "encoder.pkl"), "rb") as f:
-    encoder = pickle.load(f)
-with open(os.path.join(MODEL_PATH, "lb.pkl"), "rb") as f:
-    lb = pickle.load(f)
-
 # Define categorical features
 CAT_FEATURES = [
     "workclass",
@@ -34,6 +37,158 @@ CAT_FEATURES = [
     "native-country",
 ]
 
+# Select the predictor:
+#   "sklearn"  - the pickled RandomForestClassifier (default)
+#   "compiled" - the pickled forest compiled into the flat-array evaluator
+#   "mmap"     - the flat-array evaluator memory-mapped from model/compiled_model/, without
+#                unpickling model.pkl, so all worker processes share one copy of the trees
+#   "bundle"   - like "mmap", but the encoder and label binarizer are also rebuilt from the
+#                checksummed model bundle in model/bundle/, so nothing is unpickled
+PREDICTOR = os.environ.get("CENSUS_PREDICTOR", "sklearn")
+
+# Hash every bundle file against its manifest on each load; off by default because it
+# reads the whole bundle, verify at deploy time with starter.ml.bundle.verify_bundle instead
+VERIFY_BUNDLE = os.environ.get("CENSUS_VERIFY_BUNDLE", "0") == "1"
+
+# Select the model variant: "full" (default) or "compressed", the smaller serving model
+# saved by training with --compress-trees/--compress-depth/--distill
+MODEL_VARIANT = os.environ.get("CENSUS_MODEL_VARIANT", "full")
+
+# Seconds clients are asked to wait before retrying while the model is loading
+RETRY_AFTER_SECONDS = 5
+
+# Seconds clients are asked to wait before retrying when the inference queue is full
+QUEUE_RETRY_AFTER_SECONDS = 1
+
+# Records scored per model call by /predict/stream
+STREAM_CHUNK_SIZE = int(os.environ.get("CENSUS_STREAM_CHUNK_SIZE", "1000"))
+
+# Most records accepted by one /predict/batch request; larger batches get 413, use /predict/stream
+MAX_BATCH_RECORDS = int(os.environ.get("CENSUS_MAX_BATCH_RECORDS", "10000"))
+
+# Bearer token required by the /admin endpoints; unset disables them
+ADMIN_TOKEN = os.environ.get("CENSUS_ADMIN_TOKEN")
+
+# Seconds between checks of MODEL_PATH for new artifacts; 0 disables the watcher
+MODEL_POLL_SECONDS = float(os.environ.get("CENSUS_MODEL_POLL_SECONDS", "0"))
+
+# Artifacts are loaded in a background thread so the API accepts connections immediately
+registry = ModelRegistry(lambda: load_artifacts(
+    MODEL_PATH,
+    PREDICTOR,
+    CAT_FEATURES,
+    # Coalesce concurrent /predict requests into micro-batches scored in a worker thread
+    max_batch_size=int(os.environ.get("CENSUS_MAX_BATCH_SIZE", "64")),
+    max_wait=float(os.environ.get("CENSUS_BATCH_WINDOW_MS", "2")) / 1000,
+    # Cache /predict results per model version; a size of 0 disables the cache
+    cache_size=int(os.environ.get("CENSUS_CACHE_SIZE", "10000")),
+    cache_ttl=float(os.environ.get("CENSUS_CACHE_TTL_SECONDS", "0")) or None,
+    variant=MODEL_VARIANT,
+    # Run model calls "inline", in a "thread" pool or in a "process" pool with the model
+    # preloaded; past CENSUS_INFERENCE_QUEUE_SIZE running or waiting calls, requests get a 503
+    executor=os.environ.get("CENSUS_INFERENCE_EXECUTOR", "thread"),
+    workers=int(os.environ.get("CENSUS_INFERENCE_WORKERS", "0")) or None,
+    max_queue=int(os.environ.get("CENSUS_INFERENCE_QUEUE_SIZE", "64")),
+    verify_bundle=VERIFY_BUNDLE,
+))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Start loading the model as soon as the application starts, and watch the model
+    directory for new artifacts if enabled.
+    """
+    registry.start()
+    if MODEL_POLL_SECONDS > 0:
+        registry.watch(lambda: artifact_fingerprint(MODEL_PATH), MODEL_POLL_SECONDS)
+    yield
+    # Let the micro-batches already queued or scoring finish before the executor goes away
+    try:
+        await registry.get().batcher.close()
+    except ModelNotReadyError:
+        pass
+    registry.stop()
+
+
+router = APIRouter(lifespan=lifespan)
+
+
+def _get_artifacts(hold: bool = False) -> ModelArtifacts:
+    """
+    Return the loaded model artifacts, starting the load if it has not begun.
+
+    Args:
+        hold: Keep the artifacts' inference executor running, even if a reload replaces
+            them, until the caller calls ModelArtifacts.release()
+
+    Returns:
+        ModelArtifacts: The loaded artifacts
+
+    Raises:
+        HTTPException: 503 with a Retry-After header until the model is ready
+    """
+    registry.start()
+    try:
+        return registry.acquire() if hold else registry.get()
+    except ModelNotReadyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+
+def _queue_full(e: QueueFullError) -> HTTPException:
+    """
+    Build the response for a request shed because the inference queue is full.
+
+    Args:
+        e: Error raised by the inference executor
+
+    Returns:
+        HTTPException: 503 with a short Retry-After header
+    """
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(QUEUE_RETRY_AFTER_SECONDS)}
+    )
+
+
+def _class_probabilities(artifacts: ModelArtifacts, scored: ScoredRecord, top_k: Optional[int]) -> list[ClassProbability]:
+    """
+    Rank the class probabilities of one scored record.
+
+    Args:
+        artifacts: Artifacts that scored the record
+        scored: Output of ModelArtifacts.score for the record
+        top_k: Number of most likely classes to keep, or None for all of them
+
+    Returns:
+        list[ClassProbability]: Classes by decreasing probability
+    """
+    ranked = sorted(zip(artifacts.class_labels, scored.probabilities), key=lambda item: -item[1])
+    return [ClassProbability(label=label, probability=probability) for label, probability in ranked[:top_k]]
+
+
+def _check_profile(artifacts: ModelArtifacts, profile: Optional[str]) -> None:
+    """
+    Check that a requested decision profile exists for the active model version.
+
+    Args:
+        artifacts: Artifacts that will score the request
+        profile: Requested profile name, or None for the model's own decision
+
+    Raises:
+        HTTPException: 422 listing the available profiles if it does not exist
+    """
+    if profile is not None and profile not in artifacts.decision_profiles:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"Unknown decision profile {profile!r} (available: {sorted(artifacts.decision_profiles)})"
+        )
+
 
 @router.get("/", status_code=status.HTTP_200_OK)
 async def root() -> dict:
@@ -46,62 +201,366 @@ async def root() -> dict:
     return {"message": "Welcome to the Census Income Prediction API!"}
 
 
-@router.post("/predict", response_model=PredictionResponse, status_code=status.HTTP_200_OK)
-async def predict(data: CensusData) -> PredictionResponse:
+@router.get("/health/live", status_code=status.HTTP_200_OK)
+async def health_live() -> dict:
+    """
+    Liveness probe: the process is up and serving requests.
+
+    Returns:
+        dict: The liveness status
+    """
+    return {"status": "alive"}
+
+
+@router.get("/health/ready", status_code=status.HTTP_200_OK)
+async def health_ready():
+    """
+    Readiness probe: the model has been loaded and predictions can be served.
+
+    Returns:
+        dict: The loading state, with status code 503 and a Retry-After header until ready
+    """
+    registry.start()
+    if registry.state == "ready":
+        return {"status": "ready"}
+
+    content = {"status": registry.state}
+    if registry.error is not None:
+        content["detail"] = registry.error
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=content,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK)
+async def metrics() -> dict:
+    """
+    Serving metrics for the active model version.
+
+    Cache counters start at zero whenever a new model version is activated, since
+    each version has its own cache.
+
+    Returns:
+        dict: The active model version and its prediction cache counters
+
+    Raises:
+        HTTPException: If the model is not ready
+    """
+    artifacts = _get_artifacts()
+    return {"model_version": artifacts.version, "cache": artifacts.cache.stats()}
+
+
+@router.get("/profiles", status_code=status.HTTP_200_OK)
+async def profiles() -> dict:
+    """
+    Decision profiles of the active model version.
+
+    Each profile was derived by training on the test split and holds its rule, its
+    probability threshold and the precision, recall and F-beta it reached there.
+
+    Returns:
+        dict: The active model version and its decision profiles by name
+
+    Raises:
+        HTTPException: If the model is not ready
+    """
+    artifacts = _get_artifacts()
+    return {"model_version": artifacts.version, "profiles": artifacts.decision_profiles}
+
+
+def _check_admin_token(authorization: Optional[str]) -> None:
+    """
+    Check the bearer token of an admin request against CENSUS_ADMIN_TOKEN.
+
+    Args:
+        authorization: Value of the Authorization header, if any
+
+    Raises:
+        HTTPException: 404 if no admin token is configured, 401 if the token is wrong
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing admin token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+@router.post("/admin/reload", response_model=ReloadResponse, status_code=status.HTTP_200_OK)
+async def admin_reload(authorization: Optional[str] = Header(None)) -> ReloadResponse:
+    """
+    Load the artifacts currently in the model directory and make them the active version.
+
+    The new version is loaded and warmed up in a worker thread while the current one
+    keeps serving; requests already in flight finish on the version they started on.
+    Only available when CENSUS_ADMIN_TOKEN is set, to requests bearing that token, and
+    only one reload runs at a time.
+
+    Args:
+        authorization: "Bearer <CENSUS_ADMIN_TOKEN>"
+
+    Returns:
+        ReloadResponse: The newly active model version
+
+    Raises:
+        HTTPException: 404 if admin endpoints are disabled, 401 without the right token,
+            409 while another reload is running, or 500 if loading fails; the previous
+            version stays active
+    """
+    _check_admin_token(authorization)
+    try:
+        artifacts = await run_in_threadpool(registry.reload, False)
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Reload failed: {str(e)}"
+        )
+    return ReloadResponse(model_version=artifacts.version)
+
+
+@router.post(
+    "/predict", response_model=PredictionResponse, response_model_exclude_none=True, status_code=status.HTTP_200_OK
+)
+async def predict(
+    data: CensusData,
+    probabilities: bool = False,
+    top_k: Optional[int] = Query(None, ge=1),
+    profile: Optional[str] = None,
+) -> PredictionResponse:
     """
     Perform model inference on census data.
     
     Args:
         data: Census data input conforming to CensusData model
+        probabilities: Also return the class probabilities and the calibrated confidence
+            of the prediction, from the same model pass
+        top_k: Only return the k most likely classes; implies probabilities
+        profile: Decide with the threshold of this decision profile (see /profiles)
+            instead of the most likely class
         
     Returns:
         PredictionResponse: Prediction result
         
     Raises:
-        HTTPException: If an error occurs during prediction
+        HTTPException: If the model is not ready, the profile is unknown or an error
+            occurs during prediction
     """
+    artifacts = _get_artifacts(hold=True)
     try:
-        # Convert Pydantic model to dictionary and then to DataFrame
-        data_dict = {
-            "age": data.age,
-            "workclass": data.workclass,
-            "fnlgt": data.fnlgt,
-            "education": data.education,
-            "education-num": data.education_num,
-            "marital-status": data.marital_status,
-            "occupation": data.occupation,
-            "relationship": data.relationship,
-            "race": data.race,
-            "sex": data.sex,
-            "capital-gain": data.capital_gain,
-            "capital-loss": data.capital_loss,
-            "hours-per-week": data.hours_per_week,
-            "native-country": data.native_country,
-        }
-        
-        # Create DataFrame with a single row
-        df = pd.DataFrame([data_dict])
-        
-        # Process the data (no label for inference)
-        X, _, _, _ = process_data(
-            df,
-            categorical_features=CAT_FEATURES,
-            label=None,
-            training=False,
-            encoder=encoder,
-            lb=lb
-        )
-        
-        # Make prediction
-        pred = inference(model, X)
-        
-        # Convert prediction back to label
-        prediction_label = lb.inverse_transform(pred)[0]
+        _check_profile(artifacts, profile)
+        try:
+            # Serve repeated records from the cache of the active model version
+            key = record_key(data)
+            scored = artifacts.cache.get(key)
+            if scored is None:
+                # Wait for this record's row of the next micro-batch
+                scored = await artifacts.batcher.submit(data)
+                artifacts.cache.put(key, scored)
+
+            # Profiles only move the threshold, so cached probabilities serve every profile
+            if profile is not None:
+                scored = artifacts.apply_profile(scored, profile)
         
-        return PredictionResponse(prediction=prediction_label)
+            response = PredictionResponse(prediction=scored.label, model_version=artifacts.version, profile=profile)
+            if probabilities or top_k is not None:
+                response.probabilities = _class_probabilities(artifacts, scored, top_k)
+                response.confidence = scored.confidence
+            return response
     
-    except Exception as e:
+        except QueueFullError as e:
+            raise _queue_full(e)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Prediction failed: {str(e)}"
+            )
+    finally:
+        artifacts.release()
+
+
+@router.post(
+    "/predict/batch", response_model=BatchPredictionResponse, response_model_exclude_none=True,
+    status_code=status.HTTP_200_OK
+)
+async def predict_batch(
+    records: list[Any],
+    probabilities: bool = False,
+    top_k: Optional[int] = Query(None, ge=1),
+    profile: Optional[str] = None,
+) -> BatchPredictionResponse:
+    """
+    Perform model inference on a batch of census records in a single pass.
+
+    Every record is validated on its own so that one bad item, including one that is
+    not a JSON object, does not reject the whole batch. Valid records are encoded into
+    one feature matrix and scored with a single call to the model; predictions are
+    returned in input order, with None at the positions of records that failed
+    validation.
+
+    Args:
+        records: List of census data records
+        probabilities: Also return the class probabilities and calibrated confidence of
+            every prediction, from the same model pass
+        top_k: Only return the k most likely classes; implies probabilities
+        profile: Decide with the threshold of this decision profile (see /profiles)
+
+    Returns:
+        BatchPredictionResponse: Predictions in input order and per-item errors
+
+    Raises:
+        HTTPException: If the batch has more than MAX_BATCH_RECORDS records, the model
+            is not ready, the profile is unknown or an error occurs during prediction
+    """
+    if len(records) > MAX_BATCH_RECORDS:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Prediction failed: {str(e)}"
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"A batch may hold at most {MAX_BATCH_RECORDS} records; use /predict/stream for larger inputs"
         )
+    artifacts = _get_artifacts(hold=True)
+    try:
+        _check_profile(artifacts, profile)
+
+        valid_records = []
+        valid_indices = []
+        errors = []
+        for index, record in enumerate(records):
+            try:
+                valid_records.append(CensusData.model_validate(record))
+                valid_indices.append(index)
+            except ValidationError as e:
+                errors.append(BatchItemError(
+                    index=index,
+                    detail=e.errors(include_url=False, include_context=False, include_input=False)
+                ))
+
+        with_probabilities = probabilities or top_k is not None
+        response = BatchPredictionResponse(
+            predictions=[None] * len(records), errors=errors, model_version=artifacts.version, profile=profile,
+            probabilities=[None] * len(records) if with_probabilities else None,
+            confidences=[None] * len(records) if with_probabilities else None,
+        )
+        if not valid_records:
+            return response
+
+        try:
+            scored_records = await artifacts.executor.run(valid_records)
+        except QueueFullError as e:
+            raise _queue_full(e)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Batch prediction failed: {str(e)}"
+            )
+
+        for index, scored in zip(valid_indices, scored_records):
+            if profile is not None:
+                scored = artifacts.apply_profile(scored, profile)
+            response.predictions[index] = scored.label
+            if with_probabilities:
+                response.probabilities[index] = _class_probabilities(artifacts, scored, top_k)
+                response.confidences[index] = scored.confidence
+
+        return response
+    finally:
+        artifacts.release()
+
+
+@router.post("/predict/stream", status_code=status.HTTP_200_OK)
+async def predict_stream(
+    request: Request,
+    probabilities: bool = False,
+    top_k: Optional[int] = Query(None, ge=1),
+    profile: Optional[str] = None,
+) -> DuplexStreamingResponse:
+    """
+    Score newline-delimited JSON census records as they arrive and stream NDJSON back.
+
+    The request body is read incrementally and scored in chunks of STREAM_CHUNK_SIZE
+    records, so memory use is bounded regardless of the input size. Each output line is
+    either {"index", "prediction", "model_version"} or {"index", "detail"} for a record
+    that failed validation, was longer than MAX_LINE_BYTES or could not be scored, in
+    input order; one bad line or chunk does not end the stream. The whole stream is scored by the model
+    version that was active when it started. With probabilities (or top_k), prediction
+    lines also carry "probabilities" and "confidence".
+
+    Args:
+        request: Request whose body is NDJSON CensusData records
+        probabilities: Also return the class probabilities and calibrated confidence of
+            every prediction, from the same model pass
+        top_k: Only return the k most likely classes; implies probabilities
+        profile: Decide with the threshold of this decision profile (see /profiles)
+
+    Returns:
+        DuplexStreamingResponse: NDJSON predictions
+
+    Raises:
+        HTTPException: If the model is not ready or the profile is unknown
+    """
+    # Held until the stream ends, so a reload cannot shut down the executor scoring it
+    artifacts = _get_artifacts(hold=True)
+    try:
+        _check_profile(artifacts, profile)
+    except HTTPException:
+        artifacts.release()
+        raise
+    with_probabilities = probabilities or top_k is not None
+
+    async def score_chunk(entries: list) -> bytes:
+        """Score one chunk of (index, record or validation error) and serialize it."""
+        records = [entry for _, entry in entries if isinstance(entry, CensusData)]
+        # Wait for a free slot rather than fail mid-stream; this also slows down reading
+        try:
+            scored_records = iter(await artifacts.executor.run(records, wait=True) if records else [])
+            failure = None
+        except Exception as e:
+            failure = [{"type": "prediction_failed", "loc": [], "msg": f"Prediction failed: {str(e)}"}]
+        lines = []
+        for index, entry in entries:
+            if isinstance(entry, CensusData) and failure is not None:
+                line = {"index": index, "detail": failure}
+            elif isinstance(entry, CensusData):
+                scored = next(scored_records)
+                if profile is not None:
+                    scored = artifacts.apply_profile(scored, profile)
+                line = {"index": index, "prediction": scored.label, "model_version": artifacts.version}
+                if with_probabilities:
+                    line["probabilities"] = [
+                        item.model_dump() for item in _class_probabilities(artifacts, scored, top_k)
+                    ]
+                    line["confidence"] = scored.confidence
+            else:
+                line = {"index": index, "detail": entry}
+            lines.append(json.dumps(line))
+        return ("\n".join(lines) + "\n").encode()
+
+    async def generate():
+        try:
+            entries = []
+            index = 0
+            async for line in iter_lines(request.stream(), skip_long_lines=True):
+                try:
+                    if isinstance(line, LineTooLongError):
+                        entries.append((index, [{"type": "line_too_long", "loc": [], "msg": str(line)}]))
+                    else:
+                        entries.append((index, CensusData.model_validate_json(line)))
+                except ValidationError as e:
+                    entries.append((index, e.errors(include_url=False, include_context=False, include_input=False)))
+                index += 1
+
+                if len(entries) >= STREAM_CHUNK_SIZE:
+                    yield await score_chunk(entries)
+                    entries = []
+
+            if entries:
+                yield await score_chunk(entries)
+        finally:
+            artifacts.release()
+
+    return DuplexStreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,86 @@
+"""
+Helpers for streaming newline-delimited JSON in and out of the API.
+"""
+from typing import AsyncIterable, AsyncIterator, Union
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+# Longest input line accepted, so a missing newline cannot grow the buffer without bound
+MAX_LINE_BYTES = 1 << 20
+
+
+class LineTooLongError(ValueError):
+    """Raised when an NDJSON line exceeds MAX_LINE_BYTES."""
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator reads the request body while it is streaming.
+
+    StreamingResponse normally listens on `receive` for client disconnects while the
+    body streams (on servers older than ASGI spec 2.4), which would swallow request
+    body chunks that the body iterator still needs. Here the body iterator owns
+    `receive`; a disconnect surfaces as ClientDisconnect from request.stream().
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes],
+    max_line_bytes: int = MAX_LINE_BYTES,
+    skip_long_lines: bool = False,
+) -> AsyncIterator[Union[bytes, LineTooLongError]]:
+    """
+    Split a byte stream into non-empty lines without buffering more than one line.
+
+    Args:
+        chunks: Byte chunks as they arrive, e.g. request.stream()
+        max_line_bytes: Longest line accepted
+        skip_long_lines: Instead of raising, yield a LineTooLongError in place of each
+            overlong line, discard the line up to its terminator and carry on
+
+    Yields:
+        bytes: Each non-blank line, without its line terminator, or LineTooLongError
+            for an overlong line when skip_long_lines is set
+
+    Raises:
+        LineTooLongError: If a line is longer than max_line_bytes and skip_long_lines
+            is not set
+    """
+    error = LineTooLongError(f"NDJSON line longer than {max_line_bytes} bytes")
+    buffer = b""
+    # Inside an overlong line whose start was already reported
+    discarding = False
+    async for chunk in chunks:
+        if discarding:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                continue
+            chunk, discarding = chunk[newline + 1:], False
+
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if len(line) > max_line_bytes:
+                if not skip_long_lines:
+                    raise error
+                yield error
+            elif line.strip():
+                yield line
+        if len(buffer) > max_line_bytes:
+            if not skip_long_lines:
+                raise error
+            yield error
+            buffer, discarding = b"", True
+
+    if buffer.strip():
+        yield buffer
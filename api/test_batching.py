@@ -0,0 +1,108 @@
+"""
+Unit tests for the micro-batching scheduler.
+"""
+import asyncio
+import gc
+
+import pytest
+
+from api.batching import MicroBatcher
+
+
+def test_concurrent_requests_share_one_model_call():
+    """Test that concurrent submissions are scored together and resolved in order."""
+    calls = []
+
+    def predict_fn(records):
+        calls.append(list(records))
+        return [record * 10 for record in records]
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=64, max_wait=0.01)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+
+    results = asyncio.run(run())
+
+    assert results == [i * 10 for i in range(20)]
+    assert calls == [list(range(20))]
+
+
+def test_max_batch_size_splits_batches():
+    """Test that a full batch is flushed without waiting for the window."""
+    calls = []
+
+    def predict_fn(records):
+        calls.append(len(records))
+        return records
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait=10.0)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(8))), timeout=5.0
+        )
+
+    assert asyncio.run(run()) == list(range(8))
+    assert calls == [4, 4]
+
+
+def test_batch_error_propagates_to_every_request():
+    """Test that a failing model call fails every request in its batch."""
+    def predict_fn(records):
+        raise RuntimeError("model exploded")
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_wait=0.001)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_invalid_batch_size():
+    """Test that a batch size below one is rejected."""
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda records: records, max_batch_size=0)
+
+
+def test_flushed_batches_are_held_until_done():
+    """Test that a batch being scored is referenced by the batcher, and close() waits for it."""
+    release = None
+
+    async def predict_fn(records):
+        await release.wait()
+        return records
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        batcher = MicroBatcher(predict_fn, max_batch_size=2, max_wait=10)
+        submitted = [asyncio.ensure_future(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        # One full batch is scoring and one record is still waiting for its window
+        assert len(batcher._tasks) == 1
+        gc.collect()
+        release.set()
+        await batcher.close()
+        assert not batcher._tasks
+        return await asyncio.gather(*submitted)
+
+    assert asyncio.run(run()) == [0, 1, 2]
+
+
+def test_close_can_cancel_batches_being_scored():
+    """Test that cancelling on close resolves the waiting requests instead of leaving them hanging."""
+
+    async def predict_fn(records):
+        await asyncio.sleep(10)
+        return records
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=1)
+        submitted = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0)
+        await batcher.close(cancel=True)
+        with pytest.raises(asyncio.CancelledError):
+            await submitted
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
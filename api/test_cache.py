@@ -0,0 +1,57 @@
+"""
+Unit tests for the prediction cache.
+"""
+import time
+
+from api.cache import PredictionCache, record_key
+from api.utils import CensusData
+
+EXAMPLE = CensusData.model_config["json_schema_extra"]["example"]
+
+
+def test_record_key_is_canonical():
+    """Test that equal records share a key regardless of input order and aliases."""
+    reordered = dict(reversed(list(EXAMPLE.items())))
+    by_name = {**EXAMPLE, "age": "39"}
+
+    assert record_key(CensusData(**EXAMPLE)) == record_key(CensusData(**reordered))
+    assert record_key(CensusData(**EXAMPLE)) == record_key(CensusData(**by_name))
+    assert record_key(CensusData(**EXAMPLE)) != record_key(CensusData(**{**EXAMPLE, "age": 40}))
+
+
+def test_lru_eviction_and_counters():
+    """Test that the least recently used entry is evicted and counters are kept."""
+    cache = PredictionCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+
+
+def test_ttl_expires_entries():
+    """Test that entries older than the TTL are treated as misses."""
+    cache = PredictionCache(max_size=10, ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_zero_size_disables_cache():
+    """Test that a cache of size 0 never stores anything."""
+    cache = PredictionCache(max_size=0)
+    cache.put("a", 1)
+
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,85 @@
+"""
+Unit tests for the serving-layer encoder.
+"""
+import pickle
+import os
+
+import numpy as np
+import pandas as pd
+
+from api.encoding import CompiledEncoder
+from api.utils import CensusData
+from starter.ml.data import process_data
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "model")
+
+CAT_FEATURES = [
+    "workclass",
+    "education",
+    "marital-status",
+    "occupation",
+    "relationship",
+    "race",
+    "sex",
+    "native-country",
+]
+
+with open(os.path.join(MODEL_PATH, "encoder.pkl"), "rb") as f:
+    encoder = pickle.load(f)
+
+
+def _records():
+    example = CensusData.model_config["json_schema_extra"]["example"]
+    return [
+        CensusData(**example),
+        CensusData(**{**example, "workclass": "Private", "sex": "Female", "age": 52}),
+        # Unknown category must encode to an all-zero block, like handle_unknown="ignore"
+        CensusData(**{**example, "native-country": "Atlantis"}),
+    ]
+
+
+def test_compiled_encoder_matches_process_data():
+    """Test that the compiled encoder reproduces process_data output exactly."""
+    records = _records()
+    df = pd.DataFrame([r.model_dump(by_alias=True) for r in records])
+    expected, _, _, _ = process_data(
+        df, categorical_features=CAT_FEATURES, label=None, training=False, encoder=encoder
+    )
+
+    X = CompiledEncoder(encoder, CAT_FEATURES).transform(records)
+
+    assert X.shape == expected.shape
+    assert X.dtype == np.float64
+    np.testing.assert_array_equal(X, expected)
+
+
+def test_compiled_encoder_reuses_preallocated_output():
+    """Test that a preallocated output array is cleared and filled in place."""
+    compiled = CompiledEncoder(encoder, CAT_FEATURES)
+    records = _records()
+    out = np.full((len(records), compiled.n_features), 7.0)
+
+    X = compiled.transform(records, out=out)
+
+    assert X is out
+    np.testing.assert_array_equal(X, compiled.transform(records))
+
+
+def test_compiled_encoder_matches_process_data_ordinal():
+    """Test that the compiled encoder reproduces the ordinal layout, including unknowns."""
+    records = _records()
+    df = pd.DataFrame([r.model_dump(by_alias=True) for r in records])
+    _, _, ordinal_encoder, _ = process_data(
+        df.iloc[:2].assign(salary=["<=50K", ">50K"]),
+        categorical_features=CAT_FEATURES, label="salary", training=True, encoding="ordinal"
+    )
+    expected, _, _, _ = process_data(
+        df, categorical_features=CAT_FEATURES, label=None, training=False, encoder=ordinal_encoder
+    )
+
+    X = CompiledEncoder(ordinal_encoder, CAT_FEATURES).transform(records)
+
+    assert X.shape == (3, 6 + len(CAT_FEATURES))
+    np.testing.assert_array_equal(X, expected)
+    # "Atlantis" was not seen when fitting
+    assert X[2, -1] == -1
@@ -0,0 +1,99 @@
+"""
+Unit tests for the inference executor.
+"""
+import asyncio
+import os
+import threading
+
+import pytest
+
+from api.executor import InferenceExecutor, QueueFullError
+
+
+class PidArtifacts:
+    """Stand-in for ModelArtifacts that reports the process it runs in."""
+
+    version = "v1"
+
+    def score(self, records):
+        return [(record, os.getpid()) for record in records]
+
+
+def _load_pid_artifacts():
+    return PidArtifacts()
+
+
+def test_thread_executor_runs_off_the_event_loop():
+    """Test that the thread backend scores in a worker thread and keeps order."""
+    def predict_fn(records):
+        return [(record, threading.current_thread().name) for record in records]
+
+    executor = InferenceExecutor(predict_fn, kind="thread", workers=2)
+    results = asyncio.run(executor.run([1, 2, 3]))
+    executor.close()
+
+    assert [record for record, _ in results] == [1, 2, 3]
+    assert all(name.startswith("inference") for _, name in results)
+
+
+def test_full_queue_rejects_or_waits():
+    """Test that calls beyond max_queue raise QueueFullError unless asked to wait."""
+    release = threading.Event()
+
+    def predict_fn(records):
+        release.wait(timeout=5)
+        return records
+
+    async def run():
+        executor = InferenceExecutor(predict_fn, kind="thread", workers=1, max_queue=1)
+        first = asyncio.ensure_future(executor.run(["a"]))
+        await asyncio.sleep(0.05)
+        assert executor.pending == 1
+
+        with pytest.raises(QueueFullError):
+            await executor.run(["b"])
+
+        waiting = asyncio.ensure_future(executor.run(["c"], wait=True))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        release.set()
+        return await first, await waiting
+
+    assert asyncio.run(run()) == (["a"], ["c"])
+
+
+def test_closed_executor_keeps_pool_while_held():
+    """Test that a closed executor keeps scoring off the loop until its last holder releases it."""
+    executor = InferenceExecutor(lambda records: [threading.current_thread().name], kind="thread")
+    executor.acquire()
+    executor.close()
+
+    assert asyncio.run(executor.run([1]))[0].startswith("inference")
+
+    executor.release()
+    with pytest.raises(RuntimeError):
+        asyncio.run(executor.run([1]))
+    with pytest.raises(RuntimeError):
+        executor.acquire()
+
+
+def test_process_executor_scores_in_preloaded_workers():
+    """Test that the process backend loads the model in worker processes once."""
+    executor = InferenceExecutor(
+        PidArtifacts().score, kind="process", workers=2, worker_loader=_load_pid_artifacts, version="v1"
+    )
+    try:
+        executor.start()
+        results = asyncio.run(executor.run(["x", "y"]))
+    finally:
+        executor.close()
+
+    assert [record for record, _ in results] == ["x", "y"]
+    assert results[0][1] != os.getpid()
+
+
+def test_unknown_executor_kind():
+    """Test that an unknown backend is rejected."""
+    with pytest.raises(ValueError):
+        InferenceExecutor(lambda records: records, kind="gpu")
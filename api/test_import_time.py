@@ -0,0 +1,82 @@
+"""
+Import-time benchmark for the serving runtime.
+
+Each check runs in a fresh interpreter with `python -X importtime`, so modules already
+imported by the test session do not hide the real cold-start cost.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pandas as pd
+
+from api.router import CAT_FEATURES
+from api.utils import CensusData
+from starter.ml.bundle import save_bundle
+from starter.ml.data import process_data
+from starter.ml.model import train_model
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+# Modules only needed for training; serving must not import them
+TRAINING_MODULES = ("pandas", "sklearn", "scipy")
+
+# Generous ceiling on the cumulative import time of api.router, in milliseconds
+IMPORT_BUDGET_MS = float(os.environ.get("CENSUS_IMPORT_BUDGET_MS", "2000"))
+
+
+def _import_times(code):
+    """Run code in a fresh interpreter and return {module: cumulative import time in us}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_router_import_skips_training_stack():
+    """Test that importing the API does not load the training libraries and stays within budget."""
+    times = _import_times("import api.router")
+
+    slowest = sorted(times.items(), key=lambda item: -item[1])[:10]
+    print("\n".join(f"{us / 1000:8.1f} ms  {name}" for name, us in slowest))
+
+    assert not [name for name in times if name.split(".")[0] in TRAINING_MODULES]
+    assert times["api.router"] / 1000 < IMPORT_BUDGET_MS
+
+
+def test_bundle_serving_skips_training_stack(tmp_path):
+    """Test that loading and scoring a model bundle does not import sklearn or pandas."""
+    example = CensusData.model_config["json_schema_extra"]["example"]
+    data = pd.DataFrame([example] * 20)
+    data["salary"] = np.where(np.arange(20) % 2, ">50K", "<=50K")
+    data.loc[data["salary"] == ">50K", "age"] = 60
+    X, y, encoder, lb = process_data(data, categorical_features=CAT_FEATURES, label="salary", training=True)
+    model = train_model(X, y, {"n_estimators": 3, "random_state": 42})
+    feature_order = [c for c in data.columns if c != "salary" and c not in CAT_FEATURES] + CAT_FEATURES
+    save_bundle(str(tmp_path / "bundle"), model, encoder, lb, CAT_FEATURES, feature_order)
+
+    code = textwrap.dedent(f"""
+        import sys
+        from api.registry import load_artifacts
+        from api.router import CAT_FEATURES
+        from api.utils import CensusData
+        from starter.ml.bundle import bundle_version
+        artifacts = load_artifacts({str(tmp_path)!r}, "bundle", CAT_FEATURES)
+        example = CensusData.model_config["json_schema_extra"]["example"]
+        assert artifacts.predict([CensusData(**example)])[0] in ("<=50K", ">50K")
+        assert artifacts.version == bundle_version({str(tmp_path / "bundle")!r})
+        loaded = [name for name in sys.modules if name.split(".")[0] in {TRAINING_MODULES!r}]
+        assert not loaded, loaded
+    """)
+    times = _import_times(code)
+
+    assert "api.router" in times
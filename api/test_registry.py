@@ -0,0 +1,223 @@
+"""
+Unit tests for the versioned model registry.
+"""
+import asyncio
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse
+from sklearn.ensemble import RandomForestClassifier
+
+from api.registry import ModelNotReadyError, ModelRegistry, artifact_version, load_artifacts, load_predictor
+from api.router import CAT_FEATURES, MODEL_PATH
+from api.utils import CensusData
+from starter.ml.calibration import calibrate
+from starter.ml.compiled import CompiledForest
+from starter.ml.compression import drop_trees
+from starter.ml.data import process_data
+from starter.ml.model import inference, train_model
+
+
+class FakeArtifacts:
+    """Stand-in for ModelArtifacts that only carries a version."""
+
+    def __init__(self, version):
+        self.version = version
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _versioned_loader(versions):
+    """Return a loader producing FakeArtifacts with the given versions, in order."""
+    versions = iter(versions)
+
+    def loader():
+        version = next(versions)
+        if isinstance(version, Exception):
+            raise version
+        return FakeArtifacts(version)
+
+    return loader
+
+
+def test_registry_loads_in_background():
+    """Test that start() loads the first version and get() fails before that."""
+    registry = ModelRegistry(_versioned_loader(["v1"]))
+    with pytest.raises(ModelNotReadyError):
+        registry.get()
+
+    registry.start()
+
+    assert registry.wait(timeout=5)
+    assert registry.state == "ready"
+    assert registry.version == "v1"
+
+
+def test_reload_swaps_version_and_keeps_old_references():
+    """Test that reload activates a new version while held artifacts stay on the old one."""
+    registry = ModelRegistry(_versioned_loader(["v1", "v2"]))
+    registry.start()
+    registry.wait(timeout=5)
+    in_flight = registry.get()
+
+    registry.reload()
+
+    assert in_flight.version == "v1"
+    assert registry.get().version == "v2"
+
+
+def test_failed_reload_keeps_active_version():
+    """Test that a failing reload raises, records the error and keeps serving."""
+    registry = ModelRegistry(_versioned_loader(["v1", ValueError("corrupt artifact")]))
+    registry.start()
+    registry.wait(timeout=5)
+
+    with pytest.raises(ValueError):
+        registry.reload()
+
+    assert registry.state == "ready"
+    assert registry.version == "v1"
+    assert registry.error == "corrupt artifact"
+
+
+def test_failed_first_load():
+    """Test that a failing first load puts the registry in the failed state."""
+    registry = ModelRegistry(_versioned_loader([FileNotFoundError("model.pkl")]))
+    registry.start()
+
+    assert not registry.wait(timeout=5)
+    assert registry.state == "failed"
+    with pytest.raises(ModelNotReadyError):
+        registry.get()
+
+
+def test_watcher_reloads_once_fingerprint_settles():
+    """Test that the watcher reloads after the fingerprint changes and stays stable."""
+    reloaded = threading.Event()
+    versions = iter(["v1", "v2"])
+
+    def loader():
+        artifacts = FakeArtifacts(next(versions))
+        if artifacts.version == "v2":
+            reloaded.set()
+        return artifacts
+
+    fingerprint = {"value": 1}
+    registry = ModelRegistry(loader)
+    registry.start()
+    registry.wait(timeout=5)
+    registry.watch(lambda: fingerprint["value"], interval=0.01)
+
+    fingerprint["value"] = 2
+    try:
+        assert reloaded.wait(timeout=5)
+    finally:
+        registry.stop()
+    assert registry.version == "v2"
+
+
+def test_load_predictor_variants(tmp_path):
+    """Test that the compressed variant is loaded from its own files by every predictor kind."""
+    X = np.random.RandomState(0).rand(50, 3)
+    model = RandomForestClassifier(n_estimators=4, random_state=0).fit(X, X[:, 0] > 0.5)
+    variants = {"full": model, "compressed": drop_trees(model, 1)}
+    for name, pickle_name, compiled_name in [
+        ("full", "model.pkl", "compiled_model"),
+        ("compressed", "model_compressed.pkl", "compiled_model_compressed"),
+    ]:
+        with open(tmp_path / pickle_name, "wb") as f:
+            pickle.dump(variants[name], f)
+        CompiledForest.from_model(variants[name]).save(str(tmp_path / compiled_name))
+    for name in ("encoder.pkl", "lb.pkl"):
+        (tmp_path / name).write_bytes(b"")
+
+    assert len(load_predictor(str(tmp_path), "sklearn", "compressed").estimators_) == 1
+    assert len(load_predictor(str(tmp_path), "compiled", "compressed").roots) == 1
+    assert len(load_predictor(str(tmp_path), "mmap", "compressed").roots) == 1
+    assert len(load_predictor(str(tmp_path), "mmap").roots) == 4
+    assert artifact_version(str(tmp_path), "sklearn", "compressed") != artifact_version(str(tmp_path), "sklearn")
+    with pytest.raises(ValueError):
+        load_predictor(str(tmp_path), "sklearn", "tiny")
+
+
+def test_sparse_trained_model_serves_like_csr_inference(tmp_path):
+    """Test that a model trained on sparse features is served with the predictions of inference on the CSR matrix."""
+    example = CensusData.model_config["json_schema_extra"]["example"]
+    rng = np.random.RandomState(0)
+    data = pd.DataFrame([example] * 40)
+    data["age"] = rng.randint(18, 80, size=40)
+    data["hours-per-week"] = rng.randint(10, 60, size=40)
+    data["sex"] = np.where(np.arange(40) % 3, "Male", "Female")
+    data["workclass"] = np.where(np.arange(40) % 4, "Private", "State-gov")
+    data["salary"] = np.where(data["age"] + data["hours-per-week"] > 80, ">50K", "<=50K")
+    X, y, encoder, lb = process_data(data, CAT_FEATURES, label="salary", training=True, sparse=True)
+    model = train_model(X, y, {"n_estimators": 5, "random_state": 0})
+    for name, obj in [("model.pkl", model), ("encoder.pkl", encoder), ("lb.pkl", lb)]:
+        with open(tmp_path / name, "wb") as f:
+            pickle.dump(obj, f)
+    CompiledForest.from_model(model).save(str(tmp_path / "compiled_model"))
+
+    records = [CensusData(**row) for row in data.drop(columns="salary").to_dict("records")]
+    X_csr, _, _, _ = process_data(
+        data.drop(columns="salary"), CAT_FEATURES, label=None, training=False, encoder=encoder
+    )
+    assert scipy.sparse.issparse(X_csr)
+    expected = list(lb.inverse_transform(inference(model, X_csr)))
+
+    for kind in ("sklearn", "compiled"):
+        artifacts = load_artifacts(str(tmp_path), kind, CAT_FEATURES, executor="inline")
+        assert artifacts.predict(records) == expected
+        np.testing.assert_allclose(
+            [scored.probabilities for scored in artifacts.score(records)], model.predict_proba(X_csr)
+        )
+        artifacts.close()
+
+
+def test_score_returns_probabilities_and_calibrated_confidence():
+    """Test that scoring yields the predicted label, its probabilities and a calibrated confidence."""
+    artifacts = load_artifacts(MODEL_PATH, "sklearn", CAT_FEATURES, executor="inline")
+    example = CensusData(**CensusData.model_config["json_schema_extra"]["example"])
+
+    artifacts.calibration = None
+    scored = artifacts.score([example])[0]
+    assert scored.label == artifacts.predict([example])[0]
+    assert artifacts.class_labels[int(np.argmax(scored.probabilities))] == scored.label
+    assert scored.confidence == max(scored.probabilities)
+
+    # The label, probabilities and confidence all follow the calibrated probability
+    artifacts.calibration = {"method": "platt", "a": 8.0, "b": -5.0}
+    positive = calibrate(artifacts.calibration, scored.probabilities[1])
+    calibrated = artifacts.score([example])[0]
+    assert calibrated.probabilities == pytest.approx((1 - positive, positive))
+    assert calibrated.label == artifacts.class_labels[int(positive >= 0.5)]
+    assert calibrated.confidence == pytest.approx(max(positive, 1 - positive))
+
+    # A calibration that moves the probability across one half flips the label with it
+    for b, label in [(5.0, artifacts.class_labels[1]), (-5.0, artifacts.class_labels[0])]:
+        artifacts.calibration = {"method": "platt", "a": 0.0, "b": b}
+        calibrated = artifacts.score([example])[0]
+        assert calibrated.label == label and artifacts.predict([example])[0] == label
+        assert calibrated.confidence > 0.5
+
+
+def test_held_version_keeps_its_executor_across_reload():
+    """Test that a version held by a request keeps scoring in its pool after a reload replaces it."""
+    registry = ModelRegistry(lambda: load_artifacts(MODEL_PATH, "sklearn", CAT_FEATURES))
+    registry.reload()
+    example = CensusData(**CensusData.model_config["json_schema_extra"]["example"])
+
+    held = registry.acquire()
+    registry.reload()
+    try:
+        assert registry.get() is not held
+        assert len(asyncio.run(held.executor.run([example]))) == 1
+        assert held.executor._pool is not None
+    finally:
+        held.release()
+        registry.stop()
+    assert held.executor._pool is None
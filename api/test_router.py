@@ -1,9 +1,18 @@
 """
 Unit tests for the API router endpoints.
 """
+import asyncio
+import json
+import threading
+
+import pytest
+
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
-from api.router import router
+import api.router
+from api.router import router, registry
+from api.registry import ModelRegistry
+from api.streaming import MAX_LINE_BYTES
 
 # Create a test app
 app = FastAPI()
@@ -12,6 +21,14 @@ app.include_router(router)
 # Create test client
 client = TestClient(app)
 
+# Token the admin tests enable /admin/reload with
+ADMIN_TOKEN = "test-admin-token"
+ADMIN_HEADERS = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+
+# Models load in the background; wait for them before exercising /predict
+registry.start()
+assert registry.wait(timeout=60), registry.error
+
 
 def test_get_root():
     """
@@ -102,6 +119,8 @@ def test_post_predict_above_50k():
     assert isinstance(response_json["prediction"], str)
     # This profile should predict >50K
     assert response_json["prediction"] == ">50K"
+    # The version that served the request is reported
+    assert response_json["model_version"] == registry.version
 
 
 def test_post_predict_malformed_data():
@@ -124,3 +143,396 @@ def test_post_predict_malformed_data():
     # Test response contains error detail
     response_json = response.json()
     assert "detail" in response_json
+
+
+def test_post_predict_batch_preserves_order():
+    """
+    Test POST request on the batch endpoint with a mix of valid and invalid records.
+    Tests that predictions come back in input order and invalid items are reported.
+    """
+    below_50k = {
+        "age": 19,
+        "workclass": "Private",
+        "fnlgt": 226802,
+        "education": "HS-grad",
+        "education-num": 9,
+        "marital-status": "Never-married",
+        "occupation": "Handlers-cleaners",
+        "relationship": "Own-child",
+        "race": "White",
+        "sex": "Male",
+        "capital-gain": 0,
+        "capital-loss": 0,
+        "hours-per-week": 25,
+        "native-country": "United-States"
+    }
+    above_50k = {
+        "age": 52,
+        "workclass": "Self-emp-not-inc",
+        "fnlgt": 209642,
+        "education": "Doctorate",
+        "education-num": 16,
+        "marital-status": "Married-civ-spouse",
+        "occupation": "Prof-specialty",
+        "relationship": "Husband",
+        "race": "White",
+        "sex": "Male",
+        "capital-gain": 15024,
+        "capital-loss": 0,
+        "hours-per-week": 60,
+        "native-country": "United-States"
+    }
+    malformed = {"age": 30, "workclass": "Private"}
+
+    response = client.post("/predict/batch", json=[above_50k, malformed, below_50k])
+
+    # Test status code - a bad item does not reject the whole batch
+    assert response.status_code == 200
+
+    # Test response content
+    response_json = response.json()
+    assert response_json["predictions"] == [">50K", None, "<=50K"]
+    assert len(response_json["errors"]) == 1
+    assert response_json["errors"][0]["index"] == 1
+    assert len(response_json["errors"][0]["detail"]) > 0
+
+
+def test_post_predict_batch_empty():
+    """
+    Test POST request on the batch endpoint with an empty list.
+    Tests that an empty batch returns empty predictions without calling the model.
+    """
+    response = client.post("/predict/batch", json=[])
+
+    assert response.status_code == 200
+    response_json = response.json()
+    assert response_json["predictions"] == []
+    assert response_json["errors"] == []
+
+
+def test_post_predict_batch_reports_non_object_items():
+    """
+    Test POST request on the batch endpoint with items that are not JSON objects.
+    Tests that each such item is reported on its own and the other records are scored.
+    """
+    record = {
+        "age": 52,
+        "workclass": "Self-emp-not-inc",
+        "fnlgt": 209642,
+        "education": "Doctorate",
+        "education-num": 16,
+        "marital-status": "Married-civ-spouse",
+        "occupation": "Prof-specialty",
+        "relationship": "Husband",
+        "race": "White",
+        "sex": "Male",
+        "capital-gain": 15024,
+        "capital-loss": 0,
+        "hours-per-week": 60,
+        "native-country": "United-States"
+    }
+
+    response = client.post("/predict/batch", json=[5, record, "text", None])
+
+    assert response.status_code == 200
+    response_json = response.json()
+    assert response_json["predictions"] == [None, ">50K", None, None]
+    assert [error["index"] for error in response_json["errors"]] == [0, 2, 3]
+    assert all(error["detail"][0]["type"] == "model_type" for error in response_json["errors"])
+
+
+def test_post_predict_batch_too_large(monkeypatch):
+    """
+    Test POST request on the batch endpoint with more records than allowed.
+    Tests that the batch is rejected with 413 before any record is validated.
+    """
+    monkeypatch.setattr(api.router, "MAX_BATCH_RECORDS", 2)
+
+    assert client.post("/predict/batch", json=[{}, {}]).status_code == 200
+
+    response = client.post("/predict/batch", json=[{}, {}, {}])
+    assert response.status_code == 413
+    assert "/predict/stream" in response.json()["detail"]
+
+
+def test_health_live_and_ready():
+    """
+    Test the liveness and readiness probes once the model has loaded.
+    """
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+
+
+def test_predict_returns_503_while_model_loading(monkeypatch):
+    """
+    Test that /predict and /health/ready return 503 with Retry-After until the model is ready.
+    """
+    release = threading.Event()
+    loading = ModelRegistry(lambda: release.wait())
+    monkeypatch.setattr(api.router, "registry", loading)
+
+    try:
+        response = client.post("/predict", json={
+            "age": 39, "workclass": "State-gov", "fnlgt": 77516, "education": "Bachelors",
+            "education-num": 13, "marital-status": "Never-married", "occupation": "Adm-clerical",
+            "relationship": "Not-in-family", "race": "White", "sex": "Male", "capital-gain": 2174,
+            "capital-loss": 0, "hours-per-week": 40, "native-country": "United-States"
+        })
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "loading"
+        assert "Retry-After" in response.headers
+
+        # Liveness does not depend on the model
+        assert client.get("/health/live").status_code == 200
+    finally:
+        release.set()
+
+
+def test_admin_reload_reports_active_version(monkeypatch):
+    """
+    Test that the admin reload endpoint reloads the artifacts and reports their version.
+    """
+    monkeypatch.setattr(api.router, "ADMIN_TOKEN", ADMIN_TOKEN)
+    response = client.post("/admin/reload", headers=ADMIN_HEADERS)
+
+    assert response.status_code == 200
+    assert response.json()["model_version"] == registry.version
+    assert client.get("/health/ready").status_code == 200
+
+
+def test_admin_reload_requires_token_and_runs_once(monkeypatch):
+    """
+    Test that /admin/reload is disabled without a configured token, rejects wrong tokens
+    and answers 409 while another reload is running.
+    """
+    monkeypatch.setattr(api.router, "ADMIN_TOKEN", None)
+    assert client.post("/admin/reload", headers=ADMIN_HEADERS).status_code == 404
+
+    monkeypatch.setattr(api.router, "ADMIN_TOKEN", ADMIN_TOKEN)
+    assert client.post("/admin/reload").status_code == 401
+    assert client.post("/admin/reload", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    registry._reload_lock.acquire()
+    try:
+        assert client.post("/admin/reload", headers=ADMIN_HEADERS).status_code == 409
+    finally:
+        registry._reload_lock.release()
+
+
+def test_post_predict_stream_ndjson():
+    """
+    Test POST request on the streaming endpoint with NDJSON split across body chunks.
+    Tests that predictions stream back in input order with invalid lines reported.
+    """
+    below_50k = {
+        "age": 19, "workclass": "Private", "fnlgt": 226802, "education": "HS-grad",
+        "education-num": 9, "marital-status": "Never-married", "occupation": "Handlers-cleaners",
+        "relationship": "Own-child", "race": "White", "sex": "Male", "capital-gain": 0,
+        "capital-loss": 0, "hours-per-week": 25, "native-country": "United-States"
+    }
+    above_50k = {
+        "age": 52, "workclass": "Self-emp-not-inc", "fnlgt": 209642, "education": "Doctorate",
+        "education-num": 16, "marital-status": "Married-civ-spouse", "occupation": "Prof-specialty",
+        "relationship": "Husband", "race": "White", "sex": "Male", "capital-gain": 15024,
+        "capital-loss": 0, "hours-per-week": 60, "native-country": "United-States"
+    }
+    body = "\n".join([json.dumps(below_50k), "not json", "", json.dumps(above_50k)]).encode()
+
+    def chunks():
+        # Split mid-line to exercise incremental line parsing
+        for start in range(0, len(body), 37):
+            yield body[start:start + 37]
+
+    response = client.post("/predict/stream", content=chunks(),
+                           headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert lines[0]["prediction"] == "<=50K"
+    assert "detail" in lines[1]
+    assert lines[2]["prediction"] == ">50K"
+    assert lines[2]["model_version"] == registry.version
+
+
+def test_repeated_predict_hits_cache(monkeypatch):
+    """
+    Test that repeating a /predict request is served from the cache and reported on /metrics,
+    and that reloading the model invalidates the cache.
+    """
+    data = {
+        "age": 39, "workclass": "State-gov", "fnlgt": 77516, "education": "Bachelors",
+        "education-num": 13, "marital-status": "Never-married", "occupation": "Adm-clerical",
+        "relationship": "Not-in-family", "race": "White", "sex": "Male", "capital-gain": 2174,
+        "capital-loss": 0, "hours-per-week": 40, "native-country": "United-States"
+    }
+    monkeypatch.setattr(api.router, "ADMIN_TOKEN", ADMIN_TOKEN)
+    client.post("/admin/reload", headers=ADMIN_HEADERS)
+
+    first = client.post("/predict", json=data).json()
+    second = client.post("/predict", json=data).json()
+
+    assert first == second
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    cache = response.json()["cache"]
+    assert cache["hits"] == 1
+    assert cache["misses"] == 1
+    assert cache["size"] == 1
+
+    # A new model version starts with an empty cache
+    client.post("/admin/reload", headers=ADMIN_HEADERS)
+    assert client.get("/metrics").json()["cache"]["size"] == 0
+
+
+def test_predict_returns_503_when_inference_queue_full(monkeypatch):
+    """
+    Test that /predict and /predict/batch shed load with 503 and Retry-After when the
+    inference queue is full.
+    """
+    # No free slot in the inference queue
+    monkeypatch.setattr(registry.get().executor, "_slots", asyncio.Semaphore(0))
+
+    record = {
+        "age": 41, "workclass": "Local-gov", "fnlgt": 123457, "education": "Masters",
+        "education-num": 14, "marital-status": "Divorced", "occupation": "Tech-support",
+        "relationship": "Unmarried", "race": "Asian-Pac-Islander", "sex": "Female", "capital-gain": 17,
+        "capital-loss": 0, "hours-per-week": 37, "native-country": "Canada"
+    }
+    response = client.post("/predict", json=record)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(api.router.QUEUE_RETRY_AFTER_SECONDS)
+
+    response = client.post("/predict/batch", json=[record])
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_predict_returns_probabilities_on_request():
+    """
+    Test that /predict, /predict/batch and /predict/stream add class probabilities and a
+    confidence only when asked, consistent with the predicted label.
+    """
+    record = {
+        "age": 52, "workclass": "Self-emp-not-inc", "fnlgt": 209642, "education": "Doctorate",
+        "education-num": 16, "marital-status": "Married-civ-spouse", "occupation": "Prof-specialty",
+        "relationship": "Husband", "race": "White", "sex": "Male", "capital-gain": 15024,
+        "capital-loss": 0, "hours-per-week": 60, "native-country": "United-States"
+    }
+
+    # Default responses are unchanged
+    assert "probabilities" not in client.post("/predict", json=record).json()
+
+    response_json = client.post("/predict?probabilities=true", json=record).json()
+    probabilities = response_json["probabilities"]
+    assert [item["label"] for item in probabilities] == [">50K", "<=50K"]
+    assert probabilities[0]["probability"] >= probabilities[1]["probability"]
+    assert sum(item["probability"] for item in probabilities) == pytest.approx(1.0)
+    assert 0.0 <= response_json["confidence"] <= 1.0
+
+    response_json = client.post("/predict?top_k=1", json=record).json()
+    assert [item["label"] for item in response_json["probabilities"]] == [response_json["prediction"]]
+
+    assert client.post("/predict?top_k=0", json=record).status_code == 422
+
+    response_json = client.post("/predict/batch?probabilities=true", json=[{"age": 30}, record]).json()
+    assert response_json["predictions"] == [None, ">50K"]
+    assert response_json["probabilities"][0] is None
+    assert response_json["probabilities"][1] == probabilities
+    assert response_json["confidences"][1] == pytest.approx(client.post(
+        "/predict?probabilities=true", json=record).json()["confidence"])
+
+    response = client.post("/predict/stream?top_k=1", content=json.dumps(record).encode(),
+                           headers={"Content-Type": "application/x-ndjson"})
+    line = json.loads(response.text.splitlines()[0])
+    assert line["probabilities"] == probabilities[:1]
+    assert "confidence" in line
+
+
+def test_predict_applies_decision_profile(monkeypatch):
+    """
+    Test that a decision profile sets the threshold on the shared probabilities, that
+    profiles are listed on /profiles and that unknown profiles are rejected.
+    """
+    artifacts = registry.get()
+    monkeypatch.setattr(artifacts, "decision_profiles", {
+        "everyone": {"rule": "recall:1.0", "threshold": 0.0},
+        "no_one": {"rule": "precision:1.0", "threshold": 1.5},
+    })
+    record = {
+        "age": 19, "workclass": "Private", "fnlgt": 226802, "education": "HS-grad",
+        "education-num": 9, "marital-status": "Never-married", "occupation": "Handlers-cleaners",
+        "relationship": "Own-child", "race": "White", "sex": "Male", "capital-gain": 0,
+        "capital-loss": 0, "hours-per-week": 25, "native-country": "United-States"
+    }
+
+    response = client.get("/profiles")
+    assert response.status_code == 200
+    assert set(response.json()["profiles"]) == {"everyone", "no_one"}
+
+    default = client.post("/predict?probabilities=true", json=record).json()
+    assert default["prediction"] == "<=50K"
+    assert "profile" not in default
+
+    # Served from the cached probabilities, re-decided by the profile
+    response_json = client.post("/predict?profile=everyone&probabilities=true", json=record).json()
+    assert response_json["prediction"] == ">50K"
+    assert response_json["profile"] == "everyone"
+    assert response_json["probabilities"] == default["probabilities"]
+    assert response_json["confidence"] == pytest.approx(1 - default["confidence"])
+
+    response_json = client.post("/predict/batch?profile=no_one", json=[record, record]).json()
+    assert response_json["predictions"] == ["<=50K", "<=50K"]
+    response_json = client.post("/predict/batch?profile=everyone", json=[record]).json()
+    assert response_json["predictions"] == [">50K"]
+
+    response = client.post("/predict/stream?profile=everyone", content=json.dumps(record).encode(),
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert json.loads(response.text.splitlines()[0])["prediction"] == ">50K"
+
+    response = client.post("/predict?profile=unknown", json=record)
+    assert response.status_code == 422
+    assert "everyone" in response.json()["detail"]
+    assert client.post("/predict/batch?profile=unknown", json=[record]).status_code == 422
+
+
+def test_post_predict_stream_reports_long_lines_and_failed_chunks(monkeypatch):
+    """
+    Test that an overlong line and a chunk that fails to score become error lines
+    instead of cutting the stream short.
+    """
+    record = {
+        "age": 19, "workclass": "Private", "fnlgt": 226802, "education": "HS-grad",
+        "education-num": 9, "marital-status": "Never-married", "occupation": "Handlers-cleaners",
+        "relationship": "Own-child", "race": "White", "sex": "Male", "capital-gain": 0,
+        "capital-loss": 0, "hours-per-week": 25, "native-country": "United-States"
+    }
+    body = b"\n".join([b"x" * (MAX_LINE_BYTES + 1), json.dumps(record).encode()])
+
+    response = client.post("/predict/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["index"] == 0
+    assert lines[0]["detail"][0]["type"] == "line_too_long"
+    assert lines[1] == {"index": 1, "prediction": "<=50K", "model_version": registry.version}
+
+    async def failing_run(records, wait=False):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(registry.get().executor, "run", failing_run)
+    response = client.post("/predict/stream", content=json.dumps(record).encode(),
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    line = json.loads(response.text.splitlines()[0])
+    assert line["index"] == 0
+    assert line["detail"][0]["type"] == "prediction_failed"
+    assert "model crashed" in line["detail"][0]["msg"]
@@ -0,0 +1,45 @@
+"""
+Unit tests for the NDJSON streaming helpers.
+"""
+import asyncio
+
+import pytest
+
+from api.streaming import LineTooLongError, iter_lines
+
+
+async def _collect(chunks, **kwargs):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    return [line async for line in iter_lines(stream(), **kwargs)]
+
+
+def test_iter_lines_reassembles_split_lines():
+    """Test that lines split across chunks are reassembled and blank lines skipped."""
+    chunks = [b'{"a"', b': 1}\n\n{"b": 2', b'}\r\n', b'{"c": 3}']
+
+    lines = asyncio.run(_collect(chunks))
+
+    assert [line.strip() for line in lines] == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+
+def test_iter_lines_rejects_unbounded_line():
+    """Test that a line without a terminator cannot grow the buffer past the limit."""
+    with pytest.raises(LineTooLongError):
+        asyncio.run(_collect([b"x" * 10] * 10, max_line_bytes=50))
+
+
+def test_iter_lines_skips_long_lines_and_resumes():
+    """Test that overlong lines are reported in place and the following lines still come through."""
+    chunks = [b'{"a": 1}\n' + b"x" * 30, b"x" * 30, b'x\n{"b": 2}\n', b"y" * 60 + b'\n{"c": 3}']
+
+    lines = asyncio.run(_collect(chunks, max_line_bytes=50, skip_long_lines=True))
+
+    assert lines[0] == b'{"a": 1}'
+    assert isinstance(lines[1], LineTooLongError)
+    assert lines[2] == b'{"b": 2}'
+    assert isinstance(lines[3], LineTooLongError)
+    assert lines[4] == b'{"c": 3}'
+    assert len(lines) == 5
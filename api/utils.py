@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Any, Literal, Optional
 
 
 # Pydantic model for census data input
@@ -62,6 +62,41 @@ class CensusData(BaseModel):
         }
 
 
+# Pydantic model for the probability of one class
+class ClassProbability(BaseModel):
+    label: str
+    probability: float
+
+
 # Pydantic model for prediction response
+# probabilities (most likely class first) and confidence are only set when requested
+# profile names the decision profile that set the prediction's threshold, if any
 class PredictionResponse(BaseModel):
     prediction: str
+    model_version: str
+    probabilities: Optional[list[ClassProbability]] = None
+    confidence: Optional[float] = None
+    profile: Optional[str] = None
+
+
+# Pydantic model for a record rejected by the batch endpoint
+class BatchItemError(BaseModel):
+    index: int
+    detail: list[dict[str, Any]]
+
+
+# Pydantic model for batch prediction response
+# predictions[i] is None when records[i] failed validation
+# probabilities and confidences are only set when requested, aligned with predictions
+class BatchPredictionResponse(BaseModel):
+    predictions: list[Optional[str]]
+    errors: list[BatchItemError]
+    model_version: str
+    probabilities: Optional[list[Optional[list[ClassProbability]]]] = None
+    confidences: Optional[list[Optional[float]]] = None
+    profile: Optional[str] = None
+
+
+# Pydantic model for the admin reload response
+class ReloadResponse(BaseModel):
+    model_version: str
@@ -0,0 +1,209 @@
+# Script to score a census CSV offline with the trained model.
+import argparse
+import os
+import pickle
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# own imports
+from ml.data import clean_data, process_data, read_census_csv
+from ml.model import inference
+
+CAT_FEATURES: list = [
+    "workclass",
+    "education",
+    "marital-status",
+    "occupation",
+    "relationship",
+    "race",
+    "sex",
+    "native-country",
+]
+
+# Artifacts held by each worker process, set by _init_worker
+_artifacts: dict = {}
+
+
+def _init_worker(model_path: str) -> None:
+    """
+    Load the model, encoder and label binarizer once per worker process.
+
+    Inputs
+    ------
+    model_path : str
+        Path to the directory holding the trained artifacts.
+    """
+    for name in ("model", "encoder", "lb"):
+        with open(os.path.join(model_path, f"{name}.pkl"), "rb") as f:
+            _artifacts[name] = pickle.load(f)
+
+
+def _score_chunk(chunk: pd.DataFrame, label: str) -> pd.DataFrame:
+    """
+    Clean and score one chunk of raw census rows.
+
+    Inputs
+    ------
+    chunk : pd.DataFrame
+        Raw rows as read from the input CSV.
+    label : str
+        Name of the label column to ignore if present.
+
+    Returns
+    -------
+    predictions : pd.DataFrame
+        Single "prediction" column aligned with the rows of `chunk`.
+    """
+    chunk = clean_data(chunk)
+    if label in chunk.columns:
+        chunk = chunk.drop(columns=[label])
+    # Every row gets a prediction, so missing integers are scored as NaN rather than dropped
+    integer_columns = [c for c in chunk.columns if isinstance(chunk[c].dtype, pd.Int64Dtype)]
+    chunk = chunk.astype({c: "float64" for c in integer_columns})
+
+    X, _, _, _ = process_data(
+        chunk,
+        categorical_features=CAT_FEATURES,
+        label=None,
+        training=False,
+        encoder=_artifacts["encoder"],
+        lb=_artifacts["lb"]
+    )
+    preds = inference(_artifacts["model"], X)
+    return pd.DataFrame({"prediction": _artifacts["lb"].inverse_transform(preds)}, index=chunk.index)
+
+
+class _PredictionWriter:
+    """
+    Append prediction chunks to a CSV or Parquet file, in the order they are written.
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.is_parquet = output_path.endswith((".parquet", ".pq"))
+        self._parquet_writer = None
+        self._header_written = False
+
+    def write(self, predictions: pd.DataFrame) -> None:
+        if not self.is_parquet:
+            predictions.to_csv(self.output_path, mode="a" if self._header_written else "w",
+                               header=not self._header_written, index=False)
+            self._header_written = True
+            return
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Writing Parquet output requires pyarrow: pip install pyarrow")
+
+        table = pyarrow.Table.from_pandas(predictions, preserve_index=False)
+        if self._parquet_writer is None:
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(self.output_path, table.schema)
+        self._parquet_writer.write_table(table)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_file(input_path: str, output_path: str, model_path: str, chunksize: int = 10000,
+               workers: int = 1, label: str = "salary") -> int:
+    """
+    Score a raw census CSV chunk by chunk and write the predictions in input order.
+
+    Chunks are read lazily and at most 2 * workers of them are in flight at once, so
+    memory stays bounded by the chunk size rather than the file size.
+
+    Inputs
+    ------
+    input_path : str
+        Path to the raw census CSV.
+    output_path : str
+        Path of the output file; ".parquet" or ".pq" writes Parquet, anything else CSV.
+    model_path : str
+        Path to the directory holding the trained artifacts.
+    chunksize : int
+        Number of rows per chunk.
+    workers : int
+        Number of worker processes; 1 scores in the current process.
+    label : str
+        Name of the label column to ignore if present.
+
+    Returns
+    -------
+    n_rows : int
+        Number of rows scored.
+    """
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"File not found: {input_path}")
+
+    # Parsed like the training data, so the features are encoded the same way
+    chunks = read_census_csv(input_path, chunksize=chunksize)
+    writer = _PredictionWriter(output_path)
+    n_rows = 0
+
+    try:
+        if workers <= 1:
+            _init_worker(model_path)
+            for chunk in chunks:
+                predictions = _score_chunk(chunk, label)
+                writer.write(predictions)
+                n_rows += len(predictions)
+            return n_rows
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path,)) as executor:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(executor.submit(_score_chunk, chunk, label))
+                # Write finished chunks in submission order to keep the original row order
+                while len(in_flight) >= 2 * workers:
+                    predictions = in_flight.popleft().result()
+                    writer.write(predictions)
+                    n_rows += len(predictions)
+            while in_flight:
+                predictions = in_flight.popleft().result()
+                writer.write(predictions)
+                n_rows += len(predictions)
+        return n_rows
+    finally:
+        writer.close()
+
+
+def main():
+    """
+    Main function for scoring a census CSV with the trained model.
+    """
+
+    # variables
+    script_dir: str = os.path.dirname(os.path.abspath(__file__))
+    parent_dir: str = os.path.dirname(script_dir)
+
+    parser = argparse.ArgumentParser(description="Score a census CSV with the trained model.")
+    parser.add_argument("input", help="Raw census CSV to score.")
+    parser.add_argument("output", help="Output file; .parquet/.pq writes Parquet, otherwise CSV.")
+    parser.add_argument("--model-path", default=os.path.join(parent_dir, "model"),
+                        help="Directory holding model.pkl, encoder.pkl and lb.pkl.")
+    parser.add_argument("--chunksize", type=int, default=10000, help="Rows per chunk.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes; 1 scores in the current process.")
+    parser.add_argument("--label", default="salary", help="Label column to ignore if present.")
+    args = parser.parse_args()
+
+    try:
+        print(f"INFO: Scoring {args.input} with {args.workers} worker(s)...")
+        n_rows = score_file(args.input, args.output, args.model_path,
+                            chunksize=args.chunksize, workers=args.workers, label=args.label)
+        print(f"INFO: Wrote {n_rows} predictions to {args.output}")
+
+    except Exception as e:
+        print(f"ERROR: An error occurred: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
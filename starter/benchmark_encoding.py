@@ -0,0 +1,144 @@
+# Script to compare the one-hot and ordinal categorical encodings.
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+# own imports
+from ml.data import process_data
+from ml.model import train_model, compute_model_metrics, inference
+from train_model import _load_cached_data
+
+
+def _median_latency(func, repeats: int) -> float:
+    """
+    Median wall-clock time of a function call, in milliseconds.
+
+    Inputs
+    ------
+    func : callable
+        Function to time, called without arguments.
+    repeats : int
+        Number of timed calls.
+
+    Returns
+    -------
+    latency : float
+        Median latency in milliseconds.
+    """
+    func()  # warm up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def benchmark(train, test, cat_features: list, label: str, hyperparameters: dict, encoding: str,
+              repeats: int = 50) -> dict:
+    """
+    Train and evaluate a model with one categorical encoding.
+
+    Inputs
+    ------
+    train : pd.DataFrame
+        Training data.
+    test : pd.DataFrame
+        Test data.
+    cat_features : list
+        List of categorical feature names.
+    label : str
+        Name of the label column.
+    hyperparameters : dict
+        Dictionary containing hyperparameters for RandomForestClassifier.
+    encoding : str
+        "onehot" or "ordinal".
+    repeats : int
+        Number of timed inference calls.
+
+    Returns
+    -------
+    result : dict
+        Feature width, training time, metrics and inference latencies.
+    """
+    X_train, y_train, encoder, lb = process_data(
+        train, categorical_features=cat_features, label=label, training=True, encoding=encoding
+    )
+    X_test, y_test, _, _ = process_data(
+        test, categorical_features=cat_features, label=label, training=False, encoder=encoder, lb=lb
+    )
+
+    start = time.perf_counter()
+    model = train_model(X_train, y_train, hyperparameters)
+    train_seconds = time.perf_counter() - start
+
+    precision, recall, fbeta = compute_model_metrics(y_test, inference(model, X_test))
+    single_row = test.drop(columns=[label]).iloc[:1]
+
+    return {
+        "encoding": encoding,
+        "width": X_train.shape[1],
+        "train_s": train_seconds,
+        "precision": precision,
+        "recall": recall,
+        "fbeta": fbeta,
+        # Single-record latency includes process_data, like a /predict request
+        "row_ms": _median_latency(lambda: inference(model, process_data(
+            single_row, categorical_features=cat_features, label=None, training=False, encoder=encoder
+        )[0]), repeats),
+        "batch_ms": _median_latency(lambda: inference(model, X_test), max(1, repeats // 10)),
+    }
+
+
+def main():
+    """
+    Main function for benchmarking the categorical encodings.
+    """
+
+    # variables
+    script_dir: str    = os.path.dirname(os.path.abspath(__file__))
+    parent_dir: str    = os.path.dirname(script_dir)
+    data_path: str     = os.path.join(parent_dir, "data", "census.csv")
+    cache_dir: str     = os.path.join(parent_dir, "data", "cache")
+    cat_features: list = [
+                "workclass",
+                "education",
+                "marital-status",
+                "occupation",
+                "relationship",
+                "race",
+                "sex",
+                "native-country",
+            ]
+    hyperparameters: dict = {
+        "n_estimators": 100,
+        "max_depth": 10,
+        "random_state": 42,
+        "n_jobs": -1
+    }
+
+    try:
+        data = _load_cached_data(data_path, cat_features, "salary", cache_dir)
+        train, test = train_test_split(data, test_size=0.20, random_state=42)
+
+        results = [
+            benchmark(train, test, cat_features, "salary", hyperparameters, encoding)
+            for encoding in ("onehot", "ordinal")
+        ]
+
+        print(f"{'encoding':<10}{'width':>7}{'train s':>9}{'precision':>11}{'recall':>8}"
+              f"{'fbeta':>8}{'row ms':>9}{'batch ms':>10}")
+        for r in results:
+            print(f"{r['encoding']:<10}{r['width']:>7}{r['train_s']:>9.2f}{r['precision']:>11.4f}"
+                  f"{r['recall']:>8.4f}{r['fbeta']:>8.4f}{r['row_ms']:>9.2f}{r['batch_ms']:>10.2f}")
+
+    except Exception as e:
+        print(f"ERROR: An error occurred: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Read-only data shared with the workers of the running pools, by name; set by
+# _init_worker, or inherited on fork
+_contexts: dict = {}
+
+
+def _init_worker(name: str, context: tuple) -> None:
+    """ Hold the shared data in the worker process. """
+    _contexts[name] = context
+
+
+def pool_context(name: str) -> tuple:
+    """ Data shared by the `shared_pool` called with `name`, in a worker or in-process. """
+    return _contexts[name]
+
+
+@contextlib.contextmanager
+def shared_pool(name: str, context: tuple, n_workers: int):
+    """ Process pool whose workers read `context` with pool_context(name).
+
+    Forked workers see the context through copy-on-write memory, so it is never
+    pickled; where fork is not available it is sent once to each worker. With a single
+    worker no pool is started and None is yielded: the caller runs the work in-process,
+    where pool_context(name) works as well. The context is dropped on exit.
+
+    Inputs
+    ------
+    name : str
+        Name under which the context is shared.
+    context : tuple
+        Data shared by every task.
+    n_workers : int
+        Number of worker processes.
+    Yields
+    ------
+    pool : ProcessPoolExecutor or None
+    """
+    _contexts[name] = context
+    try:
+        if n_workers == 1:
+            yield None
+        elif "fork" in multiprocessing.get_all_start_methods():
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("fork")) as pool:
+                yield pool
+        else:
+            with ProcessPoolExecutor(
+                max_workers=n_workers, initializer=_init_worker, initargs=(name, context)
+            ) as pool:
+                yield pool
+    finally:
+        _contexts.pop(name, None)
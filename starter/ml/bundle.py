@@ -0,0 +1,258 @@
+import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .compiled import CompiledForest
+
+# Version of the bundle layout; bumped whenever the manifest or the files change meaning
+BUNDLE_FORMAT_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+
+
+class BundleError(ValueError):
+    """ Raised when a model bundle is missing files, corrupted or of another format version. """
+
+
+def _hash_file(path):
+    """ SHA-256 of a file, read in blocks. """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _manifest_version(raw_manifest):
+    """ Version of a bundle: the first 12 hex digits of the SHA-256 of its manifest. """
+    return hashlib.sha256(raw_manifest).hexdigest()[:12]
+
+
+def bundle_version(path):
+    """ Version of the bundle in `path` without loading it, as ModelBundle.version.
+
+    The manifest holds the checksum of every other file, so its hash pins the bundle.
+
+    Inputs
+    ------
+    path : str
+        Directory written by save_bundle.
+    Returns
+    -------
+    version : str
+        The first 12 hex digits of the SHA-256 of the manifest.
+    """
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "rb") as f:
+            return _manifest_version(f.read())
+    except FileNotFoundError:
+        raise BundleError(f"No model bundle manifest at {manifest_path}") from None
+
+
+def save_bundle(path, model, encoder, lb, categorical_features, feature_order, label="salary", metadata=None,
+                calibration=None, decision_profiles=None):
+    """ Save a model and its preprocessing as a versioned, integrity-checked bundle.
+
+    The bundle is a directory holding the compiled forest as raw .npy arrays (see
+    CompiledForest.save) and a JSON manifest with everything else needed to serve it:
+    the encoder type and categories, the label classes, the input feature order, the
+    categorical features, the probability calibration, the decision profiles and training
+    metadata, plus the SHA-256 of every array file.
+    Nothing is pickled. The manifest is written last, so a reader never sees a manifest
+    that points at arrays that are not written yet.
+
+    Inputs
+    ------
+    path : str
+        Directory to write to; created if it does not exist.
+    model : RandomForestClassifier
+        Trained machine learning model.
+    encoder : OneHotEncoder or OrdinalEncoder
+        Fitted encoder for categorical features.
+    lb : LabelBinarizer
+        Fitted LabelBinarizer for labels.
+    categorical_features : list
+        Names of the categorical columns, in encoder order.
+    feature_order : list
+        Names of the input columns in model order: the continuous features followed by
+        `categorical_features`.
+    label : str
+        Name of the label column.
+    metadata : dict
+        JSON-serializable training metadata, e.g. hyperparameters and test metrics.
+    calibration : dict
+        Probability calibration of the model, see ml/calibration.py::fit_platt.
+    decision_profiles : dict
+        Named decision thresholds of the model, see ml/thresholds.py::decision_profiles.
+    """
+    import sklearn
+    from sklearn.preprocessing import OrdinalEncoder
+
+    CompiledForest.from_model(model).save(path)
+    ordinal = isinstance(encoder, OrdinalEncoder)
+
+    files = {
+        name: _hash_file(os.path.join(path, name))
+        for name in sorted(os.listdir(path)) if name != MANIFEST_NAME and not name.endswith(".tmp")
+    }
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "library_versions": {"numpy": np.__version__, "sklearn": sklearn.__version__},
+        "label": label,
+        "label_classes": np.asarray(lb.classes_).tolist(),
+        "categorical_features": list(categorical_features),
+        "feature_order": list(feature_order),
+        "encoder": {
+            "type": "ordinal" if ordinal else "onehot",
+            "sparse": bool(getattr(encoder, "sparse_output", False)),
+            "unknown_value": encoder.unknown_value if ordinal else None,
+            "categories": [np.asarray(categories).tolist() for categories in encoder.categories_],
+        },
+        "calibration": calibration,
+        "decision_profiles": decision_profiles or {},
+        "metadata": metadata or {},
+        "files": files,
+    }
+
+    target = os.path.join(path, MANIFEST_NAME)
+    with open(f"{target}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{target}.tmp", target)
+
+
+def _build_encoder(spec):
+    """ Recreate the fitted encoder from its categories, without unpickling it. """
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+
+    categories = [np.asarray(values, dtype=object) for values in spec["categories"]]
+    if spec["type"] == "ordinal":
+        encoder = OrdinalEncoder(
+            categories=categories, handle_unknown="use_encoded_value",
+            unknown_value=spec["unknown_value"], dtype=np.float64
+        )
+    elif spec["type"] == "onehot":
+        encoder = OneHotEncoder(categories=categories, sparse_output=spec["sparse"], handle_unknown="ignore")
+    else:
+        raise BundleError(f"Unknown encoder type in bundle: {spec['type']!r}")
+    # With explicit categories fitting only validates them; one known row is enough
+    encoder.fit(np.array([[values[0] for values in categories]], dtype=object))
+    return encoder
+
+
+class ModelBundle:
+    """ Model and preprocessing loaded from a bundle written by save_bundle.
+
+    The sklearn encoder and label binarizer are only rebuilt when first accessed, so a
+    caller that works from `encoder_spec` and `label_classes` never imports sklearn.
+    """
+
+    def __init__(self, predictor, manifest, version):
+        self.predictor = predictor
+        self.manifest = manifest
+        self.version = version
+        self.categorical_features = manifest["categorical_features"]
+        self.feature_order = manifest["feature_order"]
+        self.metadata = manifest["metadata"]
+        self.encoder_spec = manifest["encoder"]
+        self.label_classes = manifest["label_classes"]
+        # Absent from bundles written before calibration and profiles were recorded
+        self.calibration = manifest.get("calibration")
+        self.decision_profiles = manifest.get("decision_profiles", {})
+        self._encoder = None
+        self._lb = None
+
+    @property
+    def encoder(self):
+        """ Fitted OneHotEncoder or OrdinalEncoder, as used by process_data. """
+        if self._encoder is None:
+            self._encoder = _build_encoder(self.encoder_spec)
+        return self._encoder
+
+    @property
+    def lb(self):
+        """ Fitted LabelBinarizer, as used by process_data. """
+        if self._lb is None:
+            from sklearn.preprocessing import LabelBinarizer
+
+            self._lb = LabelBinarizer().fit(np.asarray(self.label_classes, dtype=object))
+        return self._lb
+
+
+def _read_manifest(path):
+    """ Raw bytes and parsed content of a bundle manifest, after checking its format version. """
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "rb") as f:
+            raw_manifest = f.read()
+    except FileNotFoundError:
+        raise BundleError(f"No model bundle manifest at {manifest_path}") from None
+    manifest = json.loads(raw_manifest)
+
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise BundleError(
+            f"Unsupported model bundle format version {manifest.get('format_version')!r} "
+            f"(expected {BUNDLE_FORMAT_VERSION})"
+        )
+    for name in manifest["files"]:
+        if not os.path.exists(os.path.join(path, name)):
+            raise BundleError(f"Model bundle file is missing: {name}")
+    return raw_manifest, manifest
+
+
+def verify_bundle(path):
+    """ Check every file of a bundle against the SHA-256 recorded in its manifest.
+
+    Hashing reads every array in full, so it is meant for deploy time (e.g. after
+    copying a bundle to a server) rather than for every load.
+
+    Inputs
+    ------
+    path : str
+        Directory written by save_bundle.
+    Returns
+    -------
+    version : str
+        The version of the verified bundle, as ModelBundle.version.
+    """
+    raw_manifest, manifest = _read_manifest(path)
+    for name, expected in manifest["files"].items():
+        if _hash_file(os.path.join(path, name)) != expected:
+            raise BundleError(f"Model bundle file does not match its checksum: {name}")
+    return _manifest_version(raw_manifest)
+
+
+def load_bundle(path, mmap_mode="r", verify=False):
+    """ Load a model bundle written by save_bundle.
+
+    The forest arrays are memory-mapped without copies, like CompiledForest.load, and
+    the encoder and label binarizer are rebuilt from the manifest instead of unpickled.
+    Loading needs only numpy. The format version and the presence of every file are
+    always checked; the checksums only with `verify`, see verify_bundle.
+
+    Inputs
+    ------
+    path : str
+        Directory written by save_bundle.
+    mmap_mode : str or None
+        Passed to `np.load`; None reads the arrays into private memory.
+    verify : bool
+        Also check every file against the SHA-256 in the manifest before loading it,
+        which reads the whole bundle once.
+    Returns
+    -------
+    bundle : ModelBundle
+        The loaded model, encoder, label binarizer and manifest. Its `version` is the
+        first 12 hex digits of the SHA-256 of the manifest, which pins every file.
+    """
+    verified = verify_bundle(path) if verify else None
+    raw_manifest, manifest = _read_manifest(path)
+    if verified is not None and verified != _manifest_version(raw_manifest):
+        raise BundleError("Model bundle was replaced while it was being verified")
+
+    predictor = CompiledForest.load(path, mmap_mode=mmap_mode)
+    return ModelBundle(predictor, manifest, _manifest_version(raw_manifest))
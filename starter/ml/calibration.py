@@ -0,0 +1,95 @@
+import numpy as np
+
+
+def fit_platt(scores, y, max_iter=100, tol=1e-10):
+    """ Fit Platt scaling, a logistic map from model scores to calibrated probabilities.
+
+    Random forest probabilities are votes averaged over trees and tend to be pulled away
+    from 0 and 1; Platt scaling fits `p = 1 / (1 + exp(-(a * score + b)))` to held-out
+    labels. Following Platt, the 0/1 targets are smoothed by the class counts, so the fit
+    stays finite even when the scores separate the classes perfectly. Only numpy is
+    needed, at fit and at serving time.
+
+    Inputs
+    ------
+    scores : np.ndarray
+        Probability of the positive class predicted by the model for each row.
+    y : np.ndarray
+        Known labels, binarized.
+    max_iter : int
+        Maximum number of Newton steps.
+    tol : float
+        Stop once a step changes the log loss by less than this.
+    Returns
+    -------
+    calibration : dict
+        JSON-serializable {"method": "platt", "a": float, "b": float}.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    y = np.asarray(y)
+    n_pos = int(np.count_nonzero(y == 1))
+    n_neg = y.shape[0] - n_pos
+    targets = np.where(y == 1, (n_pos + 1) / (n_pos + 2), 1 / (n_neg + 2))
+
+    def loss(a, b):
+        z = a * scores + b
+        # log(1 + exp(z)) - t * z, written to avoid overflow
+        return np.sum(np.logaddexp(0, z) - targets * z)
+
+    a, b = 0.0, np.log((n_pos + 1) / (n_neg + 1))
+    current = loss(a, b)
+    for _ in range(max_iter):
+        p = _sigmoid(a * scores + b)
+        residual = p - targets
+        weights = p * (1 - p)
+        gradient = np.array([np.dot(residual, scores), residual.sum()])
+        hessian = np.array([
+            [np.dot(weights, scores * scores), np.dot(weights, scores)],
+            [np.dot(weights, scores), weights.sum()],
+        ]) + 1e-12 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+
+        # Backtrack until the log loss decreases
+        scale = 1.0
+        while scale > 1e-10:
+            new_a, new_b = a - scale * step[0], b - scale * step[1]
+            new = loss(new_a, new_b)
+            if new <= current:
+                break
+            scale /= 2
+        else:
+            break
+
+        a, b = new_a, new_b
+        if current - new < tol:
+            break
+        current = new
+
+    return {"method": "platt", "a": float(a), "b": float(b)}
+
+
+def _sigmoid(z):
+    """ Logistic function, without overflow warnings for large |z|. """
+    return 1 / (1 + np.exp(-np.clip(z, -500, 500)))
+
+
+def calibrate(calibration, scores):
+    """ Map positive-class scores to calibrated probabilities.
+
+    Inputs
+    ------
+    calibration : dict or None
+        Output of `fit_platt`; None leaves the scores unchanged.
+    scores : np.ndarray
+        Probability of the positive class predicted by the model.
+    Returns
+    -------
+    probabilities : np.ndarray
+        Calibrated probability of the positive class.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if calibration is None:
+        return scores
+    if calibration.get("method") != "platt":
+        raise ValueError(f"Unknown calibration method: {calibration.get('method')!r}")
+    return _sigmoid(calibration["a"] * scores + calibration["b"])
@@ -0,0 +1,195 @@
+import json
+import os
+
+import numpy as np
+
+# Arrays written by CompiledForest.save, one raw .npy file each so they can be memory-mapped
+ARRAY_NAMES = ("feature", "threshold", "children_left", "children_right", "value", "roots", "classes_")
+
+
+class CompiledForest:
+    """ Flat, array-based evaluator for a fitted RandomForestClassifier.
+
+    Every tree's `feature`, `threshold`, `children_left/right` and leaf `value` arrays are
+    packed into contiguous arrays indexed by a global node id, so a batch of rows is
+    routed through all trees at once with a fixed number of vectorized steps (the depth
+    of the deepest tree) instead of one sklearn call per tree.
+
+    Predictions match `RandomForestClassifier.predict`: inputs are cast to float32 like
+    sklearn's tree code, leaf class counts are normalized per tree, averaged over the
+    forest, and the arg-max class is returned. Inputs are assumed to contain no NaNs,
+    which holds for the output of `process_data`.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right, value, roots,
+                 max_depth, classes, n_features_in):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features_in_ = n_features_in
+
+    @classmethod
+    def from_model(cls, model):
+        """ Compile a fitted forest.
+
+        Inputs
+        ------
+        model : RandomForestClassifier
+            Trained single-output machine learning model.
+        Returns
+        -------
+        compiled : CompiledForest
+            Evaluator producing the same predictions as `model`.
+        """
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("CompiledForest only supports single-output forests.")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point at themselves so extra steps past a shallow leaf are no-ops
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+
+            # Per-tree class probabilities, as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :].astype(np.float64)
+            normalizer = proba.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba / normalizer)
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children_left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            children_right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=model.classes_,
+            n_features_in=model.n_features_in_,
+        )
+
+    def save(self, path):
+        """ Save the packed arrays as .npy files plus a small JSON header.
+
+        Inputs
+        ------
+        path : str
+            Directory to write to; created if it does not exist.
+        """
+        os.makedirs(path, exist_ok=True)
+        # Write to a temporary file and rename it into place, so processes that have the
+        # previous version memory-mapped keep reading the old file instead of crashing
+        for name in ARRAY_NAMES:
+            target = os.path.join(path, f"{name}.npy")
+            with open(f"{target}.tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(getattr(self, name)))
+            os.replace(f"{target}.tmp", target)
+        target = os.path.join(path, "meta.json")
+        with open(f"{target}.tmp", "w") as f:
+            json.dump({"max_depth": int(self.max_depth), "n_features_in": int(self.n_features_in_)}, f)
+        os.replace(f"{target}.tmp", target)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """ Load a forest written by `save`.
+
+        With the default `mmap_mode="r"` the arrays are memory-mapped read-only, so every
+        process that loads the same directory shares one page-cached copy of the trees.
+
+        Inputs
+        ------
+        path : str
+            Directory written by `save`.
+        mmap_mode : str or None
+            Passed to `np.load`; None reads the arrays into private memory.
+        Returns
+        -------
+        compiled : CompiledForest
+            The loaded evaluator.
+        """
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in ARRAY_NAMES
+        }
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children_left=arrays["children_left"],
+            children_right=arrays["children_right"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            max_depth=meta["max_depth"],
+            classes=arrays["classes_"],
+            n_features_in=meta["n_features_in"],
+        )
+
+    def apply(self, X):
+        """ Return the global leaf id reached by every row in every tree.
+
+        Inputs
+        ------
+        X : np.ndarray or scipy.sparse matrix
+            Data of shape (n_samples, n_features).
+        Returns
+        -------
+        leaves : np.ndarray
+            Array of shape (n_samples, n_trees) with global node ids.
+        """
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0]))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        """ Average the per-tree class probabilities.
+
+        Inputs
+        ------
+        X : np.ndarray
+            Data of shape (n_samples, n_features).
+        Returns
+        -------
+        proba : np.ndarray
+            Array of shape (n_samples, n_classes).
+        """
+        leaves = self.apply(X)
+        return self.value[leaves].sum(axis=1) / self.roots.shape[0]
+
+    def predict(self, X):
+        """ Predict classes, like RandomForestClassifier.predict.
+
+        Inputs
+        ------
+        X : np.ndarray
+            Data of shape (n_samples, n_features).
+        Returns
+        -------
+        preds : np.ndarray
+            Predicted classes.
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
@@ -0,0 +1,210 @@
+import copy
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree._tree import TREE_LEAF, TREE_UNDEFINED, Tree
+
+from .compiled import CompiledForest
+from .model import compute_model_metrics, inference, p99_latency
+
+
+def drop_trees(model, n_trees):
+    """ Keep only the first `n_trees` trees of a fitted forest.
+
+    Random forest trees are identically distributed, so the first trees are as good a
+    subset as any.
+
+    Inputs
+    ------
+    model : RandomForestClassifier
+        Trained machine learning model.
+    n_trees : int
+        Number of trees to keep.
+    Returns
+    -------
+    compressed : RandomForestClassifier
+        Copy of `model` with at most `n_trees` trees; the trees themselves are shared.
+    """
+    compressed = copy.copy(model)
+    compressed.estimators_ = list(model.estimators_[:n_trees])
+    compressed.n_estimators = len(compressed.estimators_)
+    return compressed
+
+
+def _node_depths(children_left, children_right):
+    """ Depth of every node of a tree, found level by level from the root. """
+    depths = np.full(len(children_left), -1, dtype=np.intp)
+    frontier = np.array([0])
+    level = 0
+    while frontier.size:
+        depths[frontier] = level
+        internal = frontier[children_left[frontier] != TREE_LEAF]
+        frontier = np.concatenate([children_left[internal], children_right[internal]])
+        level += 1
+    return depths
+
+
+# Fields of sklearn's private Tree state that _prune_tree reads or rewrites
+_TREE_STATE_KEYS = ("max_depth", "node_count", "nodes", "values")
+_NODE_FIELDS = ("left_child", "right_child", "feature", "threshold")
+
+
+def _check_tree_state(state):
+    """ Fail clearly if sklearn's private Tree state does not have the layout _prune_tree expects. """
+    import sklearn
+
+    missing = [key for key in _TREE_STATE_KEYS if key not in state]
+    names = getattr(getattr(state.get("nodes"), "dtype", None), "names", None) or ()
+    missing += [f"nodes.{field}" for field in _NODE_FIELDS if field not in names]
+    if missing:
+        raise RuntimeError(
+            f"cap_depth does not support the tree layout of scikit-learn {sklearn.__version__} "
+            f"(missing {', '.join(missing)}); compress with --distill or --compress-trees instead"
+        )
+
+
+def _prune_tree(tree, max_depth):
+    """ Copy of a fitted sklearn Tree with the nodes at `max_depth` turned into leaves.
+
+    Every node stores the class distribution of the training samples that reach it, so a
+    node cut at `max_depth` predicts like a tree grown with that depth limit would.
+
+    scikit-learn has no public API for this, so the node array of the Tree's pickled
+    state is rewritten; the layout is checked first and extra node fields are copied
+    as they are.
+    """
+    state = tree.__getstate__()
+    _check_tree_state(state)
+    nodes, values = state["nodes"], state["values"]
+    depths = _node_depths(nodes["left_child"], nodes["right_child"])
+
+    keep = (depths >= 0) & (depths <= max_depth)
+    new_ids = np.cumsum(keep) - 1
+    nodes = nodes[keep].copy()
+    values = np.ascontiguousarray(values[keep])
+
+    cut = (depths[keep] == max_depth) & (nodes["left_child"] != TREE_LEAF)
+    internal = (nodes["left_child"] != TREE_LEAF) & ~cut
+    nodes["left_child"][internal] = new_ids[nodes["left_child"][internal]]
+    nodes["right_child"][internal] = new_ids[nodes["right_child"][internal]]
+    nodes["left_child"][cut] = TREE_LEAF
+    nodes["right_child"][cut] = TREE_LEAF
+    nodes["feature"][cut] = TREE_UNDEFINED
+    nodes["threshold"][cut] = TREE_UNDEFINED
+    # Only present in scikit-learn versions that route missing values
+    if "missing_go_to_left" in nodes.dtype.names:
+        nodes["missing_go_to_left"][cut] = 0
+
+    pruned = Tree(tree.n_features, np.asarray(tree.n_classes, dtype=np.intp), tree.n_outputs)
+    pruned.__setstate__({
+        **state,
+        "max_depth": min(tree.max_depth, max_depth),
+        "node_count": len(nodes),
+        "nodes": nodes,
+        "values": values,
+    })
+    if pruned.node_count != len(nodes):
+        raise RuntimeError("scikit-learn did not accept the pruned tree state")
+    return pruned
+
+
+def cap_depth(model, max_depth):
+    """ Prune every tree of a fitted forest to at most `max_depth` levels.
+
+    Inputs
+    ------
+    model : RandomForestClassifier
+        Trained machine learning model.
+    max_depth : int
+        Maximum depth of the pruned trees.
+    Returns
+    -------
+    compressed : RandomForestClassifier
+        Copy of `model` whose trees are cut at `max_depth`.
+    """
+    compressed = copy.copy(model)
+    compressed.estimators_ = []
+    for estimator in model.estimators_:
+        if estimator.tree_.max_depth > max_depth:
+            estimator = copy.copy(estimator)
+            estimator.tree_ = _prune_tree(estimator.tree_, max_depth)
+            estimator.max_depth = max_depth
+        compressed.estimators_.append(estimator)
+    compressed.max_depth = max_depth
+    return compressed
+
+
+def distill(model, X, n_trees=1, max_depth=8, random_state=42):
+    """ Train a smaller forest to reproduce the predictions of a fitted forest.
+
+    The student is fitted on the teacher's predictions over `X` rather than the true
+    labels, so it learns the teacher's decision function. With `n_trees=1` the student
+    is a single shallow tree grown on all rows and features, stored as a one-tree
+    forest so it can be served like any other model.
+
+    Inputs
+    ------
+    model : RandomForestClassifier
+        Trained machine learning model (the teacher).
+    X : np.ndarray or scipy.sparse.csr_matrix
+        Data to distill on, typically the training data.
+    n_trees : int
+        Number of trees of the student.
+    max_depth : int
+        Maximum depth of the student's trees.
+    random_state : int
+        Seed of the student.
+    Returns
+    -------
+    student : RandomForestClassifier
+        Trained smaller model.
+    """
+    single_tree = n_trees == 1
+    student = RandomForestClassifier(
+        n_estimators=n_trees,
+        max_depth=max_depth,
+        bootstrap=not single_tree,
+        max_features=None if single_tree else "sqrt",
+        random_state=random_state,
+        n_jobs=-1,
+    )
+    student.fit(X, inference(model, X))
+    return student
+
+
+def compression_report(models, X_test, y_test, repeats=200):
+    """ Compare the accuracy and single-row latency of model variants on the test data.
+
+    Inputs
+    ------
+    models : dict
+        Maps a variant name to a trained RandomForestClassifier.
+    X_test : np.ndarray or scipy.sparse.csr_matrix
+        Encoded test data.
+    y_test : np.ndarray
+        Test labels.
+    repeats : int
+        Number of timed single-row predictions per variant and evaluator.
+    Returns
+    -------
+    report : pd.DataFrame
+        One row per variant with columns variant, n_trees, n_nodes, max_depth, precision,
+        recall, fbeta, sklearn_p99_ms and compiled_p99_ms.
+    """
+    rows = []
+    for name, model in models.items():
+        precision, recall, fbeta = compute_model_metrics(y_test, inference(model, X_test))
+        compiled = CompiledForest.from_model(model)
+        rows.append({
+            "variant": name,
+            "n_trees": len(model.estimators_),
+            "n_nodes": len(compiled.feature),
+            "max_depth": compiled.max_depth,
+            "precision": precision,
+            "recall": recall,
+            "fbeta": fbeta,
+            "sklearn_p99_ms": p99_latency(model, X_test[:1], repeats),
+            "compiled_p99_ms": p99_latency(compiled, X_test[:1], repeats),
+        })
+    return pd.DataFrame(rows)
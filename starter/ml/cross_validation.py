@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+
+from ._pool import pool_context, shared_pool
+from .data import process_data
+from .model import compute_model_metrics, inference, train_model
+
+
+def _run_fold(fold: int, train_index: np.ndarray, test_index: np.ndarray) -> dict:
+    """ Fit the encoder and a model on one training fold and evaluate it on the held-out fold.
+
+    Only the row indices of the fold are sent to the worker; the data itself comes from
+    the shared fold context.
+    """
+    data, cat_features, label, hyperparameters, sparse, encoding = pool_context("cross_validation")
+    train, test = data.iloc[train_index], data.iloc[test_index]
+
+    X_train, y_train, encoder, lb = process_data(
+        train, categorical_features=cat_features, label=label, training=True, sparse=sparse, encoding=encoding
+    )
+    X_test, y_test, _, _ = process_data(
+        test, categorical_features=cat_features, label=label, training=False, encoder=encoder, lb=lb
+    )
+
+    model = train_model(X_train, y_train, hyperparameters)
+    precision, recall, fbeta = compute_model_metrics(y_test, inference(model, X_test))
+    return {
+        "fold": fold,
+        "train_rows": len(train_index),
+        "test_rows": len(test_index),
+        "precision": precision,
+        "recall": recall,
+        "fbeta": fbeta,
+    }
+
+
+def cross_validate(
+    data, cat_features, label, hyperparameters, n_splits=5, n_workers=None, sparse=False,
+    encoding="onehot", random_state=42
+):
+    """ Evaluate the model with stratified K-fold cross validation, one process per fold.
+
+    Folds are stratified on `label`. Each fold fits its own encoder and label binarizer
+    with process_data(training=True), so nothing from the held-out rows leaks into the
+    encoding. Folds run in a process pool, and the forest's `n_jobs` is set so that the
+    pool size times `n_jobs` does not exceed the number of cores.
+
+    The data is handed to each worker process once rather than pickled with every fold:
+    where the platform supports fork, workers inherit it from the parent without any
+    copy; otherwise it is sent once per worker through the pool initializer.
+
+    Inputs
+    ------
+    data : pd.DataFrame
+        Cleaned data containing the features and label.
+    cat_features : list
+        List of categorical feature names.
+    label : str
+        Name of the label column, also used for stratification.
+    hyperparameters : dict
+        Dictionary containing hyperparameters for RandomForestClassifier; `n_jobs` is
+        overridden.
+    n_splits : int
+        Number of folds.
+    n_workers : int
+        Number of worker processes, capped at `n_splits`. Defaults to the number of cores.
+    sparse : bool
+        Passed to process_data when fitting the encoder of each fold.
+    encoding : str
+        Passed to process_data when fitting the encoder of each fold.
+    random_state : int
+        Seed of the fold shuffling.
+    Returns
+    -------
+    fold_metrics : pd.DataFrame
+        One row per fold with columns fold, train_rows, test_rows, precision, recall and
+        fbeta.
+    """
+    n_cores = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers or n_cores, n_splits))
+    hyperparameters = {**hyperparameters, "n_jobs": max(1, n_cores // n_workers)}
+
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    folds = list(splitter.split(np.zeros(len(data)), data[label]))
+    context = (data, list(cat_features), label, hyperparameters, sparse, encoding)
+
+    with shared_pool("cross_validation", context, n_workers) as pool:
+        if pool is None:
+            results = [_run_fold(i, train_index, test_index) for i, (train_index, test_index) in enumerate(folds)]
+        else:
+            futures = [
+                pool.submit(_run_fold, i, train_index, test_index)
+                for i, (train_index, test_index) in enumerate(folds)
+            ]
+            results = [future.result() for future in futures]
+    return pd.DataFrame(results)
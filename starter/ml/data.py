@@ -1,9 +1,82 @@
+from collections import defaultdict
+
 import numpy as np
-from sklearn.preprocessing import LabelBinarizer, OneHotEncoder
+import pandas as pd
+import scipy.sparse
+from sklearn.preprocessing import LabelBinarizer, OneHotEncoder, OrdinalEncoder
+
+# Explicit column types of the census CSV, so chunks are parsed without type inference.
+# Continuous columns use the nullable Int64 type so rows with missing values can still be
+# parsed (and then dropped) instead of silently turning the whole column into floats.
+CENSUS_DTYPES = {
+    "age": "Int64",
+    "workclass": str,
+    "fnlgt": "Int64",
+    "education": str,
+    "education-num": "Int64",
+    "marital-status": str,
+    "occupation": str,
+    "relationship": str,
+    "race": str,
+    "sex": str,
+    "capital-gain": "Int64",
+    "capital-loss": "Int64",
+    "hours-per-week": "Int64",
+    "native-country": str,
+    "salary": str,
+}
+
+# Code given by the ordinal encoder to categories that were not seen during training
+UNKNOWN_CATEGORY_CODE = -1
+
+
+def read_census_csv(file_path, chunksize=None):
+    """ Parse a raw census CSV with the options used for the training data.
+
+    The spaces that pad every field are skipped and the columns get CENSUS_DTYPES, so
+    integer columns with missing values stay nullable integers instead of floats. Any
+    other column is read as strings, so no column type depends on which rows a chunk holds.
+
+    Inputs
+    ------
+    file_path : str
+        Path to the CSV file.
+    chunksize : int
+        If given, return an iterator of DataFrames of this many rows.
+    Returns
+    -------
+    data : pd.DataFrame or iterator of pd.DataFrame
+        Raw data, still to be cleaned with `clean_data`.
+    """
+    dtype = defaultdict(lambda: str, CENSUS_DTYPES)
+    return pd.read_csv(file_path, skipinitialspace=True, dtype=dtype, chunksize=chunksize)
+
+
+def clean_data(X):
+    """ Remove all spaces from the column names and string values of raw census data.
+
+    The raw census CSV pads every field with spaces (e.g. " State-gov"). This applies the
+    same cleanup to an already-parsed DataFrame, so it can be used chunk by chunk.
+
+    Inputs
+    ------
+    X : pd.DataFrame
+        Raw data as parsed from the census CSV.
+    Returns
+    -------
+    X : pd.DataFrame
+        Copy of the data with spaces removed from column names and string values.
+    """
+    X = X.rename(columns=lambda column: str(column).replace(" ", ""))
+    for column in X.columns:
+        if pd.api.types.is_object_dtype(X[column]) or pd.api.types.is_string_dtype(X[column]):
+            X[column] = X[column].str.replace(" ", "", regex=False)
+    return X
 
 
 def process_data(
-    X, categorical_features=[], label=None, training=True, encoder=None, lb=None
+    X, categorical_features=[], label=None, training=True, encoder=None, lb=None, sparse=False,
+    encoding="onehot"
 ):
     """ Process the data used in the machine learning pipeline.
 
@@ -11,6 +84,10 @@ def process_data(
     label binarizer for the labels. This can be used in either training or
     inference/validation.
 
+    Tree models can instead use ordinal encoding, which maps each category to its index
+    in the fitted categories and keeps one column per categorical feature; unseen
+    categories get UNKNOWN_CATEGORY_CODE.
+
     Note: depending on the type of model used, you may want to add in functionality that
     scales the continuous data.
 
@@ -25,20 +102,26 @@ def process_data(
         for y (default=None)
     training : bool
         Indicator if training mode or inference/validation mode.
-    encoder : sklearn.preprocessing._encoders.OneHotEncoder
-        Trained sklearn OneHotEncoder, only used if training=False.
+    encoder : sklearn.preprocessing._encoders.OneHotEncoder or OrdinalEncoder
+        Trained sklearn encoder, only used if training=False.
     lb : sklearn.preprocessing._label.LabelBinarizer
         Trained sklearn LabelBinarizer, only used if training=False.
+    sparse : bool
+        If True, fit the encoder with sparse output and return X as a CSR matrix. Only
+        used if training=True; otherwise the layout follows the `sparse_output` setting
+        of the encoder passed in, so data is always processed like at training time.
+    encoding : str
+        "onehot" or "ordinal". Only used if training=True; otherwise the type of the
+        encoder passed in decides.
 
     Returns
     -------
-    X : np.array
+    X : np.array or scipy.sparse.csr_matrix
         Processed data.
     y : np.array
         Processed labels if labeled=True, otherwise empty np.array.
-    encoder : sklearn.preprocessing._encoders.OneHotEncoder
-        Trained OneHotEncoder if training is True, otherwise returns the encoder passed
-        in.
+    encoder : sklearn.preprocessing._encoders.OneHotEncoder or OrdinalEncoder
+        Trained encoder if training is True, otherwise returns the encoder passed in.
     lb : sklearn.preprocessing._label.LabelBinarizer
         Trained LabelBinarizer if training is True, otherwise returns the binarizer
         passed in.
@@ -54,7 +137,16 @@ def process_data(
     X_continuous = X.drop(categorical_features, axis=1)
 
     if training is True:
-        encoder = OneHotEncoder(sparse_output=False, handle_unknown="ignore")
+        if encoding == "onehot":
+            encoder = OneHotEncoder(sparse_output=sparse, handle_unknown="ignore")
+        elif encoding == "ordinal":
+            if sparse:
+                raise ValueError("Sparse output is only supported with one hot encoding.")
+            encoder = OrdinalEncoder(
+                handle_unknown="use_encoded_value", unknown_value=UNKNOWN_CATEGORY_CODE, dtype=np.float64
+            )
+        else:
+            raise ValueError(f"Unknown encoding: {encoding!r} (expected 'onehot' or 'ordinal')")
         lb = LabelBinarizer()
         X_categorical = encoder.fit_transform(X_categorical)
         y = lb.fit_transform(y.values).ravel()
@@ -66,5 +158,9 @@ def process_data(
         except AttributeError:
             pass
 
-    X = np.concatenate([X_continuous, X_categorical], axis=1)
+    if scipy.sparse.issparse(X_categorical):
+        X_continuous = scipy.sparse.csr_matrix(np.asarray(X_continuous, dtype=np.float64))
+        X = scipy.sparse.hstack([X_continuous, X_categorical], format="csr")
+    else:
+        X = np.concatenate([X_continuous, X_categorical], axis=1)
     return X, y, encoder, lb
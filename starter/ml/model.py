@@ -1,5 +1,6 @@
-from sklearn.metrics import fbeta_score, precision_score, recall_score
-from sklearn.ensemble import RandomForestClassifier
+import time
+
+import numpy as np
 
 
 def train_model(X_train, y_train, hyperparameters):
@@ -8,7 +9,7 @@ def train_model(X_train, y_train, hyperparameters):
 
     Inputs
     ------
-    X_train : np.ndarray
+    X_train : np.ndarray or scipy.sparse.csr_matrix
         Training data.
     y_train : np.ndarray
         Labels.
@@ -19,11 +20,92 @@ def train_model(X_train, y_train, hyperparameters):
     model : RandomForestClassifier
         Trained machine learning model.
     """
+    # Imported here so that serving, which only needs inference, does not load sklearn
+    from sklearn.ensemble import RandomForestClassifier
+
     model = RandomForestClassifier(**hyperparameters)
     model.fit(X_train, y_train)
     return model
 
 
+def metrics_from_counts(tp, fp, fn, beta=1):
+    """
+    Derives precision, recall and F-beta from confusion counts.
+
+    Follows sklearn's `zero_division=1` semantics: a metric whose denominator is zero
+    is 1.
+
+    Inputs
+    ------
+    tp : np.ndarray
+        True positive counts.
+    fp : np.ndarray
+        False positive counts.
+    fn : np.ndarray
+        False negative counts.
+    beta : float
+        Weight of recall in the F-beta score.
+    Returns
+    -------
+    precision : np.ndarray
+    recall : np.ndarray
+    fbeta : np.ndarray
+    """
+    tp, fp, fn = (np.asarray(counts, dtype=np.float64) for counts in (tp, fp, fn))
+    beta2 = beta * beta
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 1.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 1.0)
+        denominator = (1 + beta2) * tp + beta2 * fn + fp
+        fbeta = np.where(denominator > 0, (1 + beta2) * tp / denominator, 1.0)
+    return precision, recall, fbeta
+
+
+def compute_batch_model_metrics(y, preds, slice_ids=None, n_slices=None, beta=1):
+    """
+    Computes precision, recall and F-beta for many slices in one pass.
+
+    The true positive, false positive and false negative counts of every slice are
+    accumulated with `np.bincount` over the slice ids, instead of validating the inputs
+    and recomputing the confusion matrix once per slice and metric.
+
+    Inputs
+    ------
+    y : np.ndarray
+        Known labels, binarized.
+    preds : np.ndarray
+        Predicted labels, binarized.
+    slice_ids : np.ndarray
+        Slice id in [0, n_slices) of every row; rows with a negative id are ignored.
+        If None, all rows form a single slice.
+    n_slices : int
+        Number of slices; defaults to max(slice_ids) + 1.
+    beta : float
+        Weight of recall in the F-beta score.
+    Returns
+    -------
+    precision : np.ndarray
+    recall : np.ndarray
+    fbeta : np.ndarray
+        Arrays of shape (n_slices,).
+    """
+    y = np.asarray(y).astype(bool)
+    preds = np.asarray(preds).astype(bool)
+    if slice_ids is None:
+        slice_ids = np.zeros(len(y), dtype=np.intp)
+    slice_ids = np.asarray(slice_ids)
+    if n_slices is None:
+        n_slices = int(slice_ids.max()) + 1 if len(slice_ids) else 1
+
+    valid = slice_ids >= 0
+    slice_ids, y, preds = slice_ids[valid], y[valid], preds[valid]
+
+    tp = np.bincount(slice_ids[y & preds], minlength=n_slices)
+    fp = np.bincount(slice_ids[~y & preds], minlength=n_slices)
+    fn = np.bincount(slice_ids[y & ~preds], minlength=n_slices)
+    return metrics_from_counts(tp, fp, fn, beta=beta)
+
+
 def compute_model_metrics(y, preds):
     """
     Validates the trained machine learning model using precision, recall, and F1.
@@ -40,10 +122,8 @@ def compute_model_metrics(y, preds):
     recall : float
     fbeta : float
     """
-    fbeta = fbeta_score(y, preds, beta=1, zero_division=1)
-    precision = precision_score(y, preds, zero_division=1)
-    recall = recall_score(y, preds, zero_division=1)
-    return precision, recall, fbeta
+    precision, recall, fbeta = compute_batch_model_metrics(y, preds)
+    return float(precision[0]), float(recall[0]), float(fbeta[0])
 
 
 def inference(model, X):
@@ -51,9 +131,9 @@ def inference(model, X):
 
     Inputs
     ------
-    model : RandomForestClassifier
+    model : RandomForestClassifier or CompiledForest
         Trained machine learning model.
-    X : np.ndarray
+    X : np.ndarray or scipy.sparse.csr_matrix
         Data used for prediction.
     Returns
     -------
@@ -62,3 +142,53 @@ def inference(model, X):
     """
     preds = model.predict(X)
     return preds
+
+
+def inference_proba(model, X):
+    """ Run model inferences and return the predictions with their class probabilities.
+
+    Both come from a single `predict_proba` pass; the predictions are the arg-max
+    classes, exactly as `model.predict` would return them.
+
+    Inputs
+    ------
+    model : RandomForestClassifier or CompiledForest
+        Trained machine learning model.
+    X : np.ndarray or scipy.sparse.csr_matrix
+        Data used for prediction.
+    Returns
+    -------
+    preds : np.ndarray
+        Predictions from the model.
+    proba : np.ndarray
+        Class probabilities of shape (n_samples, n_classes), columns in
+        `model.classes_` order.
+    """
+    proba = model.predict_proba(X)
+    preds = model.classes_.take(np.argmax(proba, axis=1), axis=0)
+    return preds, proba
+
+
+def p99_latency(model, X, repeats=200):
+    """ Measures the 99th percentile latency of predicting `X` with a model.
+
+    Inputs
+    ------
+    model : RandomForestClassifier or CompiledForest
+        Trained machine learning model.
+    X : np.ndarray or scipy.sparse.csr_matrix
+        Data used for prediction, typically a single row.
+    repeats : int
+        Number of timed calls.
+    Returns
+    -------
+    latency : float
+        99th percentile latency in milliseconds.
+    """
+    model.predict(X)  # warm up
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        timings[i] = time.perf_counter() - start
+    return float(np.percentile(timings, 99)) * 1000
@@ -0,0 +1,215 @@
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+from ._pool import pool_context, shared_pool
+from .compiled import CompiledForest
+from .model import compute_model_metrics, inference, p99_latency, train_model
+
+
+def expand_search_space(space, n_iter=None, random_state=42):
+    """ List the hyperparameter candidates of a search space.
+
+    Inputs
+    ------
+    space : dict
+        Maps each RandomForestClassifier hyperparameter to the list of values to try.
+    n_iter : int
+        If None, every combination is returned (grid search). Otherwise this many
+        distinct combinations are sampled (random search).
+    random_state : int
+        Seed of the random search, so an interrupted sweep samples the same candidates.
+    Returns
+    -------
+    candidates : list[dict]
+        Hyperparameter combinations, in evaluation order.
+    """
+    names = sorted(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    if n_iter is None or n_iter >= len(grid):
+        return grid
+    rng = np.random.RandomState(random_state)
+    return [grid[i] for i in rng.choice(len(grid), size=n_iter, replace=False)]
+
+
+def _rungs(min_estimators, max_estimators, eta):
+    """ Tree budgets of the successive halving rungs, e.g. [11, 33, 100]. """
+    budgets = [max_estimators]
+    while budgets[-1] / eta >= min_estimators:
+        budgets.append(budgets[-1] / eta)
+    return [max(1, round(budget)) for budget in reversed(budgets)]
+
+
+def _evaluate(params, n_estimators):
+    """ Train one candidate with `n_estimators` trees and score it on the evaluation data. """
+    X_train, y_train, X_test, y_test, base_hyperparameters = pool_context("search")
+    hyperparameters = {**base_hyperparameters, **params, "n_estimators": n_estimators, "n_jobs": 1}
+
+    start = time.perf_counter()
+    model = train_model(X_train, y_train, hyperparameters)
+    fit_seconds = time.perf_counter() - start
+
+    precision, recall, fbeta = compute_model_metrics(y_test, inference(model, X_test))
+    return {
+        "params": params,
+        "n_estimators": n_estimators,
+        "precision": precision,
+        "recall": recall,
+        "fbeta": fbeta,
+        "fit_s": fit_seconds,
+        "p99_ms": p99_latency(CompiledForest.from_model(model), X_test[:1]),
+    }
+
+
+def _data_fingerprint(X_train, y_train, X_test, y_test, base_hyperparameters):
+    """ Identify the search data, so resumed results from another split or setup are ignored. """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(json.dumps([X_train.shape, X_test.shape, base_hyperparameters], sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(y_train).tobytes())
+    digest.update(np.ascontiguousarray(y_test).tobytes())
+    return digest.hexdigest()
+
+
+def _result_key(params, n_estimators):
+    return json.dumps(params, sort_keys=True), n_estimators
+
+
+def _load_results(results_path, fingerprint):
+    """ Results already recorded for the same data, keyed by (params, n_estimators). """
+    results = {}
+    if results_path is None or not os.path.exists(results_path):
+        return results
+    with open(results_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            if result.get("fingerprint") == fingerprint:
+                results[_result_key(result["params"], result["n_estimators"])] = result
+    return results
+
+
+def search_hyperparameters(
+    X_train, y_train, X_test, y_test, candidates, base_hyperparameters, min_estimators=10,
+    max_estimators=100, eta=3, latency_budget_ms=None, n_workers=None, results_path=None
+):
+    """ Successive halving search over forest hyperparameters, run in parallel processes.
+
+    All candidates are first trained with a small number of trees; only the best
+    1/`eta` by F-beta on the evaluation data move on to the next rung, which trains
+    `eta` times more trees, up to `max_estimators`. The encoded matrices are built once
+    by the caller and shared with the workers (inherited on fork, otherwise sent once
+    per worker), and each candidate trains single-threaded so the pool fills the cores.
+
+    Every evaluation also records the p99 latency of predicting a single row with the
+    compiled serving evaluator. With a `latency_budget_ms`, candidates over the budget
+    are dropped at the rung where they exceed it, since more trees only make them slower.
+
+    With a `results_path`, each evaluation is appended to a JSON lines file as soon as
+    it finishes. Evaluations already recorded there for the same data are reused, so an
+    interrupted sweep resumes where it stopped.
+
+    Inputs
+    ------
+    X_train : np.ndarray or scipy.sparse.csr_matrix
+        Encoded training data.
+    y_train : np.ndarray
+        Training labels.
+    X_test : np.ndarray or scipy.sparse.csr_matrix
+        Encoded evaluation data.
+    y_test : np.ndarray
+        Evaluation labels.
+    candidates : list[dict]
+        Hyperparameter combinations, e.g. from expand_search_space.
+    base_hyperparameters : dict
+        Hyperparameters shared by every candidate; `n_estimators` and `n_jobs` are
+        overridden.
+    min_estimators : int
+        Smallest number of trees, used in the first rung.
+    max_estimators : int
+        Number of trees in the last rung.
+    eta : int
+        Halving rate: the fraction 1/eta of candidates is kept at each rung.
+    latency_budget_ms : float
+        Maximum p99 single-row latency of a selected candidate.
+    n_workers : int
+        Number of worker processes. Defaults to the number of cores.
+    results_path : str
+        JSON lines file recording every evaluation.
+    Returns
+    -------
+    best : dict or None
+        Hyperparameters of the best candidate with `max_estimators` trees within the
+        latency budget, or None if no candidate meets the budget.
+    results : pd.DataFrame
+        One row per evaluation with columns rung, params, n_estimators, precision,
+        recall, fbeta, fit_s and p99_ms.
+    """
+    fingerprint = _data_fingerprint(X_train, y_train, X_test, y_test, base_hyperparameters)
+    recorded = _load_results(results_path, fingerprint)
+    context = (X_train, y_train, X_test, y_test, base_hyperparameters)
+
+    n_workers = max(1, n_workers or os.cpu_count() or 1)
+
+    results = []
+    survivors = list(candidates)
+    out = open(results_path, "a") if results_path is not None else None
+    try:
+        with shared_pool("search", context, n_workers) as pool:
+            for rung, n_estimators in enumerate(_rungs(min_estimators, max_estimators, eta)):
+                rung_results = []
+                pending = []
+                for params in survivors:
+                    result = recorded.get(_result_key(params, n_estimators))
+                    if result is not None:
+                        rung_results.append(result)
+                    else:
+                        pending.append(params)
+
+                if pool is None:
+                    evaluations = (_evaluate(params, n_estimators) for params in pending)
+                else:
+                    futures = [pool.submit(_evaluate, params, n_estimators) for params in pending]
+                    evaluations = (future.result() for future in as_completed(futures))
+                for result in evaluations:
+                    result["fingerprint"] = fingerprint
+                    rung_results.append(result)
+                    if out is not None:
+                        out.write(json.dumps(result) + "\n")
+                        out.flush()
+
+                for result in rung_results:
+                    results.append({"rung": rung, **{k: v for k, v in result.items() if k != "fingerprint"}})
+
+                # Keep the best 1/eta of the candidates that are still within the latency budget
+                rung_results = [
+                    result for result in rung_results
+                    if latency_budget_ms is None or result["p99_ms"] <= latency_budget_ms
+                ]
+                rung_results.sort(key=lambda result: (-result["fbeta"], result["p99_ms"]))
+                n_survivors = max(1, math.ceil(len(rung_results) / eta))
+                survivors = [result["params"] for result in rung_results[:n_survivors]]
+                if not survivors:
+                    break
+    finally:
+        if out is not None:
+            out.close()
+
+    columns = ["rung", "params", "n_estimators", "precision", "recall", "fbeta", "fit_s", "p99_ms"]
+    results = pd.DataFrame(results, columns=columns)
+    final = results[results["n_estimators"] == max_estimators]
+    if latency_budget_ms is not None:
+        final = final[final["p99_ms"] <= latency_budget_ms]
+    if final.empty:
+        return None, results
+    best = final.sort_values(["fbeta", "p99_ms"], ascending=[False, True], kind="stable").iloc[0]
+    return {**base_hyperparameters, **best["params"], "n_estimators": max_estimators}, results
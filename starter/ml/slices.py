@@ -0,0 +1,99 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from .model import metrics_from_counts
+
+
+def _frequent_mask(data, combo, frequent):
+    """ Rows whose values on every (k-1)-sub-combination of `combo` are frequent.
+
+    By the apriori property, a combination of values can only reach the minimum support
+    if all of its sub-combinations do, so other rows can be dropped before grouping.
+    """
+    mask = np.ones(len(data), dtype=bool)
+    for sub in combinations(combo, len(combo) - 1):
+        if len(sub) == 1:
+            mask &= data[sub[0]].isin(frequent[sub]).to_numpy()
+        else:
+            mask &= pd.MultiIndex.from_frame(data[list(sub)]).isin(frequent[sub])
+    return mask
+
+
+def compute_intersectional_slice_metrics(data, cat_features, y, preds, max_order=3, min_support=30):
+    """ Compute model performance on slices defined by combinations of categorical features.
+
+    Every combination of 2 up to `max_order` features (e.g. race x sex x education) is
+    evaluated with one vectorized group-by over the precomputed predictions. Combinations
+    of values seen in fewer than `min_support` rows are dropped, and rows that can only
+    form such sparse slices are pruned before grouping the next order.
+
+    Inputs
+    ------
+    data : pd.DataFrame
+        Dataset containing the categorical features, row-aligned with `y` and `preds`.
+    cat_features : list
+        List of categorical feature names.
+    y : np.ndarray
+        Known labels, binarized.
+    preds : np.ndarray
+        Predicted labels, binarized.
+    max_order : int
+        Largest number of features combined in a slice.
+    min_support : int
+        Minimum number of rows in a reported slice.
+    Returns
+    -------
+    slice_metrics : pd.DataFrame
+        One row per slice with columns order, features, values, count, tp, fp, fn,
+        precision, recall and fbeta, sorted by ascending fbeta then descending count.
+    """
+    y = np.asarray(y).astype(bool)
+    preds = np.asarray(preds).astype(bool)
+    frame = data[list(cat_features)].reset_index(drop=True).assign(
+        _tp=(y & preds).astype(np.int64),
+        _fp=(~y & preds).astype(np.int64),
+        _fn=(y & ~preds).astype(np.int64),
+    )
+
+    # Frequent values of single features seed the pruning
+    frequent = {}
+    for feature in cat_features:
+        counts = frame[feature].value_counts()
+        frequent[(feature,)] = counts.index[counts >= min_support]
+
+    results = []
+    for order in range(2, max_order + 1):
+        for combo in combinations(cat_features, order):
+            subset = frame[_frequent_mask(frame, combo, frequent)]
+            groups = subset.groupby(list(combo), observed=True, sort=False).agg(
+                count=("_tp", "size"), tp=("_tp", "sum"), fp=("_fp", "sum"), fn=("_fn", "sum")
+            )
+            groups = groups[groups["count"] >= min_support]
+            frequent[combo] = groups.index
+            if groups.empty:
+                continue
+
+            precision, recall, fbeta = metrics_from_counts(groups["tp"], groups["fp"], groups["fn"])
+            results.append(pd.DataFrame({
+                "order": order,
+                "features": " x ".join(combo),
+                "values": [" x ".join(map(str, values)) for values in groups.index],
+                "count": groups["count"].to_numpy(),
+                "tp": groups["tp"].to_numpy(),
+                "fp": groups["fp"].to_numpy(),
+                "fn": groups["fn"].to_numpy(),
+                "precision": precision,
+                "recall": recall,
+                "fbeta": fbeta,
+            }))
+
+    columns = ["order", "features", "values", "count", "tp", "fp", "fn", "precision", "recall", "fbeta"]
+    if not results:
+        return pd.DataFrame(columns=columns)
+    return (
+        pd.concat(results, ignore_index=True)[columns]
+        .sort_values(["fbeta", "count"], ascending=[True, False], kind="stable")
+        .reset_index(drop=True)
+    )
@@ -0,0 +1,86 @@
+"""
+Unit tests for the model bundle format.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from starter.ml.bundle import BundleError, bundle_version, load_bundle, save_bundle, verify_bundle
+from starter.ml.data import process_data
+from starter.ml.model import inference, train_model
+
+
+def _trained(encoding="onehot", n=300, seed=0):
+    rng = np.random.RandomState(seed)
+    data = pd.DataFrame({
+        "age": rng.randint(18, 80, n),
+        "sex": rng.choice(["Male", "Female"], n),
+        "race": rng.choice(["White", "Black", "Other"], n),
+    })
+    data["salary"] = np.where((data["age"] > 45) & (data["sex"] == "Male"), ">50K", "<=50K")
+    X, y, encoder, lb = process_data(
+        data, categorical_features=["sex", "race"], label="salary", training=True, encoding=encoding
+    )
+    model = train_model(X, y, {"n_estimators": 10, "max_depth": 5, "random_state": 42})
+    return data, X, model, encoder, lb
+
+
+@pytest.mark.parametrize("encoding", ["onehot", "ordinal"])
+def test_bundle_round_trip(tmp_path, encoding):
+    """Test that a loaded bundle encodes and predicts exactly like the saved artifacts."""
+    data, X, model, encoder, lb = _trained(encoding)
+    save_bundle(str(tmp_path), model, encoder, lb, ["sex", "race"], ["age", "sex", "race"],
+                metadata={"hyperparameters": {"n_estimators": 10}},
+                calibration={"method": "platt", "a": 4.0, "b": -2.0},
+                decision_profiles={"strict": {"rule": "precision:0.9", "threshold": 0.7}})
+
+    bundle = load_bundle(str(tmp_path))
+
+    X_loaded, _, _, _ = process_data(
+        data.drop(columns=["salary"]), categorical_features=["sex", "race"], training=False,
+        encoder=bundle.encoder, lb=bundle.lb
+    )
+    np.testing.assert_array_equal(X_loaded, X)
+    np.testing.assert_array_equal(bundle.lb.classes_, lb.classes_)
+    np.testing.assert_array_equal(
+        bundle.lb.inverse_transform(inference(bundle.predictor, X)),
+        lb.inverse_transform(inference(model, X))
+    )
+    assert isinstance(bundle.predictor.value, np.memmap)
+    assert bundle.feature_order == ["age", "sex", "race"]
+    assert bundle.metadata == {"hyperparameters": {"n_estimators": 10}}
+    assert bundle.calibration == {"method": "platt", "a": 4.0, "b": -2.0}
+    assert bundle.decision_profiles == {"strict": {"rule": "precision:0.9", "threshold": 0.7}}
+    assert len(bundle.version) == 12
+    assert bundle_version(str(tmp_path)) == bundle.version == verify_bundle(str(tmp_path))
+
+
+def test_bundle_detects_corruption_and_version_mismatch(tmp_path):
+    """Test that tampered files and unknown format versions are rejected."""
+    _, _, model, encoder, lb = _trained()
+    save_bundle(str(tmp_path), model, encoder, lb, ["sex", "race"], ["age", "sex", "race"])
+
+    threshold = tmp_path / "threshold.npy"
+    content = bytearray(threshold.read_bytes())
+    content[-1] ^= 0xFF
+    threshold.write_bytes(bytes(content))
+    # Checksums are only read when verifying, e.g. at deploy time
+    load_bundle(str(tmp_path))
+    with pytest.raises(BundleError, match="threshold.npy"):
+        verify_bundle(str(tmp_path))
+    with pytest.raises(BundleError, match="threshold.npy"):
+        load_bundle(str(tmp_path), verify=True)
+
+    threshold.unlink()
+    with pytest.raises(BundleError, match="missing: threshold.npy"):
+        load_bundle(str(tmp_path))
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    manifest["format_version"] = 999
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    with pytest.raises(BundleError, match="format version"):
+        load_bundle(str(tmp_path))
+
+    with pytest.raises(BundleError, match="manifest"):
+        load_bundle(str(tmp_path / "missing"))
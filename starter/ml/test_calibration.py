@@ -0,0 +1,37 @@
+"""
+Unit tests for probability calibration.
+"""
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from starter.ml.calibration import calibrate, fit_platt
+
+
+def test_platt_recovers_logistic_relationship():
+    """Test that Platt scaling matches an unregularized logistic regression on the scores."""
+    rng = np.random.RandomState(0)
+    scores = rng.rand(5000)
+    y = (rng.rand(5000) < 1 / (1 + np.exp(-(6 * scores - 4)))).astype(int)
+
+    calibration = fit_platt(scores, y)
+    reference = LogisticRegression(C=1e6).fit(scores[:, None], y)
+
+    assert calibration["a"] == pytest.approx(reference.coef_[0, 0], rel=0.05)
+    assert calibration["b"] == pytest.approx(reference.intercept_[0], rel=0.05)
+    np.testing.assert_allclose(
+        calibrate(calibration, scores), reference.predict_proba(scores[:, None])[:, 1], atol=0.01
+    )
+
+
+def test_platt_stays_finite_on_separable_scores():
+    """Test that perfectly separating scores give a finite, monotone calibration."""
+    scores = np.array([0.1, 0.2, 0.3, 0.7, 0.8, 0.9])
+    y = np.array([0, 0, 0, 1, 1, 1])
+
+    calibration = fit_platt(scores, y)
+    probabilities = calibrate(calibration, scores)
+
+    assert np.isfinite([calibration["a"], calibration["b"]]).all()
+    assert np.all(np.diff(probabilities) > 0)
+    assert 0 < probabilities[0] < 0.5 < probabilities[-1] < 1
+    np.testing.assert_array_equal(calibrate(None, scores), scores)
@@ -0,0 +1,67 @@
+"""
+Unit tests for the compiled forest evaluator.
+"""
+import numpy as np
+import scipy.sparse
+from sklearn.model_selection import train_test_split
+from starter.ml.model import train_model, inference
+from starter.ml.compiled import CompiledForest
+
+
+def test_compiled_forest_matches_inference():
+    """Test that the compiled forest predicts exactly like inference on the test split."""
+    rng = np.random.RandomState(0)
+    X = np.hstack([rng.randint(0, 100000, (600, 3)), rng.randint(0, 2, (600, 10))]).astype(float)
+    y = ((X[:, 0] > 50000) ^ (X[:, 3] == 1)).astype(int)
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.20, random_state=0)
+    hyperparameters = {
+        "n_estimators": 25,
+        "max_depth": 10,
+        "random_state": 42
+    }
+    model = train_model(X_train, y_train, hyperparameters)
+
+    compiled = CompiledForest.from_model(model)
+
+    np.testing.assert_array_equal(compiled.predict(X_test), inference(model, X_test))
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test))
+
+
+def test_compiled_forest_single_row():
+    """Test that a single row returns a single prediction of the model's classes."""
+    X_train = np.random.rand(100, 5)
+    y_train = np.random.randint(0, 2, 100)
+    model = train_model(X_train, y_train, {"n_estimators": 10, "random_state": 42})
+
+    preds = inference(CompiledForest.from_model(model), X_train[:1])
+
+    assert preds.shape == (1,)
+    assert preds[0] in model.classes_
+    assert preds[0] == inference(model, X_train[:1])[0]
+
+
+def test_compiled_forest_save_and_mmap_load(tmp_path):
+    """Test that a saved forest memory-maps back and predicts identically."""
+    X_train = np.random.rand(200, 6)
+    y_train = np.random.randint(0, 2, 200)
+    model = train_model(X_train, y_train, {"n_estimators": 10, "max_depth": 5, "random_state": 42})
+    compiled = CompiledForest.from_model(model)
+
+    compiled.save(str(tmp_path))
+    loaded = CompiledForest.load(str(tmp_path), mmap_mode="r")
+
+    assert isinstance(loaded.threshold, np.memmap)
+    assert loaded.max_depth == compiled.max_depth
+    assert loaded.n_features_in_ == 6
+    np.testing.assert_array_equal(loaded.predict(X_train), inference(model, X_train))
+
+
+def test_compiled_forest_sparse_input():
+    """Test that the compiled forest accepts CSR input like the sklearn forest."""
+    X_train = (np.random.rand(200, 8) > 0.7).astype(float)
+    y_train = np.random.randint(0, 2, 200)
+    model = train_model(scipy.sparse.csr_matrix(X_train), y_train, {"n_estimators": 10, "random_state": 42})
+
+    X_sparse = scipy.sparse.csr_matrix(X_train)
+
+    np.testing.assert_array_equal(CompiledForest.from_model(model).predict(X_sparse), inference(model, X_sparse))
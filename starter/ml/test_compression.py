@@ -0,0 +1,82 @@
+"""
+Unit tests for post-training model compression.
+"""
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from starter.ml.compiled import CompiledForest
+from starter.ml.compression import _prune_tree, cap_depth, compression_report, distill, drop_trees
+
+
+def _model(seed=0):
+    rng = np.random.RandomState(seed)
+    X = rng.rand(500, 6)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + 0.2 * rng.rand(500) > 0.8).astype(int)
+    model = RandomForestClassifier(n_estimators=20, max_depth=10, random_state=seed).fit(X, y)
+    return model, X, y
+
+
+def test_drop_trees():
+    """Test that dropping trees keeps the first trees and leaves the original intact."""
+    model, X, _ = _model()
+
+    compressed = drop_trees(model, 5)
+
+    assert len(compressed.estimators_) == 5
+    assert len(model.estimators_) == 20
+    expected = np.mean([tree.predict_proba(X) for tree in model.estimators_[:5]], axis=0)
+    np.testing.assert_allclose(compressed.predict_proba(X), expected)
+
+
+def test_cap_depth_matches_retrained_depth_limit():
+    """Test that a tree cut at depth d predicts like the same tree grown with max_depth=d."""
+    model, X, y = _model()
+    bootstrap_free = RandomForestClassifier(
+        n_estimators=3, max_depth=None, bootstrap=False, max_features=None, random_state=0
+    ).fit(X, y)
+    shallow = RandomForestClassifier(
+        n_estimators=3, max_depth=3, bootstrap=False, max_features=None, random_state=0
+    ).fit(X, y)
+
+    compressed = pickle.loads(pickle.dumps(cap_depth(bootstrap_free, 3)))
+
+    assert all(tree.tree_.max_depth <= 3 for tree in compressed.estimators_)
+    assert compressed.estimators_[0].tree_.node_count == shallow.estimators_[0].tree_.node_count
+    np.testing.assert_allclose(compressed.predict_proba(X), shallow.predict_proba(X))
+    np.testing.assert_array_equal(CompiledForest.from_model(compressed).predict(X), compressed.predict(X))
+    # The original forest is untouched
+    assert bootstrap_free.estimators_[0].tree_.max_depth > 3
+    assert cap_depth(model, 4).estimators_[0].tree_.max_depth == 4
+
+
+def test_cap_depth_rejects_unknown_tree_layout():
+    """Test that a tree state without the expected node fields fails clearly instead of being rewritten."""
+    model, _, _ = _model()
+    tree = model.estimators_[0].tree_
+    state = tree.__getstate__()
+    names = [name for name in state["nodes"].dtype.names if name != "threshold"]
+
+    class RenamedFieldTree:
+        max_depth = tree.max_depth
+
+        def __getstate__(self):
+            return {**state, "nodes": state["nodes"][names]}
+
+    with pytest.raises(RuntimeError, match="missing nodes.threshold"):
+        _prune_tree(RenamedFieldTree(), 3)
+
+
+def test_distill_and_report():
+    """Test that a distilled single tree mostly agrees with its teacher and is reported."""
+    model, X, y = _model()
+
+    student = distill(model, X, n_trees=1, max_depth=6)
+    report = compression_report({"full": model, "distilled": student}, X, y, repeats=5)
+
+    assert len(student.estimators_) == 1
+    assert (student.predict(X) == model.predict(X)).mean() > 0.9
+    assert list(report["variant"]) == ["full", "distilled"]
+    assert list(report["n_trees"]) == [20, 1]
+    assert report.loc[1, "n_nodes"] < report.loc[0, "n_nodes"]
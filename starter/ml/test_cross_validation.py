@@ -0,0 +1,34 @@
+"""
+Unit tests for K-fold cross validation.
+"""
+import numpy as np
+import pandas as pd
+from starter.ml.cross_validation import cross_validate
+
+
+def _data(n=300, seed=0):
+    rng = np.random.RandomState(seed)
+    data = pd.DataFrame({
+        "age": rng.randint(18, 80, n),
+        "hours-per-week": rng.randint(10, 60, n),
+        "sex": rng.choice(["Male", "Female"], n),
+        "race": rng.choice(["White", "Black", "Other"], n),
+    })
+    data["salary"] = np.where(data["age"] + rng.randint(0, 30, n) > 60, ">50K", "<=50K")
+    return data
+
+
+def test_cross_validate_parallel_matches_inline():
+    """Test that folds run in worker processes give the same metrics as inline folds."""
+    data = _data()
+    hyperparameters = {"n_estimators": 10, "max_depth": 5, "random_state": 42}
+
+    parallel = cross_validate(data, ["sex", "race"], "salary", hyperparameters, n_splits=3, n_workers=2)
+    inline = cross_validate(data, ["sex", "race"], "salary", hyperparameters, n_splits=3, n_workers=1)
+
+    assert list(parallel["fold"]) == [0, 1, 2]
+    assert parallel["test_rows"].sum() == len(data)
+    assert (parallel["train_rows"] + parallel["test_rows"] == len(data)).all()
+    metrics = parallel[["precision", "recall", "fbeta"]].to_numpy()
+    assert ((metrics >= 0.0) & (metrics <= 1.0)).all()
+    pd.testing.assert_frame_equal(parallel, inline)
@@ -0,0 +1,71 @@
+"""
+Unit tests for the data module.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from starter.ml.data import UNKNOWN_CATEGORY_CODE, clean_data, process_data
+
+
+def test_clean_data_strips_spaces():
+    """Test that spaces are removed from column names and string values only."""
+    raw = io.StringIO("age, workclass, native-country\n39, State-gov, United-States\n50, Self-emp-not-inc, Cuba\n")
+    data = pd.read_csv(raw)
+
+    cleaned = clean_data(data)
+
+    assert list(cleaned.columns) == ["age", "workclass", "native-country"]
+    assert list(cleaned["workclass"]) == ["State-gov", "Self-emp-not-inc"]
+    assert list(cleaned["age"]) == [39, 50]
+    # The input is left untouched
+    assert list(data.columns) == ["age", " workclass", " native-country"]
+
+
+def test_process_data_sparse_matches_dense():
+    """Test that sparse mode yields a CSR matrix with the same values as dense mode."""
+    data = pd.DataFrame({
+        "age": [39, 50, 38, 53],
+        "workclass": ["State-gov", "Self-emp-not-inc", "Private", "Private"],
+        "sex": ["Male", "Male", "Female", "Male"],
+        "salary": ["<=50K", ">50K", "<=50K", ">50K"],
+    })
+    cat_features = ["workclass", "sex"]
+
+    X_dense, y_dense, _, _ = process_data(data, cat_features, label="salary", training=True)
+    X_sparse, y_sparse, encoder, lb = process_data(
+        data, cat_features, label="salary", training=True, sparse=True
+    )
+
+    assert scipy.sparse.issparse(X_sparse)
+    assert X_sparse.format == "csr"
+    np.testing.assert_array_equal(X_sparse.toarray(), X_dense)
+    np.testing.assert_array_equal(y_sparse, y_dense)
+
+    # Inference follows the layout stored in the encoder
+    X_inference, _, _, _ = process_data(
+        data, cat_features, label="salary", training=False, encoder=encoder, lb=lb
+    )
+    assert scipy.sparse.issparse(X_inference)
+    np.testing.assert_array_equal(X_inference.toarray(), X_dense)
+
+
+def test_process_data_ordinal_encoding():
+    """Test that ordinal mode keeps one column per categorical feature with a reserved unknown code."""
+    data = pd.DataFrame({
+        "age": [39, 50, 38],
+        "workclass": ["State-gov", "Private", "Private"],
+        "sex": ["Male", "Female", "Male"],
+        "salary": ["<=50K", ">50K", "<=50K"],
+    })
+    cat_features = ["workclass", "sex"]
+
+    X, _, encoder, lb = process_data(data, cat_features, label="salary", training=True, encoding="ordinal")
+
+    assert X.shape == (3, 3)
+    np.testing.assert_array_equal(X[:, 1], [1, 0, 0])  # categories are sorted: Private, State-gov
+
+    unseen = data.assign(workclass=["Never-worked", "Private", "State-gov"])
+    X_unseen, _, _, _ = process_data(unseen, cat_features, label="salary", training=False, encoder=encoder, lb=lb)
+    np.testing.assert_array_equal(X_unseen[:, 1], [UNKNOWN_CATEGORY_CODE, 0, 1])
@@ -3,7 +3,9 @@ Unit tests for the model module.
 """
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from starter.ml.model import train_model, compute_model_metrics, inference
+from sklearn.metrics import fbeta_score, precision_score, recall_score
+from starter.ml.compiled import CompiledForest
+from starter.ml.model import train_model, compute_batch_model_metrics, compute_model_metrics, inference, inference_proba
 
 def test_train_model():
     """Test that train_model returns a fitted RandomForestClassifier."""
@@ -52,6 +54,22 @@ def test_inference():
     assert all(pred in [0, 1] for pred in preds)
 
 
+def test_inference_proba_matches_predict():
+    """Test that predictions from the probability pass match predict for both evaluators."""
+    rng = np.random.RandomState(0)
+    X_train = rng.rand(200, 5)
+    y_train = (X_train[:, 0] + 0.3 * rng.rand(200) > 0.6).astype(int)
+    model = train_model(X_train, y_train, {"n_estimators": 10, "random_state": 42})
+    X_test = rng.rand(50, 5)
+
+    for predictor in (model, CompiledForest.from_model(model)):
+        preds, proba = inference_proba(predictor, X_test)
+
+        np.testing.assert_array_equal(preds, inference(predictor, X_test))
+        np.testing.assert_allclose(proba, model.predict_proba(X_test))
+        np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+
 def test_model_metrics_with_partial_accuracy():
     """Test metrics calculation with partial accuracy."""
     y = np.array([0, 0, 1, 1])
@@ -64,3 +82,26 @@ def test_model_metrics_with_partial_accuracy():
     assert 0.0 < fbeta <= 1.0
     assert abs(precision - 0.6667) < 0.001
     assert recall == 1.0
+
+
+def test_batch_model_metrics_match_sklearn():
+    """Test that per-slice metrics from one pass match sklearn on every slice."""
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 500)
+    preds = rng.integers(0, 2, 500)
+    slice_ids = rng.integers(0, 6, 500)
+    # Degenerate slices: no positives at all, and no predicted positives
+    y[slice_ids == 4] = 0
+    preds[slice_ids == 4] = 0
+    preds[slice_ids == 5] = 0
+
+    precision, recall, fbeta = compute_batch_model_metrics(y, preds, slice_ids, n_slices=7)
+
+    assert precision.shape == (7,)
+    for i in range(6):
+        mask = slice_ids == i
+        assert precision[i] == precision_score(y[mask], preds[mask], zero_division=1)
+        assert recall[i] == recall_score(y[mask], preds[mask], zero_division=1)
+        assert abs(fbeta[i] - fbeta_score(y[mask], preds[mask], beta=1, zero_division=1)) < 1e-12
+    # Empty slice
+    assert (precision[6], recall[6], fbeta[6]) == (1.0, 1.0, 1.0)
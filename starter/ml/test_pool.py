@@ -0,0 +1,29 @@
+"""
+Unit tests for the process pools shared by cross validation and the hyperparameter search.
+"""
+import multiprocessing
+
+import pytest
+from starter.ml import _pool
+from starter.ml._pool import pool_context, shared_pool
+
+
+def _read_context(i):
+    return pool_context("test")[i]
+
+
+@pytest.mark.parametrize("fork", [True, False])
+def test_shared_pool_hands_the_context_to_workers(monkeypatch, fork):
+    """Test that workers read the context with and without fork, and that it is dropped afterwards."""
+    if not fork:
+        monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    context = ("a", "b", "c")
+
+    with shared_pool("test", context, n_workers=2) as pool:
+        assert list(pool.map(_read_context, range(3))) == ["a", "b", "c"]
+
+    with shared_pool("test", context, n_workers=1) as pool:
+        assert pool is None
+        assert _read_context(2) == "c"
+
+    assert "test" not in _pool._contexts
@@ -0,0 +1,89 @@
+"""
+Unit tests for the hyperparameter search.
+"""
+import numpy as np
+from starter.ml import search
+from starter.ml.search import expand_search_space, search_hyperparameters
+
+
+def _data(n=400, seed=0):
+    rng = np.random.RandomState(seed)
+    X = rng.rand(n, 4)
+    y = (X[:, 0] + 0.3 * rng.rand(n) > 0.6).astype(int)
+    return X[:300], y[:300], X[300:], y[300:]
+
+
+def test_expand_search_space():
+    """Test grid expansion and reproducible random sampling."""
+    space = {"max_depth": [5, 10, None], "min_samples_leaf": [1, 5]}
+
+    grid = expand_search_space(space)
+    sampled = expand_search_space(space, n_iter=4, random_state=0)
+
+    assert len(grid) == 6
+    assert {"max_depth": None, "min_samples_leaf": 5} in grid
+    assert len(sampled) == 4
+    assert all(candidate in grid for candidate in sampled)
+    assert sampled == expand_search_space(space, n_iter=4, random_state=0)
+
+
+def test_search_halves_candidates_and_resumes(tmp_path, monkeypatch):
+    """Test that only the best candidates reach the last rung and a rerun reuses saved results."""
+    X_train, y_train, X_test, y_test = _data()
+    candidates = expand_search_space({"max_depth": [1, 2, 4], "min_samples_leaf": [1, 20, 50]})
+    base = {"random_state": 42}
+    results_path = str(tmp_path / "search.jsonl")
+
+    best, results = search_hyperparameters(
+        X_train, y_train, X_test, y_test, candidates, base, min_estimators=3, max_estimators=27,
+        eta=3, n_workers=1, results_path=results_path
+    )
+
+    assert list(results.groupby("rung").size()) == [9, 3, 1]
+    assert list(results.groupby("rung")["n_estimators"].first()) == [3, 9, 27]
+    last = results[results["rung"] == 2].iloc[0]
+    assert best == {**base, **last["params"], "n_estimators": 27}
+
+    # A resumed sweep finds every evaluation on disk and trains nothing
+    def fail(params, n_estimators):
+        raise AssertionError("candidate evaluated again")
+
+    monkeypatch.setattr(search, "_evaluate", fail)
+    resumed_best, resumed = search_hyperparameters(
+        X_train, y_train, X_test, y_test, candidates, base, min_estimators=3, max_estimators=27,
+        eta=3, n_workers=1, results_path=results_path
+    )
+    assert resumed_best == best
+    assert len(resumed) == len(results)
+
+
+def test_search_latency_budget():
+    """Test that no candidate is selected when none meets the latency budget."""
+    X_train, y_train, X_test, y_test = _data()
+
+    best, results = search_hyperparameters(
+        X_train, y_train, X_test, y_test, [{"max_depth": 2}], {"random_state": 42},
+        min_estimators=5, max_estimators=5, n_workers=1, latency_budget_ms=0.0
+    )
+
+    assert best is None
+    assert len(results) == 1
+
+
+def test_search_parallel_matches_inline():
+    """Test that candidates scored in worker processes match inline scoring."""
+    X_train, y_train, X_test, y_test = _data()
+    candidates = expand_search_space({"max_depth": [2, 4]})
+    kwargs = dict(min_estimators=5, max_estimators=5, eta=2)
+
+    _, parallel = search_hyperparameters(
+        X_train, y_train, X_test, y_test, candidates, {"random_state": 42}, n_workers=2, **kwargs
+    )
+    _, inline = search_hyperparameters(
+        X_train, y_train, X_test, y_test, candidates, {"random_state": 42}, n_workers=1, **kwargs
+    )
+
+    def key(results):
+        return sorted((str(r["params"]), r["fbeta"]) for _, r in results.iterrows())
+
+    assert key(parallel) == key(inline)
@@ -0,0 +1,59 @@
+"""
+Unit tests for the intersectional slice engine.
+"""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from starter.ml.model import compute_model_metrics
+from starter.ml.slices import compute_intersectional_slice_metrics
+
+
+def _data(n=600, seed=0):
+    rng = np.random.RandomState(seed)
+    data = pd.DataFrame({
+        "race": rng.choice(["White", "Black", "Other"], n, p=[0.7, 0.25, 0.05]),
+        "sex": rng.choice(["Male", "Female"], n),
+        "education": rng.choice(["HS-grad", "Bachelors", "Masters", "Doctorate"], n, p=[0.5, 0.3, 0.15, 0.05]),
+    })
+    y = rng.randint(0, 2, n)
+    preds = np.where(rng.rand(n) < 0.8, y, 1 - y)
+    return data, y, preds
+
+
+def test_intersectional_metrics_match_brute_force():
+    """Test that every reported slice matches metrics computed on its filtered rows."""
+    data, y, preds = _data()
+    cat_features = ["race", "sex", "education"]
+
+    result = compute_intersectional_slice_metrics(data, cat_features, y, preds, max_order=3, min_support=20)
+
+    expected = {}
+    for order in (2, 3):
+        for combo in combinations(cat_features, order):
+            for values, rows in data.groupby(list(combo)):
+                mask = data.index.isin(rows.index)
+                if mask.sum() >= 20:
+                    key = (" x ".join(combo), " x ".join(values))
+                    expected[key] = (int(mask.sum()), *compute_model_metrics(y[mask], preds[mask]))
+
+    assert len(result) == len(expected)
+    for row in result.itertuples():
+        count, precision, recall, fbeta = expected[(row.features, row.values)]
+        assert row.count == count
+        assert abs(row.precision - precision) < 1e-12
+        assert abs(row.recall - recall) < 1e-12
+        assert abs(row.fbeta - fbeta) < 1e-12
+
+
+def test_intersectional_min_support_prunes_and_sorts():
+    """Test that sparse slices are dropped and results are sorted by ascending fbeta."""
+    data, y, preds = _data()
+
+    result = compute_intersectional_slice_metrics(data, ["race", "sex", "education"], y, preds,
+                                                  max_order=3, min_support=50)
+
+    assert (result["count"] >= 50).all()
+    assert not result["values"].str.contains("Other").any()
+    assert result["fbeta"].is_monotonic_increasing
+    assert set(result["order"]) <= {2, 3}
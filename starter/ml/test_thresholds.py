@@ -0,0 +1,84 @@
+"""
+Unit tests for decision thresholds.
+"""
+import numpy as np
+import pytest
+from starter.ml.model import compute_model_metrics
+from starter.ml.thresholds import decision_profiles, parse_rule, select_threshold, threshold_curve
+
+
+def _scores(n=400, seed=0):
+    rng = np.random.RandomState(seed)
+    y = rng.randint(0, 2, n)
+    # Forest-like scores: coarse, with many ties
+    scores = np.clip(np.round(0.35 * y + 0.65 * rng.rand(n), 1), 0, 1)
+    return y, scores
+
+
+def test_threshold_curve_matches_brute_force():
+    """Test that the counts at every threshold match predicting with that threshold."""
+    y, scores = _scores()
+    thresholds, tp, fp, fn = threshold_curve(y, scores)
+
+    assert np.all(np.diff(thresholds) < 0)
+    # Only "everything positive" may sit on a score, when the lowest score is 0
+    assert not np.isin(thresholds[:-1], scores).any()
+    for threshold, *counts in zip(thresholds, tp, fp, fn):
+        preds = scores >= threshold
+        assert counts == [np.sum(preds & (y == 1)), np.sum(preds & (y == 0)), np.sum(~preds & (y == 1))]
+
+
+@pytest.mark.parametrize("rule", ["fbeta", "fbeta:2", "precision:0.8", "recall:0.9", "cost:1:5"])
+def test_select_threshold_is_optimal(rule):
+    """Test that the selected threshold is the best one for the rule, and its metrics are reported."""
+    y, scores = _scores()
+    profile = select_threshold(y, scores, rule)
+
+    precision, recall, fbeta = compute_model_metrics(y, (scores >= profile["threshold"]).astype(int))
+    assert (profile["precision"], profile["recall"], profile["fbeta"]) == pytest.approx((precision, recall, fbeta))
+
+    kind, params = parse_rule(rule)
+    candidates = [compute_model_metrics(y, (scores >= t).astype(int)) for t in threshold_curve(y, scores)[0][1:]]
+    if kind == "fbeta" and not params:
+        assert fbeta == pytest.approx(max(c[2] for c in candidates))
+    elif kind == "precision":
+        assert profile["target_met"] and precision >= 0.8
+        assert recall == pytest.approx(max(c[1] for c in candidates if c[0] >= 0.8))
+    elif kind == "recall":
+        assert recall >= 0.9
+        assert precision == pytest.approx(max(c[0] for c in candidates if c[1] >= 0.9))
+    elif kind == "cost":
+        preds = scores >= profile["threshold"]
+        cost = np.sum(preds & (y == 0)) + 5 * np.sum(~preds & (y == 1))
+        assert all(cost <= np.sum((scores >= t) & (y == 0)) + 5 * np.sum((scores < t) & (y == 1))
+                   for t in threshold_curve(y, scores)[0])
+
+
+def test_recall_rule_prefers_precision_over_the_first_threshold_meeting_it():
+    """Test that a recall rule picks the most precise of all thresholds meeting the target."""
+    y = np.array([1, 0, 0, 1, 1, 1])
+    scores = np.array([0.9, 0.8, 0.7, 0.6, 0.5, 0.4])
+
+    profile = select_threshold(y, scores, "recall:0.5")
+
+    # Cutting at 0.6 is the first to reach recall 0.5, but only with precision 0.5
+    assert profile["target_met"] is True
+    assert profile["threshold"] < 0.4
+    assert (profile["precision"], profile["recall"]) == pytest.approx((4 / 6, 1.0))
+
+
+def test_decision_profiles_and_invalid_rules():
+    """Test the default profiles, an unreachable precision target and malformed rules."""
+    y, scores = _scores()
+    profiles = decision_profiles(y, scores)
+    assert set(profiles) == {"max_fbeta", "high_precision", "high_recall"}
+    assert profiles["high_precision"]["threshold"] >= profiles["high_recall"]["threshold"]
+
+    unreachable = select_threshold(np.array([0, 1, 0, 1]), np.array([0.9, 0.8, 0.7, 0.6]), "precision:0.99")
+    assert unreachable["target_met"] is False
+    unreachable = select_threshold(np.array([0, 1, 0, 1]), np.array([0.9, 0.8, 0.7, 0.6]), "recall:1.5")
+    assert unreachable["target_met"] is False and unreachable["recall"] == 1
+
+    for rule in ("precision", "cost:1", "f1", "recall:high"):
+        with pytest.raises(ValueError):
+            parse_rule(rule)
@@ -0,0 +1,159 @@
+import numpy as np
+
+from .model import metrics_from_counts
+
+# Decision profiles saved by training when no --profile is given
+DEFAULT_PROFILE_RULES = {
+    "max_fbeta": "fbeta",
+    "high_precision": "precision:0.9",
+    "high_recall": "recall:0.9",
+}
+
+
+def parse_rule(rule):
+    """ Parse a decision rule.
+
+    Rules are "fbeta" or "fbeta:BETA" (maximize F-beta, beta 1 by default),
+    "precision:TARGET" (highest recall with at least this precision),
+    "recall:TARGET" (highest precision with at least this recall) and
+    "cost:FP_COST:FN_COST" (lowest total cost of the errors).
+
+    Inputs
+    ------
+    rule : str
+        Rule to parse.
+    Returns
+    -------
+    kind : str
+        "fbeta", "precision", "recall" or "cost".
+    params : list of float
+        Parameters of the rule.
+    """
+    kind, *params = rule.split(":")
+    expected = {"fbeta": (0, 1), "precision": (1, 1), "recall": (1, 1), "cost": (2, 2)}
+    if kind not in expected or not expected[kind][0] <= len(params) <= expected[kind][1]:
+        raise ValueError(
+            f"Invalid decision rule: {rule!r} (expected 'fbeta[:BETA]', 'precision:TARGET', "
+            "'recall:TARGET' or 'cost:FP_COST:FN_COST')"
+        )
+    try:
+        params = [float(param) for param in params]
+    except ValueError:
+        raise ValueError(f"Invalid decision rule: {rule!r} (parameters must be numbers)") from None
+    return kind, params
+
+
+def threshold_curve(y, scores):
+    """ Confusion counts for every distinct decision threshold, from one sort.
+
+    A row is predicted positive when its score is at least the threshold. Each
+    threshold lies halfway between two consecutive distinct scores, so that scores
+    recomputed at serving time with a slightly different rounding (e.g. by the compiled
+    evaluator) fall on the same side of it. The first threshold is above every score
+    and predicts no positives.
+
+    Inputs
+    ------
+    y : np.ndarray
+        Known labels, binarized.
+    scores : np.ndarray
+        Probability of the positive class predicted by the model.
+    Returns
+    -------
+    thresholds : np.ndarray
+        Decision thresholds, decreasing.
+    tp : np.ndarray
+    fp : np.ndarray
+    fn : np.ndarray
+        Confusion counts at each threshold.
+    """
+    y = np.asarray(y).astype(bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    if not len(scores):
+        raise ValueError("Cannot derive decision thresholds from no scores")
+
+    order = np.argsort(-scores, kind="mergesort")
+    sorted_scores, sorted_y = scores[order], y[order]
+    # Last row of each run of tied scores: all ties are on the same side of a threshold
+    last = np.r_[np.flatnonzero(np.diff(sorted_scores) != 0), len(scores) - 1]
+    distinct = sorted_scores[last]
+
+    lower = np.r_[distinct[1:], min(distinct[-1], 0.0)]
+    upper = max(distinct[0], 1.0)
+    thresholds = np.r_[(distinct[0] + upper) / 2 if distinct[0] < upper else np.nextafter(upper, np.inf),
+                       (distinct + lower) / 2]
+
+    tp = np.r_[0, np.cumsum(sorted_y)[last]]
+    fp = np.r_[0, last + 1 - tp[1:]]
+    fn = np.count_nonzero(y) - tp
+    return thresholds, tp, fp, fn
+
+
+def select_threshold(y, scores, rule):
+    """ Derive the decision threshold that satisfies a rule on held-out data.
+
+    Inputs
+    ------
+    y : np.ndarray
+        Known labels, binarized.
+    scores : np.ndarray
+        Probability of the positive class predicted by the model.
+    rule : str
+        Decision rule, see `parse_rule`.
+    Returns
+    -------
+    profile : dict
+        JSON-serializable {"rule", "threshold", "precision", "recall", "fbeta"}, with
+        the F1 metrics reached at the threshold. "precision" and "recall" rules also
+        record whether the target was met ("target_met"); if it was not, the threshold
+        with the highest precision, respectively recall, is used.
+    """
+    kind, params = parse_rule(rule)
+    thresholds, tp, fp, fn = threshold_curve(y, scores)
+    beta = params[0] if kind == "fbeta" and params else 1
+    precision, recall, fbeta = metrics_from_counts(tp, fp, fn, beta=beta)
+
+    # Predicting no positives only makes sense as the cheapest option; np.argmax and
+    # np.argmin return the first, i.e. highest, of tied thresholds
+    profile = {"rule": rule}
+    if kind == "fbeta":
+        index = 1 + np.argmax(fbeta[1:])
+    elif kind == "precision":
+        meeting = 1 + np.flatnonzero(precision[1:] >= params[0])
+        profile["target_met"] = bool(meeting.size)
+        index = meeting[-1] if meeting.size else 1 + np.argmax(precision[1:])
+    elif kind == "recall":
+        meeting = 1 + np.flatnonzero(recall[1:] >= params[0])
+        profile["target_met"] = bool(meeting.size)
+        index = meeting[np.argmax(precision[meeting])] if meeting.size else 1 + np.argmax(recall[1:])
+    else:
+        index = np.argmin(params[0] * fp + params[1] * fn)
+
+    f1_precision, f1_recall, f1 = metrics_from_counts(tp[index], fp[index], fn[index])
+    profile.update({
+        "threshold": float(thresholds[index]),
+        "precision": float(f1_precision),
+        "recall": float(f1_recall),
+        "fbeta": float(f1),
+    })
+    return profile
+
+
+def decision_profiles(y, scores, rules=None):
+    """ Derive named decision profiles from held-out data.
+
+    Inputs
+    ------
+    y : np.ndarray
+        Known labels, binarized.
+    scores : np.ndarray
+        Probability of the positive class predicted by the model.
+    rules : dict
+        Maps profile names to decision rules; defaults to DEFAULT_PROFILE_RULES.
+    Returns
+    -------
+    profiles : dict
+        Maps profile names to the output of `select_threshold`.
+    """
+    rules = DEFAULT_PROFILE_RULES if rules is None else rules
+    return {name: select_threshold(y, scores, rule) for name, rule in rules.items()}
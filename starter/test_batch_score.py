@@ -0,0 +1,72 @@
+"""
+Unit tests for the offline batch scoring script.
+"""
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The scoring script imports its siblings as top-level modules
+sys.path.append(os.path.dirname(__file__))
+
+from batch_score import CAT_FEATURES, score_file  # noqa: E402
+from ml.data import process_data  # noqa: E402
+from ml.model import inference  # noqa: E402
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "model")
+
+
+def _raw_rows(n_rows=23):
+    """Raw census rows of both classes, with the label column."""
+    rng = np.random.RandomState(0)
+    low = {
+        "age": 25, "workclass": "Private", "fnlgt": 226802, "education": "11th", "education-num": 7,
+        "marital-status": "Never-married", "occupation": "Machine-op-inspct", "relationship": "Own-child",
+        "race": "Black", "sex": "Male", "capital-gain": 0, "capital-loss": 0, "hours-per-week": 40,
+        "native-country": "United-States", "salary": "<=50K",
+    }
+    high = {
+        **low, "age": 52, "workclass": "Self-emp-inc", "education": "Doctorate", "education-num": 16,
+        "marital-status": "Married-civ-spouse", "occupation": "Exec-managerial", "relationship": "Husband",
+        "race": "White", "capital-gain": 15024, "hours-per-week": 60, "salary": ">50K",
+    }
+    rows = [dict(high if rng.rand() < 0.4 else low) for _ in range(n_rows)]
+    for row in rows:
+        row["age"] += int(rng.randint(-5, 6))
+        row["hours-per-week"] += int(rng.randint(-10, 11))
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("output_name", ["predictions.csv", "predictions.parquet"])
+def test_score_file_keeps_row_order_with_workers(tmp_path, output_name):
+    """Test that scoring in several processes writes one prediction per row, in input order."""
+    rows = _raw_rows()
+    input_path, output_path = tmp_path / "census.csv", tmp_path / output_name
+    # Pad every field with a space like the raw census file, and leave one integer missing
+    raw = rows.to_csv(index=False).replace(",", ", ")
+    input_path.write_text(raw + raw.splitlines()[1].replace("0, 0, ", "0, , ", 1) + "\n")
+
+    n_rows = score_file(str(input_path), str(output_path), MODEL_PATH, chunksize=4, workers=2)
+
+    with open(os.path.join(MODEL_PATH, "model.pkl"), "rb") as f:
+        model = pickle.load(f)
+    with open(os.path.join(MODEL_PATH, "encoder.pkl"), "rb") as f:
+        encoder = pickle.load(f)
+    with open(os.path.join(MODEL_PATH, "lb.pkl"), "rb") as f:
+        lb = pickle.load(f)
+    X, _, _, _ = process_data(
+        rows.drop(columns="salary"), categorical_features=CAT_FEATURES, label=None,
+        training=False, encoder=encoder, lb=lb
+    )
+    expected = list(lb.inverse_transform(inference(model, X)))
+
+    predictions = pd.read_parquet(output_path) if output_name.endswith(".parquet") else pd.read_csv(output_path)
+    # The row with a missing integer is scored rather than dropped
+    assert n_rows == len(rows) + 1
+    assert list(predictions.columns) == ["prediction"]
+    assert list(predictions["prediction"])[:-1] == expected
+    assert predictions["prediction"].iloc[-1] in ("<=50K", ">50K")
+    assert set(expected) == {"<=50K", ">50K"}
@@ -0,0 +1,171 @@
+"""
+Unit tests for the helpers of the training script.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The training script imports its siblings as top-level modules
+sys.path.append(os.path.dirname(__file__))
+
+from ml.data import CENSUS_DTYPES, clean_data, process_data  # noqa: E402
+from ml.model import compute_model_metrics, inference, train_model as fit_model  # noqa: E402
+import train_model  # noqa: E402
+from train_model import (  # noqa: E402
+    _load_cached_data, _load_data, compute_slice_metrics, compute_slice_metrics_from_predictions
+)
+
+RAW_CSV = """age, workclass, fnlgt, education-num, sex, salary
+39, State-gov, 77516, 13, Male, <=50K
+50, Self-emp-not-inc, 83311, 13, Male, <=50K
+38, , 215646, 9, Male, <=50K
+53, Private, 234721, 7, Male, <=50K
+, Private, 338409, 13, Female, <=50K
+37, Private, 284582, 14, Female, >50K
+49, Private, 160187, 5, Female, <=50K
+52, Self-emp-not-inc, 209642, 9, Male, >50K
+"""
+
+
+def _per_slice_metrics(test_data, cat_features, y, preds):
+    """Reference: metrics of every slice computed separately, like the original loop."""
+    slice_metrics = []
+    for feature in cat_features:
+        for value in test_data[feature].unique():
+            mask = (test_data[feature] == value).to_numpy()
+            if not mask.any():
+                continue
+            precision, recall, fbeta = compute_model_metrics(y[mask], preds[mask])
+            slice_metrics.append({
+                'feature': feature,
+                'value': value,
+                'count': int(mask.sum()),
+                'precision': precision,
+                'recall': recall,
+                'fbeta': fbeta
+            })
+    return slice_metrics
+
+
+@pytest.mark.parametrize("n_jobs", [1, 3])
+def test_slice_metrics_match_per_slice_metrics(n_jobs):
+    """Test that the one-pass slice metrics equal the metrics of each slice computed on its own."""
+    rng = np.random.RandomState(0)
+    test_data = pd.DataFrame({
+        "workclass": rng.choice(["Private", "State-gov", "Self-emp-inc"], size=200),
+        "sex": rng.choice(["Male", "Female"], size=200),
+        "race": rng.choice(["White", "Black", "Other"], size=200, p=[0.6, 0.39, 0.01]),
+    })
+    # A slice without positives or predictions exercises the zero-division rules
+    test_data.loc[:4, "workclass"] = "Never-worked"
+    y = rng.randint(0, 2, size=200)
+    preds = np.where(rng.rand(200) < 0.8, y, 1 - y)
+    y[:5] = preds[:5] = 0
+
+    slice_metrics = compute_slice_metrics_from_predictions(
+        test_data, list(test_data.columns), y, preds, n_jobs=n_jobs
+    )
+
+    assert slice_metrics == _per_slice_metrics(test_data, list(test_data.columns), y, preds)
+
+
+def test_compute_slice_metrics_predicts_once_and_matches_per_slice_metrics():
+    """Test that the model-level wrapper scores the test set and reports the per-slice metrics."""
+    rng = np.random.RandomState(1)
+    data = pd.DataFrame({
+        "age": rng.randint(18, 80, size=120),
+        "workclass": rng.choice(["Private", "State-gov", "Self-emp-inc"], size=120),
+        "sex": rng.choice(["Male", "Female"], size=120),
+    })
+    data["salary"] = np.where(data["age"] + rng.randint(-15, 15, size=120) > 50, ">50K", "<=50K")
+    cat_features = ["workclass", "sex"]
+    X, y, encoder, lb = process_data(data, cat_features, label="salary", training=True)
+    model = fit_model(X, y, {"n_estimators": 5, "max_depth": 3, "random_state": 0})
+
+    slice_metrics = compute_slice_metrics(model, data, cat_features, "salary", encoder, lb)
+
+    assert slice_metrics == _per_slice_metrics(data, cat_features, y, inference(model, X))
+
+
+@pytest.mark.parametrize("chunksize", [2, 3, 100])
+def test_chunked_loader_matches_whole_file(tmp_path, chunksize):
+    """Test that loading chunk by chunk yields the frame of cleaning the whole parsed file at once."""
+    raw_path = tmp_path / "census.csv"
+    raw_path.write_text(RAW_CSV)
+    expected = clean_data(pd.read_csv(raw_path, skipinitialspace=True, dtype=CENSUS_DTYPES)).dropna()
+    expected = expected.astype({c: "int64" for c in expected.columns if isinstance(expected[c].dtype, pd.Int64Dtype)})
+    expected = expected.reset_index(drop=True)
+
+    data = _load_data(str(raw_path), chunksize=chunksize)
+
+    pd.testing.assert_frame_equal(data, expected)
+    assert len(data) == 6
+    # The clean CSV is only written on request
+    assert os.listdir(tmp_path) == ["census.csv"]
+
+    clean_path = tmp_path / "census_clean.csv"
+    _load_data(str(raw_path), chunksize=chunksize, clean_file_path=str(clean_path))
+    assert clean_path.read_text() == expected.to_csv(index=False)
+
+
+def test_chunked_loader_pins_extra_columns_and_keeps_quoted_newlines(tmp_path):
+    """Test that a column outside the census dtypes is not typed by its first chunk, and quoted newlines are kept."""
+    raw_path = tmp_path / "census.csv"
+    lines = RAW_CSV.splitlines()
+    # The extra column looks numeric in the first chunk only, and one value spans two lines
+    notes = ["1", "2", "3", "4", "5", "six", '"two\nlines"', "8"]
+    raw_path.write_text("\n".join([lines[0] + ", note"] + [f"{line}, {note}" for line, note in zip(lines[1:], notes)]))
+
+    data = _load_data(str(raw_path), chunksize=2)
+
+    assert len(data) == 6
+    assert pd.api.types.is_string_dtype(data["note"])
+    assert list(data["note"]) == ["1", "2", "4", "six", "two\nlines", "8"]
+    assert data["age"].dtype == np.int64
+
+
+def test_cached_loader_hits_misses_and_invalidates(tmp_path, monkeypatch):
+    """Test that the dataset cache is reused for the same raw file and cleaning, and rebuilt otherwise."""
+    raw_path, cache_dir = tmp_path / "census.csv", tmp_path / "cache"
+    raw_path.write_text(RAW_CSV)
+    cat_features = ["workclass", "sex"]
+    loads = []
+
+    def counting_load_data(*args, **kwargs):
+        loads.append(args)
+        return _load_data(*args, **kwargs)
+
+    monkeypatch.setattr(train_model, "_load_data", counting_load_data)
+
+    def load():
+        return _load_cached_data(str(raw_path), cat_features, "salary", str(cache_dir))
+
+    # Miss: the CSV is parsed and cached with categorical columns
+    data = load()
+    assert len(loads) == 1
+    assert isinstance(data["workclass"].dtype, pd.CategoricalDtype)
+    first_cache = os.listdir(cache_dir)
+    assert len(first_cache) == 1
+
+    # Hit: the same frame is read back without parsing the CSV
+    pd.testing.assert_frame_equal(load(), data)
+    assert len(loads) == 1
+
+    # Editing the raw file replaces the cache
+    raw_path.write_text(RAW_CSV.replace("39, State-gov", "40, State-gov"))
+    assert load()["age"].iloc[0] == 40
+    assert len(loads) == 2
+    assert len(os.listdir(cache_dir)) == 1 and os.listdir(cache_dir) != first_cache
+
+    # So does a new cleaning version or parsing schema
+    monkeypatch.setattr(train_model, "CLEANING_VERSION", train_model.CLEANING_VERSION + 1)
+    load()
+    assert len(loads) == 3
+    monkeypatch.setattr(train_model, "CENSUS_DTYPES", {**CENSUS_DTYPES, "fnlgt": "float64"})
+    load()
+    assert len(loads) == 4
+    load()
+    assert len(loads) == 4
@@ -1,24 +1,51 @@
 # Script to train machine learning model.
+import argparse
+import hashlib
+import json
 import os
+import shutil
 import sys
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 
 from sklearn.model_selection import train_test_split
+import numpy as np
 import pandas as pd
 import pickle
 
 # own imports 
-from ml.data import process_data
-from ml.model import train_model, compute_model_metrics, inference
+from ml.data import CENSUS_DTYPES, clean_data, process_data, read_census_csv
+from ml.model import train_model, compute_batch_model_metrics, compute_model_metrics, inference, inference_proba
+from ml.bundle import save_bundle
+from ml.calibration import calibrate, fit_platt
+from ml.compiled import CompiledForest
+from ml.compression import cap_depth, compression_report, distill, drop_trees
+from ml.cross_validation import cross_validate
+from ml.search import expand_search_space, search_hyperparameters
+from ml.slices import compute_intersectional_slice_metrics
+from ml.thresholds import DEFAULT_PROFILE_RULES, decision_profiles, parse_rule
 
-def _load_data(file_path: str) -> pd.DataFrame:
+# Version of the cleaning done by clean_data and _load_data; bump it whenever their
+# output changes so that datasets cached by an older version are not reused
+CLEANING_VERSION = 2
+
+def _load_data(file_path: str, chunksize: int = 100000, clean_file_path: str = None) -> pd.DataFrame:
     """
     Load data from a CSV file and clean it by removing all spaces.
 
+    The file is parsed in chunks with explicit dtypes for every column; each chunk is
+    cleaned, stripped of rows with missing values and reduced to per-column arrays, so
+    neither the raw file nor a list of cleaned chunks is held in memory next to the
+    result. String columns are kept as integer codes into the values seen so far and
+    restored to their parsed dtype at the end.
+
     Inputs
     ------
     file_path : str
         Path to the CSV file.
+    chunksize : int
+        Number of rows parsed at a time.
+    clean_file_path : str
+        If given, the cleaned chunks are also appended to this CSV file as they are read.
 
     Returns
     -------
@@ -28,34 +55,173 @@ def _load_data(file_path: str) -> pd.DataFrame:
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
     
-    # Create clean file path
-    clean_file_path = os.path.join(os.path.dirname(file_path), "census_clean.csv")
-    
     # Delete previous clean file if it exists
-    if os.path.exists(clean_file_path):
+    if clean_file_path is not None and os.path.exists(clean_file_path):
         os.remove(clean_file_path)
     
-    # Read the raw file content and remove all spaces
+    # Parse the raw file chunk by chunk, skipping the spaces that pad every field
     print(f"INFO: Cleaning data from {file_path}...")
-    with open(file_path, 'r') as f:
-        raw_content = f.read()
-    
-    cleaned_content = raw_content.replace(' ', '')
-    
-    # Write cleaned content to a temporary file or use StringIO
-    data: pd.DataFrame = pd.read_csv(StringIO(cleaned_content))
-    
-    # Drop rows with missing values
-    print("INFO: Dropping rows with missing values...")
-    data = data.dropna()
-    
-    # Save cleaned data to new file
-    print(f"INFO: Saving cleaned data to {clean_file_path}...")
-    data.to_csv(clean_file_path, index=False)
+    chunks = read_census_csv(file_path, chunksize=chunksize)
+
+    parts, categories, dtypes = {}, {}, {}
+    for i, chunk in enumerate(chunks):
+        # Remove any spaces left inside values and drop rows with missing values
+        chunk = clean_data(chunk).dropna()
+
+        # Restore plain integer columns now that missing values are gone
+        integer_columns = [c for c in chunk.columns if isinstance(chunk[c].dtype, pd.Int64Dtype)]
+        chunk = chunk.astype({c: "int64" for c in integer_columns})
+
+        # Append the cleaned chunk to the clean file
+        if clean_file_path is not None:
+            chunk.to_csv(clean_file_path, mode="a", header=(i == 0), index=False)
+
+        for column in chunk.columns:
+            values = chunk[column]
+            if column not in parts:
+                # Every column has a pinned dtype, so the first chunk's is the one of all chunks
+                dtypes[column] = values.dtype
+                parts[column] = []
+                if not pd.api.types.is_numeric_dtype(values):
+                    categories[column] = {}
+            if column in categories:
+                codes, uniques = pd.factorize(values)
+                table = categories[column]
+                remap = np.array([table.setdefault(value, len(table)) for value in uniques], dtype=np.int32)
+                parts[column].append(remap[codes])
+            else:
+                parts[column].append(values.to_numpy())
+
+    if not parts:
+        raise ValueError(f"No data found in {file_path}")
+
+    # Join the chunks one column at a time, releasing each column's parts as it goes
+    columns = {}
+    for column in list(parts):
+        values = np.concatenate(parts.pop(column))
+        if column in categories:
+            values = pd.array(list(categories[column]), dtype=dtypes[column]).take(values)
+        columns[column] = values
+    data: pd.DataFrame = pd.DataFrame(columns, copy=False)
+    if clean_file_path is not None:
+        print(f"INFO: Saved cleaned data to {clean_file_path}...")
     
     return data
 
-def _save_model(model, encoder, lb, model_path: str) -> None:
+def _hash_file(file_path: str) -> str:
+    """
+    Compute the SHA-256 of a file without reading it into memory at once.
+
+    Inputs
+    ------
+    file_path : str
+        Path to the file.
+
+    Returns
+    -------
+    digest : str
+        Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _cache_key(file_path: str, cat_features: list, label: str) -> str:
+    """
+    Key of the cached dataset for a raw CSV file.
+
+    Combines the hash of the raw file with the parsing dtypes, the cleaning version and
+    the columns stored as categories, so a cache is only reused for the same raw data
+    processed the same way.
+
+    Inputs
+    ------
+    file_path : str
+        Path to the raw CSV file.
+    cat_features : list
+        List of categorical feature names.
+    label : str
+        Name of the label column.
+
+    Returns
+    -------
+    key : str
+        Hex digest identifying the cached dataset.
+    """
+    schema = json.dumps({
+        "dtypes": {column: str(dtype) for column, dtype in CENSUS_DTYPES.items()},
+        "cleaning_version": CLEANING_VERSION,
+        "categories": list(cat_features) + [label],
+    }, sort_keys=True)
+    return hashlib.sha256(f"{_hash_file(file_path)}:{schema}".encode()).hexdigest()[:16]
+
+def _load_cached_data(file_path: str, cat_features: list, label: str, cache_dir: str,
+                      clean_file_path: str = None) -> pd.DataFrame:
+    """
+    Load the cleaned data from a columnar cache keyed by the raw CSV and how it is cleaned.
+
+    On a miss the CSV is cleaned with `_load_data` and the result is stored as Parquet,
+    with the categorical features and the label as pandas `category` columns; later runs
+    on the same raw file read the memory-mapped Parquet file instead of parsing the CSV.
+    See `_cache_key` for what invalidates the cache.
+    Without pyarrow installed the cache is skipped.
+
+    Inputs
+    ------
+    file_path : str
+        Path to the raw CSV file.
+    cat_features : list
+        List of categorical feature names.
+    label : str
+        Name of the label column.
+    cache_dir : str
+        Directory holding the cached Parquet files.
+    clean_file_path : str
+        If given, the cleaned data is also written to this CSV file.
+
+    Returns
+    -------
+    data : pd.DataFrame
+        Cleaned data with categorical columns as `category` dtype.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("INFO: pyarrow is not installed, skipping the dataset cache...")
+        return _load_data(file_path, clean_file_path=clean_file_path)
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    cache_path = os.path.join(cache_dir, f"census_{_cache_key(file_path, cat_features, label)}.parquet")
+    if os.path.exists(cache_path):
+        print(f"INFO: Loading cached data from {cache_path}...")
+        data = pd.read_parquet(cache_path, memory_map=True)
+        if clean_file_path is not None:
+            data.to_csv(clean_file_path, index=False)
+            print(f"INFO: Saved cleaned data to {clean_file_path}...")
+        return data
+
+    data = _load_data(file_path, clean_file_path=clean_file_path)
+    data = data.astype({column: "category" for column in cat_features + [label]})
+
+    # Keep only the cache for the current raw file
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in os.listdir(cache_dir):
+        if name.startswith("census_") and name.endswith(".parquet"):
+            os.remove(os.path.join(cache_dir, name))
+
+    print(f"INFO: Caching cleaned data to {cache_path}...")
+    data.to_parquet(f"{cache_path}.tmp", index=False)
+    os.replace(f"{cache_path}.tmp", cache_path)
+
+    return data
+
+def _save_model(model, encoder, lb, model_path: str, compressed_model=None, categorical_features=None,
+                feature_order=None, metadata=None, calibration=None, compressed_calibration=None,
+                profiles=None, compressed_profiles=None) -> None:
     """
     Save the trained model and preprocessing artifacts.
 
@@ -63,12 +229,36 @@ def _save_model(model, encoder, lb, model_path: str) -> None:
     ------
     model : RandomForestClassifier
         Trained machine learning model.
-    encoder : OneHotEncoder
-        Fitted OneHotEncoder for categorical features.
+    encoder : OneHotEncoder or OrdinalEncoder
+        Fitted encoder for categorical features.
     lb : LabelBinarizer
         Fitted LabelBinarizer for labels.
     model_path : str
         Path to the directory where artifacts will be saved.
+    compressed_model : RandomForestClassifier
+        Optional smaller serving variant of `model`, saved next to it so the API can
+        choose either one (CENSUS_MODEL_VARIANT). If None, a compressed variant left
+        by an earlier run is removed, since it no longer matches the encoder.
+    categorical_features : list
+        Names of the categorical columns, in encoder order. If given together with
+        `feature_order`, the model is also saved as a pickle-free model bundle in
+        `bundle/` (and `bundle_compressed/`), see ml/bundle.py.
+    feature_order : list
+        Names of the input columns in model order.
+    metadata : dict
+        JSON-serializable training metadata stored in the bundle manifest.
+    calibration : dict
+        Probability calibration of `model` (see ml/calibration.py), saved as
+        `calibration.json` and in the bundle manifest; the API derives its labels,
+        probabilities and confidence from the calibrated probability.
+    compressed_calibration : dict
+        Probability calibration of `compressed_model`, saved as `calibration_compressed.json`.
+    profiles : dict
+        Named decision thresholds on the calibrated probability of `model` (see
+        ml/thresholds.py), saved as `decision_profiles.json` and in the bundle manifest;
+        requests choose one with `?profile=NAME`.
+    compressed_profiles : dict
+        Decision thresholds of `compressed_model`, saved as `decision_profiles_compressed.json`.
     """
     # Create model directory if it doesn't exist
     os.makedirs(model_path, exist_ok=True)
@@ -81,12 +271,122 @@ def _save_model(model, encoder, lb, model_path: str) -> None:
         pickle.dump(encoder, f)
     with open(f"{model_path}/lb.pkl", "wb") as f:
         pickle.dump(lb, f)
+
+    # Save the forest as raw arrays that the API can memory-map (CENSUS_PREDICTOR=mmap)
+    CompiledForest.from_model(model).save(f"{model_path}/compiled_model")
+
+    for name, content in (
+        ("calibration", calibration),
+        ("calibration_compressed", compressed_calibration),
+        ("decision_profiles", profiles),
+        ("decision_profiles_compressed", compressed_profiles),
+    ):
+        if content is not None:
+            with open(f"{model_path}/{name}.json", "w") as f:
+                json.dump(content, f, indent=2)
+        elif os.path.exists(f"{model_path}/{name}.json"):
+            os.remove(f"{model_path}/{name}.json")
+
+    if compressed_model is not None:
+        with open(f"{model_path}/model_compressed.pkl", "wb") as f:
+            pickle.dump(compressed_model, f)
+        CompiledForest.from_model(compressed_model).save(f"{model_path}/compiled_model_compressed")
+    else:
+        if os.path.exists(f"{model_path}/model_compressed.pkl"):
+            os.remove(f"{model_path}/model_compressed.pkl")
+        shutil.rmtree(f"{model_path}/compiled_model_compressed", ignore_errors=True)
+        shutil.rmtree(f"{model_path}/bundle_compressed", ignore_errors=True)
+
+    # Save the versioned, checksummed bundle that the API loads with CENSUS_PREDICTOR=bundle
+    if categorical_features is not None and feature_order is not None:
+        save_bundle(f"{model_path}/bundle", model, encoder, lb, categorical_features, feature_order,
+                    metadata=metadata, calibration=calibration, decision_profiles=profiles)
+        if compressed_model is not None:
+            save_bundle(f"{model_path}/bundle_compressed", compressed_model, encoder, lb,
+                        categorical_features, feature_order, metadata={**(metadata or {}), "variant": "compressed"},
+                        calibration=compressed_calibration, decision_profiles=compressed_profiles)
     
     print(f"INFO: Model and artifacts saved to {model_path}/")
 
-def compute_slice_metrics(model, test_data, cat_features, label, encoder, lb):
+def _feature_slice_metrics(feature: str, values, y, preds) -> list:
+    """
+    Compute metrics for every value of one categorical feature.
+
+    Inputs
+    ------
+    feature : str
+        Name of the categorical feature.
+    values : pd.Series
+        Value of the feature for every row, aligned with `y` and `preds`.
+    y : np.ndarray
+        Known labels, binarized.
+    preds : np.ndarray
+        Predicted labels, binarized.
+
+    Returns
+    -------
+    slice_metrics : list of dict
+        Metrics for each value, in order of first appearance.
+    """
+    codes, uniques = pd.factorize(values)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    precision, recall, fbeta = compute_batch_model_metrics(y, preds, codes, n_slices=len(uniques))
+
+    slice_metrics = []
+    for code, value in enumerate(uniques):
+        slice_metrics.append({
+            'feature': feature,
+            'value': value,
+            'count': int(counts[code]),
+            'precision': float(precision[code]),
+            'recall': float(recall[code]),
+            'fbeta': float(fbeta[code])
+        })
+    return slice_metrics
+
+def compute_slice_metrics_from_predictions(test_data, cat_features, y, preds, n_jobs=1):
+    """
+    Compute model performance on slices of categorical features from cached predictions.
+
+    Slices are group ids over the already computed `y`/`preds` vectors, so no row is
+    encoded or predicted again and each feature's metrics come from one bincount pass.
+
+    Inputs
+    ------
+    test_data : pd.DataFrame
+        Test dataset, row-aligned with `y` and `preds`.
+    cat_features : list
+        List of categorical feature names.
+    y : np.ndarray
+        Known labels, binarized.
+    preds : np.ndarray
+        Predicted labels, binarized.
+    n_jobs : int
+        Number of threads to spread the features over.
+
+    Returns
+    -------
+    slice_metrics : list of dict
+        List containing performance metrics for each slice.
+    """
+    y = np.asarray(y)
+    preds = np.asarray(preds)
+    tasks = [(feature, test_data[feature], y, preds) for feature in cat_features]
+
+    if n_jobs > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            per_feature = list(executor.map(lambda task: _feature_slice_metrics(*task), tasks))
+    else:
+        per_feature = [_feature_slice_metrics(*task) for task in tasks]
+
+    return [metric for metrics in per_feature for metric in metrics]
+
+def compute_slice_metrics(model, test_data, cat_features, label, encoder, lb, n_jobs=1):
     """
     Compute model performance on slices of categorical features.
+
+    The whole test set is encoded and predicted once; see
+    `compute_slice_metrics_from_predictions`.
     
     Inputs
     ------
@@ -98,66 +398,103 @@ def compute_slice_metrics(model, test_data, cat_features, label, encoder, lb):
         List of categorical feature names.
     label : str
         Name of the label column.
-    encoder : OneHotEncoder
-        Fitted OneHotEncoder for categorical features.
+    encoder : OneHotEncoder or OrdinalEncoder
+        Fitted encoder for categorical features.
     lb : LabelBinarizer
         Fitted LabelBinarizer for labels.
+    n_jobs : int
+        Number of threads to spread the features over.
     
     Returns
     -------
     slice_metrics : list of dict
         List containing performance metrics for each slice.
     """
-    slice_metrics = []
-    
-    for feature in cat_features:
-        # Get unique values for this categorical feature
-        unique_values = test_data[feature].unique()
-        
-        for value in unique_values:
-            # Filter data for this slice
-            slice_data = test_data[test_data[feature] == value]
-            
-            if len(slice_data) == 0:
-                continue
-            
-            # Process the slice data
-            X_slice, y_slice, _, _ = process_data(
-                slice_data,
-                categorical_features=cat_features,
-                label=label,
-                training=False,
-                encoder=encoder,
-                lb=lb
-            )
-            
-            # Make predictions
-            preds = inference(model, X_slice)
-            
-            # Compute metrics
-            precision, recall, fbeta = compute_model_metrics(y_slice, preds)
-            
-            # Store results
-            slice_metrics.append({
-                'feature': feature,
-                'value': value,
-                'count': len(slice_data),
-                'precision': precision,
-                'recall': recall,
-                'fbeta': fbeta
-            })
-    
-    return slice_metrics
+    X_test, y_test, _, _ = process_data(
+        test_data,
+        categorical_features=cat_features,
+        label=label,
+        training=False,
+        encoder=encoder,
+        lb=lb
+    )
+    preds = inference(model, X_test)
+    return compute_slice_metrics_from_predictions(test_data, cat_features, y_test, preds, n_jobs=n_jobs)
 
 def main():
     """
     Main function for training the machine learning model.
     """
 
+    parser = argparse.ArgumentParser(description="Train the census income model.")
+    parser.add_argument("--sparse", action="store_true",
+                        help="One-hot encode into a sparse CSR matrix instead of a dense array. "
+                             "The choice is stored in encoder.pkl and reused when serving.")
+    parser.add_argument("--encoding", choices=["onehot", "ordinal"], default="onehot",
+                        help="Categorical encoding. 'ordinal' keeps one integer-coded column per "
+                             "feature, which is enough for tree models. Stored in encoder.pkl.")
+    parser.add_argument("--slice-order", type=int, default=2,
+                        help="Largest number of categorical features combined in an intersectional "
+                             "slice (e.g. 3 for race x sex x education); below 2 disables them.")
+    parser.add_argument("--min-support", type=int, default=30,
+                        help="Minimum number of test rows in a reported intersectional slice.")
+    parser.add_argument("--folds", type=int, default=0,
+                        help="Also evaluate the model with stratified K-fold cross validation over "
+                             "this many folds, run in parallel processes; below 2 disables it.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Random seed of the train-test split. Set it so an interrupted --search "
+                             "can resume from its saved results.")
+    parser.add_argument("--search", metavar="SPACE_JSON",
+                        help="Tune the forest first: JSON file mapping hyperparameters to lists of "
+                             "values. Candidates are compared by successive halving on n_estimators "
+                             "and the best one is used for the final model.")
+    parser.add_argument("--search-iter", type=int, default=None,
+                        help="Sample this many candidates from the search space (random search) "
+                             "instead of trying them all (grid search).")
+    parser.add_argument("--latency-budget-ms", type=float, default=None,
+                        help="Only select candidates whose p99 single-row latency with the "
+                             "compiled evaluator is within this budget.")
+    parser.add_argument("--compress-trees", type=int, default=None,
+                        help="Also save a compressed serving model keeping only this many trees "
+                             "(with --distill: the number of trees of the student, default 1).")
+    parser.add_argument("--compress-depth", type=int, default=None,
+                        help="Also save a compressed serving model with trees cut at this depth "
+                             "(with --distill: the depth of the student, default 8).")
+    parser.add_argument("--distill", action="store_true",
+                        help="Build the compressed model by distilling the forest into a smaller "
+                             "forest trained on its predictions instead of pruning it.")
+    parser.add_argument("--save-clean-csv", action="store_true",
+                        help="Also write the cleaned data to data/census_clean.csv.")
+    parser.add_argument("--calibration-size", type=float, default=0.1,
+                        help="Fraction of the training split held out to fit the probability "
+                             "calibration and the decision profiles.")
+    parser.add_argument("--profile", action="append", metavar="NAME=RULE", default=[],
+                        help="Save a named decision profile whose probability threshold is derived "
+                             "on the calibration split. RULE is 'fbeta[:BETA]', 'precision:TARGET', "
+                             "'recall:TARGET' or 'cost:FP_COST:FN_COST'. Repeatable; defaults to "
+                             + ", ".join(f"{name}={rule}" for name, rule in DEFAULT_PROFILE_RULES.items()) + ".")
+    args = parser.parse_args()
+    if not 0 < args.calibration_size < 1:
+        parser.error("--calibration-size must be between 0 and 1")
+
+    profile_rules = None
+    if args.profile:
+        profile_rules = {}
+        for profile in args.profile:
+            name, separator, rule = profile.partition("=")
+            if not separator or not name:
+                parser.error(f"--profile expects NAME=RULE, got {profile!r}")
+            try:
+                parse_rule(rule)
+            except ValueError as e:
+                parser.error(str(e))
+            profile_rules[name] = rule
+
     # variables
     script_dir: str    = os.path.dirname(os.path.abspath(__file__))
     parent_dir: str    = os.path.dirname(script_dir)
     data_path: str     = os.path.join(parent_dir, "data", "census.csv")
+    cache_dir: str     = os.path.join(parent_dir, "data", "cache")
     model_path: str    = os.path.join(parent_dir, "model")
     cat_features: list = [
                 "workclass",
@@ -179,11 +516,29 @@ def main():
     try:
         # load in the data.
         print("INFO: Load and clean data...")
-        data: pd.DataFrame = _load_data(data_path)
+        clean_file_path = os.path.join(parent_dir, "data", "census_clean.csv") if args.save_clean_csv else None
+        data: pd.DataFrame = _load_cached_data(data_path, cat_features, "salary", cache_dir, clean_file_path)
+
+        # Estimate the variance of the metrics with K-fold cross validation
+        if args.folds >= 2:
+            print(f"INFO: Cross validating over {args.folds} stratified folds...")
+            fold_metrics = cross_validate(
+                data, cat_features, "salary", hyperparameters, n_splits=args.folds,
+                sparse=args.sparse, encoding=args.encoding
+            )
+            summary = fold_metrics[["precision", "recall", "fbeta"]].agg(["mean", "var"])
+            for metric in summary.columns:
+                print(f"INFO: CV {metric}: mean {summary.at['mean', metric]:.4f}, "
+                      f"variance {summary.at['var', metric]:.6f}")
+            cv_output_path = os.path.join(parent_dir, "model", "cv_output.csv")
+            fold_metrics.to_csv(cv_output_path, index=False, float_format="%.4f")
+            print(f"INFO: Cross validation metrics saved to {cv_output_path}")
 
-        # Optional enhancement, use K-fold cross validation instead of a train-test split.
+        # The served model is still trained on a single train-test split
         print("INFO: Splitting data into train and test sets...")
-        train, test = train_test_split(data, test_size=0.20)
+        train, test = train_test_split(data, test_size=0.20, random_state=args.seed)
+        # Fit the calibration and decision profiles on their own rows, not on the test split
+        train, calibration_data = train_test_split(train, test_size=args.calibration_size, random_state=args.seed)
 
         # process the data using the process_data function.
         print("INFO: Processing data...")
@@ -191,7 +546,9 @@ def main():
             train, 
             categorical_features=cat_features, 
             label="salary", 
-            training=True
+            training=True,
+            sparse=args.sparse,
+            encoding=args.encoding
         )
 
         # Proces the test data with the process_data function.
@@ -204,18 +561,88 @@ def main():
             encoder=encoder,
             lb=lb
         )
+        X_calibration, y_calibration, _, _ = process_data(
+            calibration_data,
+            categorical_features=cat_features,
+            label="salary",
+            training=False,
+            encoder=encoder,
+            lb=lb
+        )
+
+        # Tune the hyperparameters on the already encoded matrices
+        if args.search:
+            with open(args.search) as f:
+                candidates = expand_search_space(json.load(f), n_iter=args.search_iter)
+            search_results_path = os.path.join(parent_dir, "model", "search_results.jsonl")
+            print(f"INFO: Searching {len(candidates)} hyperparameter candidates...")
+            best, search_results = search_hyperparameters(
+                X_train, y_train, X_test, y_test, candidates, hyperparameters,
+                max_estimators=hyperparameters["n_estimators"], latency_budget_ms=args.latency_budget_ms,
+                results_path=search_results_path
+            )
+            print(f"INFO: {len(search_results)} evaluations recorded in {search_results_path}")
+            if best is None:
+                print("WARNING: No candidate meets the latency budget, keeping the default hyperparameters")
+            else:
+                hyperparameters = best
+                print(f"INFO: Selected hyperparameters: {hyperparameters}")
 
         # Train and save a model.
         print("INFO: Training model...")
         model = train_model(X_train, y_train, hyperparameters)
         
-        preds = inference(model, X_test)
+        # Predictions and probabilities come from the same predict_proba pass
+        preds, proba = inference_proba(model, X_test)
         precision, recall, fbeta = compute_model_metrics(y_test, preds)
         print(f"INFO: Precision: {precision:.4f}, Recall: {recall:.4f}, F-beta: {fbeta:.4f}")
 
+        # Calibrate the forest's probabilities on the calibration split
+        calibration_scores = inference_proba(model, X_calibration)[1][:, 1]
+        calibration = fit_platt(calibration_scores, y_calibration)
+        print(f"INFO: Platt calibration: a={calibration['a']:.4f}, b={calibration['b']:.4f}")
+
+        # Derive the decision profiles from the calibrated probabilities served by the API
+        profiles = decision_profiles(y_calibration, calibrate(calibration, calibration_scores), profile_rules)
+        for name, profile in profiles.items():
+            print(f"INFO: Profile {name} ({profile['rule']}): threshold {profile['threshold']:.4f}, "
+                  f"Precision: {profile['precision']:.4f}, Recall: {profile['recall']:.4f}, "
+                  f"F-beta: {profile['fbeta']:.4f}")
+            if profile.get("target_met") is False:
+                print(f"WARNING: Profile {name} does not reach its {profile['rule'].split(':')[0]} target on the calibration split")
+
+        # Build a smaller serving model and compare it with the full one
+        compressed_model = None
+        if args.distill:
+            print("INFO: Distilling the model into a smaller forest...")
+            compressed_model = distill(
+                model, X_train, n_trees=args.compress_trees or 1, max_depth=args.compress_depth or 8
+            )
+        elif args.compress_trees or args.compress_depth:
+            print("INFO: Compressing the model...")
+            compressed_model = model
+            if args.compress_trees:
+                compressed_model = drop_trees(compressed_model, args.compress_trees)
+            if args.compress_depth:
+                compressed_model = cap_depth(compressed_model, args.compress_depth)
+        compressed_calibration = compressed_profiles = None
+        if compressed_model is not None:
+            compressed_scores = inference_proba(compressed_model, X_calibration)[1][:, 1]
+            compressed_calibration = fit_platt(compressed_scores, y_calibration)
+            compressed_profiles = decision_profiles(
+                y_calibration, calibrate(compressed_calibration, compressed_scores), profile_rules
+            )
+            report = compression_report({"full": model, "compressed": compressed_model}, X_test, y_test)
+            print(report.to_string(index=False, float_format="%.4f"))
+            compression_output_path = os.path.join(parent_dir, "model", "compression_report.csv")
+            report.to_csv(compression_output_path, index=False, float_format="%.4f")
+            print(f"INFO: Compression report saved to {compression_output_path}")
+
         # Compute performance on slices
         print("INFO: Computing performance on data slices...")
-        slice_metrics = compute_slice_metrics(model, test, cat_features, "salary", encoder, lb)
+        slice_metrics = compute_slice_metrics_from_predictions(
+            test, cat_features, y_test, preds, n_jobs=os.cpu_count() or 1
+        )
         
         # Save slice metrics to file
         slice_output_path = os.path.join(parent_dir, "model", "slice_output.txt")
@@ -232,8 +659,32 @@ def main():
                 f.write("-" * 80 + "\n")
         print(f"INFO: Slice metrics saved to {slice_output_path}")
 
+        # Compute performance on intersections of categorical features
+        if args.slice_order >= 2:
+            print(f"INFO: Computing performance on intersectional slices up to order {args.slice_order}...")
+            intersectional_metrics = compute_intersectional_slice_metrics(
+                test, cat_features, y_test, preds, max_order=args.slice_order, min_support=args.min_support
+            )
+            intersectional_output_path = os.path.join(parent_dir, "model", "intersectional_slice_output.csv")
+            intersectional_metrics.to_csv(intersectional_output_path, index=False, float_format="%.4f")
+            print(f"INFO: {len(intersectional_metrics)} intersectional slice metrics saved to "
+                  f"{intersectional_output_path}")
+
         # Save the model and artifacts
-        _save_model(model, encoder, lb, model_path)
+        metadata = {
+            "hyperparameters": hyperparameters,
+            "encoding": args.encoding,
+            "sparse": args.sparse,
+            "train_rows": len(train),
+            "test_rows": len(test),
+            "calibration_rows": len(calibration_data),
+            "metrics": {"precision": precision, "recall": recall, "fbeta": fbeta},
+        }
+        feature_order = [c for c in train.columns if c != "salary" and c not in cat_features] + cat_features
+        _save_model(model, encoder, lb, model_path, compressed_model=compressed_model,
+                    categorical_features=cat_features, feature_order=feature_order, metadata=metadata,
+                    calibration=calibration, compressed_calibration=compressed_calibration,
+                    profiles=profiles, compressed_profiles=compressed_profiles)
 
     except Exception as e:
         print(f"ERROR: An error occurred: {e}")